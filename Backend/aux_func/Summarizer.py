@@ -1,30 +1,434 @@
-from gpt4all import GPT4All
+import asyncio
+import json
+import math
+import re
+import threading
+import time
+import urllib.request
+from config import settings
+from aux_func.lazy_model import LazyModel
+from aux_func.disk_cache import DiskCache, make_key
 
 class Summarizer:
     """
     Carga el modelo de lenguaje para hacer resúmenes.
+    Los textos que no caben en el presupuesto de tokens se resumen por partes (map) y después
+    se resumen los resúmenes parciales (reduce), repitiendo hasta que el resultado cabe en una sola llamada.
     """
-    def __init__(self, model_path: str):
-        self.model = GPT4All(model_path, device='cuda')
+    SUMMARY_PROMPT = (
+        "Devuelve solo el resumen puro sin comentarios ni explicaciones:\n\n"
+        "{text}\n\n"
+        "Resumen:"
+    )
+    MERGE_PROMPT = (
+        "Los siguientes textos son resúmenes de partes consecutivas de una misma sesión. "
+        "Combínalos en un único resumen. Devuelve solo el resumen puro sin comentarios ni explicaciones:\n\n"
+        "{text}\n\n"
+        "Resumen:"
+    )
+    REFINE_PROMPT = (
+        "Actualiza el resumen de una sesión con la nueva parte de la transcripción. "
+        "Devuelve solo el resumen actualizado sin comentarios ni explicaciones.\n\n"
+        "Resumen actual:\n{summary}\n\n"
+        "Nueva parte:\n{text}\n\n"
+        "Resumen actualizado:"
+    )
+    # Límite de niveles de reducción, por si los resúmenes parciales no llegan a reducir el texto.
+    MAX_DEPTH = 4
+
+    def __init__(self, model_path: str, context_tokens: int = settings.SUMMARY_CONTEXT_TOKENS, token_budget: int = settings.SUMMARY_TOKEN_BUDGET, max_tokens: int = settings.SUMMARY_MAX_TOKENS):
+        # Se importa aquí para que importar el módulo no cargue la librería del modelo.
+        from gpt4all import GPT4All
+
+        self.model = GPT4All(model_path, device='cuda', n_ctx=context_tokens)
+        self.token_budget = token_budget
+        self.max_tokens = max_tokens
+        # El modelo no admite varias generaciones a la vez desde distintos hilos.
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """
+        Estima el número de tokens de un texto a partir de su longitud.
+
+        Parámetros:
+            text: Texto a medir.
+
+        Retorna:
+            Número aproximado de tokens.
+        """
+        return math.ceil(len(text) / settings.SUMMARY_CHARS_PER_TOKEN)
+
+    def split(self, text: str) -> list[str]:
+        """
+        Divide el texto en fragmentos que caben en el presupuesto de tokens, cortando por frases
+        y, si una frase no cabe, por palabras.
+
+        Parámetros:
+            text: Texto a dividir.
+
+        Retorna:
+            Lista de fragmentos.
+        """
+        chunks = []
+        current = []
+        current_tokens = 0
 
-    def summarize(self, text: str,) -> str:
+        sentences = re.split(r'(?<=[.!?])\s+', text)
+        pieces = []
+        for sentence in sentences:
+            if self.count_tokens(sentence) <= self.token_budget:
+                pieces.append(sentence)
+            else:
+                pieces.extend(sentence.split())
+
+        for piece in pieces:
+            tokens = self.count_tokens(piece) + 1
+
+            if current and current_tokens + tokens > self.token_budget:
+                chunks.append(" ".join(current))
+                current = []
+                current_tokens = 0
+
+            current.append(piece)
+            current_tokens += tokens
+
+        if current:
+            chunks.append(" ".join(current))
+
+        return chunks
+
+    def truncate(self, text: str, tokens: int) -> str:
+        """
+        Recorta un texto para que no supere el número de tokens indicado, cortando por palabras.
+
+        Parámetros:
+            text: Texto a recortar.
+            tokens: Número máximo de tokens.
+
+        Retorna:
+            Principio del texto que cabe en los tokens.
+        """
+        if self.count_tokens(text) <= tokens:
+            return text
+
+        cut = text[:int(tokens * settings.SUMMARY_CHARS_PER_TOKEN)]
+
+        return cut.rsplit(" ", 1)[0] if " " in cut else cut
+
+    def generate(self, prompt: str, on_token=None) -> str:
+        """
+        Ejecuta el modelo sobre el prompt completo.
+
+        Parámetros:
+            prompt: Prompt que se pasa al modelo.
+            on_token: Función opcional que recibe cada token según se genera.
+
+        Retorna:
+            Texto generado.
+        """
+        with self._lock:
+            if on_token is None:
+                return self.model.generate(prompt, max_tokens=self.max_tokens)
+
+            tokens = []
+            for token in self.model.generate(prompt, max_tokens=self.max_tokens, streaming=True):
+                tokens.append(token)
+                on_token(token)
+
+            return "".join(tokens)
+
+    def close(self):
+        """
+        Libera el modelo cuando termina la generación en curso.
+        """
+        with self._lock:
+            self.model.close()
+
+    def summarize(self, text: str, depth: int = 0, merge: bool = False, on_token=None) -> str:
         """
         Genera un resumen del texto proporcionado.
 
         Parámetros:
             text: Texto a resumir
+            depth: Nivel de reducción actual.
+            merge: Indica si el texto son resúmenes parciales que hay que combinar.
+            on_token: Función opcional que recibe los tokens del resumen final según se generan.
+                Los resúmenes parciales no se envían.
 
-        Retrona
+        Retorna:
             Texto resumido.
         """
-        prompt = (
-        "Devuelve solo el resumen puro sin comentarios ni explicaciones:\n\n"
-        f"{text}\n\n"
-        "Resumen:"
-        ) 
+        template = self.MERGE_PROMPT if merge else self.SUMMARY_PROMPT
+
+        if self.count_tokens(text) <= self.token_budget:
+            return self.generate(template.format(text=text), on_token)
+
+        chunks = self.split(text)
+
+        if depth >= self.MAX_DEPTH:
+            # Los resúmenes no se reducen lo suficiente: se recorta cada parte a la misma fracción del presupuesto
+            # para que todas sigan representadas en el resumen final.
+            share = max(1, self.token_budget // len(chunks) - 1)
+            print(f"El texto no cabe tras {self.MAX_DEPTH} niveles de reducción, se recortan sus {len(chunks)} partes")
 
+            return self.generate(template.format(text="\n\n".join(self.truncate(chunk, share) for chunk in chunks)), on_token)
+
+        # Map: cada fragmento se resume por separado.
+        partials = [self.summarize(chunk, depth + 1, merge) for chunk in chunks]
+
+        # Reduce: se combinan los resúmenes parciales, volviendo a dividir si no caben.
+        return self.summarize("\n\n".join(partials), depth + 1, merge=True, on_token=on_token)
+
+    def refine(self, summary: str, text: str, on_token=None) -> str:
+        """
+        Incorpora un texto nuevo a un resumen existente.
+
+        Parámetros:
+            summary: Resumen actual.
+            text: Texto nuevo que hay que añadir al resumen.
+            on_token: Función opcional que recibe los tokens del resumen actualizado según se generan.
+
+        Retorna:
+            Resumen actualizado.
+        """
+        if not summary:
+            return self.summarize(text, on_token=on_token)
+
+        if self.count_tokens(summary) + self.count_tokens(text) > self.token_budget:
+            text = self.summarize(text)
+
+        return self.generate(self.REFINE_PROMPT.format(summary=summary, text=text), on_token)
+
+class SummarizerClient:
+    """
+    Cliente del servidor local de resúmenes (`summarizer_server.py`).
+    Tiene los mismos métodos que `Summarizer`, pero la generación se hace en el servidor,
+    de forma que el modelo solo se carga una vez por nodo.
+    """
+    count_tokens = staticmethod(Summarizer.count_tokens)
+
+    def __init__(self, url: str, timeout: int = settings.SUMMARIZER_TIMEOUT_SECONDS):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _post(self, path: str, payload: dict, on_token=None) -> str:
+        """
+        Envía una petición al servidor de resúmenes.
+        El servidor responde con líneas JSON: avisos periódicos mientras la petición espera en la cola o se genera,
+        los tokens si se han pedido y el resumen al final. El tiempo máximo de espera se aplica a cada línea,
+        así que una petición que espera su turno no se abandona mientras el servidor siga respondiendo.
+
+        Parámetros:
+            path: Ruta del endpoint.
+            payload: Cuerpo de la petición.
+            on_token: Función opcional que recibe los tokens según llegan.
+
+        Retorna:
+            Resumen devuelto por el servidor.
+
+        Lanza:
+            RuntimeError: Si el servidor no ha podido generar el resumen.
+        """
+        request = urllib.request.Request(
+            self.url + path,
+            data=json.dumps({**payload, "stream": on_token is not None}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            for line in response:
+                message = json.loads(line)
+
+                if "token" in message:
+                    if on_token is not None:
+                        on_token(message["token"])
+                elif "summary" in message:
+                    return message["summary"]
+                elif "error" in message:
+                    raise RuntimeError(f"Error en el servidor de resúmenes: {message['error']}")
+
+        raise RuntimeError("El servidor de resúmenes ha cerrado la conexión sin devolver el resumen")
+
+    def load(self):
+        """
+        Espera a que el servidor de resúmenes esté disponible, ya que puede estar cargando el modelo.
+
+        Lanza:
+            OSError: Si el servidor no responde antes de `timeout` segundos.
+        """
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            try:
+                with urllib.request.urlopen(self.url + "/health", timeout=self.timeout) as response:
+                    response.read()
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(2)
+
+    def summarize(self, text: str, on_token=None) -> str:
+        """
+        Genera un resumen del texto proporcionado.
+
+        Parámetros:
+            text: Texto a resumir
+            on_token: Función opcional que recibe el resumen según se genera.
+
+        Retorna:
+            Texto resumido.
+        """
+        return self._post("/summarize", {"text": text}, on_token)
+
+    def refine(self, summary: str, text: str, on_token=None) -> str:
+        """
+        Incorpora un texto nuevo a un resumen existente.
+
+        Parámetros:
+            summary: Resumen actual.
+            text: Texto nuevo que hay que añadir al resumen.
+            on_token: Función opcional que recibe el resumen actualizado según se genera.
+
+        Retorna:
+            Resumen actualizado.
+        """
+        return self._post("/refine", {"summary": summary, "text": text}, on_token)
+
+class CachedSummarizer:
+    """
+    Envuelve un resumidor guardando en una caché en disco el resultado de cada llamada.
+    La clave incluye el texto, el modelo, los prompts, los límites de tokens y la estimación de tokens por caracteres, de forma que al repetir un trabajo
+    con el mismo texto limpio (reintentos, correcciones que no cambian el texto...) no se vuelve a ejecutar el modelo.
+    En el resumen incremental cada actualización depende del resumen anterior, así que los aciertos se encadenan.
+    """
+    count_tokens = staticmethod(Summarizer.count_tokens)
+
+    def __init__(self, summarizer, cache: DiskCache):
+        self.summarizer = summarizer
+        self.cache = cache
+        self.version = make_key(
+            settings.SUMMARIZER_MODEL,
+            Summarizer.SUMMARY_PROMPT,
+            Summarizer.MERGE_PROMPT,
+            Summarizer.REFINE_PROMPT,
+            settings.SUMMARY_TOKEN_BUDGET,
+            settings.SUMMARY_MAX_TOKENS,
+            settings.SUMMARY_CONTEXT_TOKENS,
+            settings.SUMMARY_CHARS_PER_TOKEN
+        )
+
+    def _cached(self, method: str, *texts, on_token=None) -> str:
+        """
+        Devuelve el resultado de la caché o ejecuta el modelo y lo guarda.
+        El modelo solo se carga si no está en la caché.
+
+        Parámetros:
+            method: Nombre del método del resumidor que se ejecuta si no está en la caché.
+            texts: Textos que se pasan al método.
+            on_token: Función opcional que recibe el texto según se genera. Con un acierto recibe el texto completo.
+
+        Retorna:
+            Texto generado.
+        """
+        key = make_key(self.version, method, *texts)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            if on_token is not None:
+                on_token(cached["summary"])
+            return cached["summary"]
+
+        result = getattr(self.summarizer, method)(*texts, on_token=on_token)
+        self.cache.put(key, {"summary": result})
 
-        result = self.model.generate(prompt, max_tokens=512)
         return result
 
-summarizer_instance = Summarizer("qwen2.5-coder-7b-instruct-q4_0.gguf")
+    def summarize(self, text: str, on_token=None) -> str:
+        """
+        Genera un resumen del texto proporcionado, reutilizando el de la caché si existe.
+        """
+        return self._cached("summarize", text, on_token=on_token)
+
+    def refine(self, summary: str, text: str, on_token=None) -> str:
+        """
+        Incorpora un texto nuevo a un resumen existente, reutilizando el resultado de la caché si existe.
+        """
+        return self._cached("refine", summary, text, on_token=on_token)
+
+class RollingSummary:
+    """
+    Resumen de una sesión que se va actualizando conforme se escriben fragmentos de la transcripción.
+    Los fragmentos se acumulan y, cuando superan `fold_tokens`, se incorporan al resumen en segundo plano
+    mientras la transcripción continúa, de forma que al terminar solo queda incorporar el último trozo.
+    """
+    def __init__(self, summarizer, fold_tokens: int = settings.SUMMARY_FOLD_TOKENS):
+        self.summarizer = summarizer
+        self.fold_tokens = fold_tokens
+        self.summary = ""
+        self.pending = []
+        self.pending_tokens = 0
+        self._task = None
+
+    def _fold(self, text: str, on_token=None):
+        self.summary = self.summarizer.refine(self.summary, text, on_token=on_token)
+
+    def _start_fold(self, on_token=None):
+        """
+        Incorpora al resumen los fragmentos pendientes en un hilo aparte.
+
+        Parámetros:
+            on_token: Función opcional que recibe el resumen actualizado según se genera.
+        """
+        text = " ".join(self.pending)
+        self.pending = []
+        self.pending_tokens = 0
+        self._task = asyncio.create_task(asyncio.to_thread(self._fold, text, on_token))
+
+    async def add(self, text: str):
+        """
+        Añade un fragmento limpio de la transcripción.
+
+        Parámetros:
+            text: Fragmento de texto.
+        """
+        if not text:
+            return
+
+        self.pending.append(text)
+        self.pending_tokens += self.summarizer.count_tokens(text)
+
+        # Solo hay una actualización en curso a la vez; mientras tanto se siguen acumulando fragmentos.
+        if self.pending_tokens >= self.fold_tokens and (self._task is None or self._task.done()):
+            if self._task is not None:
+                await self._task
+            self._start_fold()
+
+    async def finish(self, on_token=None) -> str:
+        """
+        Espera a la actualización en curso e incorpora los fragmentos que quedan.
+
+        Parámetros:
+            on_token: Función opcional que recibe el resumen final según se genera. Si no queda nada
+                por incorporar, recibe el resumen completo de una vez.
+
+        Retorna:
+            Resumen final de la sesión.
+        """
+        if self._task is not None:
+            await self._task
+
+        if self.pending:
+            self._start_fold(on_token)
+            await self._task
+        elif on_token is not None and self.summary:
+            on_token(self.summary)
+
+        return self.summary
+
+if settings.SUMMARIZER_URL:
+    summarizer_instance = SummarizerClient(settings.SUMMARIZER_URL)
+else:
+    summarizer_instance = LazyModel(lambda: Summarizer(settings.SUMMARIZER_MODEL), "resumen", settings.MODEL_IDLE_SECONDS)
@@ -0,0 +1,128 @@
+import json
+import os
+import hashlib
+from uuid import uuid4
+
+def hash_file(path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Calcula el hash SHA-256 del contenido de un fichero leyéndolo por bloques.
+
+    Parámetros:
+        path: Ruta del fichero.
+        block_size: Bytes que se leen en cada bloque.
+
+    Retorna:
+        str: Hash del contenido en hexadecimal.
+    """
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+def hash_chunks(chunks) -> str:
+    """
+    Calcula el hash SHA-256 de un contenido que se lee por bloques, por ejemplo de `Storage.open`.
+
+    Parámetros:
+        chunks: Iterador de bloques de bytes.
+
+    Retorna:
+        str: Hash del contenido en hexadecimal.
+    """
+    digest = hashlib.sha256()
+
+    for chunk in chunks:
+        digest.update(chunk)
+
+    return digest.hexdigest()
+
+def make_key(*parts) -> str:
+    """
+    Genera una clave de caché a partir de todos los valores que afectan al resultado.
+
+    Parámetros:
+        parts: Valores que forman la clave (hash del contenido, modelo, configuración...).
+
+    Retorna:
+        str: Clave en hexadecimal.
+    """
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+class DiskCache:
+    """
+    Caché en disco de resultados en JSON, con un fichero por clave.
+    Cuando se supera el tamaño máximo se eliminan las entradas usadas hace más tiempo (LRU),
+    usando la fecha de modificación de cada fichero como fecha del último uso.
+    """
+    def __init__(self, folder: str, max_bytes: int):
+        self.folder = folder
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.json")
+
+    def get(self, key: str):
+        """
+        Obtiene una entrada de la caché y la marca como usada.
+
+        Parámetros:
+            key: Clave de la entrada.
+
+        Retorna:
+            Valor almacenado, o None si no está en la caché.
+        """
+        path = self._path(key)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return value
+
+    def put(self, key: str, value):
+        """
+        Guarda una entrada en la caché y libera espacio si se ha superado el tamaño máximo.
+        El fichero se escribe con otro nombre y se renombra, para que nadie lea una entrada a medias.
+
+        Parámetros:
+            key: Clave de la entrada.
+            value: Valor serializable a JSON.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+
+        tmp_path = os.path.join(self.folder, f".{uuid4()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+
+        os.replace(tmp_path, self._path(key))
+
+        self._evict()
+
+    def _evict(self):
+        """
+        Elimina las entradas menos usadas hasta que la caché ocupe como máximo `max_bytes`.
+        """
+        entries = []
+        total = 0
+
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
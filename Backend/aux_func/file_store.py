@@ -0,0 +1,211 @@
+import os
+import fcntl
+from contextlib import contextmanager
+from config import settings
+
+# Almacenamiento de los ficheros en carpetas repartidas según el principio del nombre (ab/cd/abcd...),
+# para que ninguna carpeta tenga millones de entradas.
+# Las imágenes y audios se guardan con el hash de su contenido como nombre, de forma que un mismo fichero
+# subido varias veces se guarda una sola vez. Junto a ellos hay un fichero "<nombre>.refs" con el número
+# de referencias, y el fichero solo se elimina cuando deja de haber referencias.
+# Los ficheros guardados antes de repartirse en carpetas siguen en la raíz y se encuentran igualmente.
+
+def check_name(name: str):
+    """
+    Comprueba que el nombre es el de un fichero guardado y no una ruta, para que no se pueda leer ni escribir
+    fuera de la carpeta de archivos ni en los ficheros internos (temporales, contadores, subidas por partes).
+
+    Parámetros:
+        name (str): Nombre del fichero.
+
+    Lanza:
+        FileNotFoundError: Si el nombre está vacío, empieza por "." o contiene un separador de rutas.
+    """
+    if not name or name.startswith(".") or "/" in name or os.sep in name or (os.altsep and os.altsep in name):
+        raise FileNotFoundError(name)
+
+def shard_path(name: str, upload_folder: str = settings.UPLOAD_FOLDER) -> str:
+    """
+    Ruta repartida en carpetas de un fichero.
+
+    Parámetros:
+        name (str): Nombre del fichero.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+
+    Retorna:
+        str: Ruta del fichero dentro de su carpeta.
+
+    Lanza:
+        FileNotFoundError: Si el nombre no es válido (ver `check_name`).
+    """
+    check_name(name)
+
+    return os.path.join(upload_folder, name[0:2], name[2:4], name)
+
+def file_path(name: str, upload_folder: str = settings.UPLOAD_FOLDER) -> str:
+    """
+    Ruta de un fichero guardado. Si no está repartido en carpetas pero existe en la raíz (ficheros antiguos),
+    se devuelve esa ruta.
+
+    Parámetros:
+        name (str): Nombre del fichero.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+
+    Retorna:
+        str: Ruta del fichero.
+    """
+    path = shard_path(name, upload_folder)
+
+    if not os.path.exists(path):
+        legacy = os.path.join(upload_folder, name)
+        if os.path.exists(legacy):
+            return legacy
+
+    return path
+
+def relative_path(name: str, upload_folder: str = settings.UPLOAD_FOLDER) -> str:
+    """
+    Ruta de un fichero guardado relativa a la carpeta de archivos.
+    """
+    return os.path.relpath(file_path(name, upload_folder), upload_folder)
+
+def is_shared(name: str, upload_folder: str = settings.UPLOAD_FOLDER) -> bool:
+    """
+    Indica si el fichero se comparte por contenido, en cuyo caso no se puede modificar.
+    """
+    return os.path.exists(file_path(name, upload_folder) + ".refs")
+
+@contextmanager
+def _locked_refs(path: str):
+    """
+    Bloquea el contador de referencias de un fichero compartido entre procesos.
+    Si mientras se esperaba al bloqueo otro proceso ha eliminado el contador, se vuelve a abrir.
+
+    Parámetros:
+        path (str): Ruta del fichero compartido.
+
+    Retorna:
+        Descriptor del fichero del contador, ya bloqueado.
+    """
+    refs_path = path + ".refs"
+
+    while True:
+        fd = os.open(refs_path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+        try:
+            if os.fstat(fd).st_ino == os.stat(refs_path).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+
+        os.close(fd)
+
+    try:
+        yield fd
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+def _read_refs(fd: int) -> int:
+    os.lseek(fd, 0, os.SEEK_SET)
+    content = os.read(fd, 32).strip()
+
+    return int(content) if content else 0
+
+def _write_refs(fd: int, refs: int):
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.ftruncate(fd, 0)
+    os.write(fd, str(refs).encode())
+    os.fsync(fd)
+
+def put_shared(tmp_path: str, name: str, upload_folder: str = settings.UPLOAD_FOLDER) -> str:
+    """
+    Guarda un fichero compartido por contenido. Si ya existe, se descarta la copia nueva y se añade una referencia.
+
+    Parámetros:
+        tmp_path (str): Ruta del fichero temporal con el contenido, dentro de la carpeta de archivos.
+        name (str): Nombre del fichero, formado por el hash del contenido y la extensión.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+
+    Retorna:
+        str: Nombre del fichero.
+    """
+    path = shard_path(name, upload_folder)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with _locked_refs(path) as fd:
+        refs = _read_refs(fd)
+
+        if refs > 0 and os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+            refs = 0
+
+        _write_refs(fd, refs + 1)
+
+    return name
+
+def put(tmp_path: str, name: str, upload_folder: str = settings.UPLOAD_FOLDER) -> str:
+    """
+    Guarda un fichero propio (no compartido) con el nombre indicado.
+
+    Parámetros:
+        tmp_path (str): Ruta del fichero temporal con el contenido, dentro de la carpeta de archivos.
+        name (str): Nombre único del fichero.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+
+    Retorna:
+        str: Nombre del fichero.
+    """
+    path = shard_path(name, upload_folder)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+
+    return name
+
+def references(name: str, upload_folder: str = settings.UPLOAD_FOLDER) -> int:
+    """
+    Número de referencias de un fichero. Los ficheros propios tienen una si existen.
+
+    Parámetros:
+        name (str): Nombre del fichero.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+
+    Retorna:
+        int: Número de referencias.
+    """
+    path = file_path(name, upload_folder)
+
+    if not os.path.exists(path + ".refs"):
+        return 1 if os.path.exists(path) else 0
+
+    with _locked_refs(path) as fd:
+        return _read_refs(fd)
+
+def release(name: str, upload_folder: str = settings.UPLOAD_FOLDER):
+    """
+    Elimina una referencia a un fichero. Los ficheros propios se eliminan directamente y los compartidos
+    solo cuando se elimina su última referencia.
+
+    Parámetros:
+        name (str): Nombre del fichero.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+    """
+    path = file_path(name, upload_folder)
+
+    if not os.path.exists(path + ".refs"):
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    with _locked_refs(path) as fd:
+        refs = _read_refs(fd) - 1
+
+        if refs > 0:
+            _write_refs(fd, refs)
+        else:
+            if os.path.exists(path):
+                os.remove(path)
+            os.remove(path + ".refs")
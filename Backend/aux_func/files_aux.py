@@ -1,33 +1,570 @@
 import os
+import mimetypes
 from config import settings
-from uuid import uuid4
+from uuid import uuid4, UUID
 import asyncio
+import aiofiles
+import fcntl
+import hashlib
+import json
+import shutil
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from python_multipart.multipart import MultipartParser, MultipartParseError, parse_options_header
+from aux_func import file_store
+from aux_func.storage import Storage, LocalStorage, remote_storage
+from aux_func.disk_cache import hash_file
 
-async def save(file, upload_folder = settings.UPLOAD_FOLDER) -> str:
+# Extensiones de cada tipo de fichero, para aplicar los límites de tamaño.
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp"}
+# Las grabaciones de la aplicación Android se guardan en contenedores MPEG-4 (.mp4) o 3GP (.3gp, .amr).
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".m4a", ".ogg", ".opus", ".flac", ".aac", ".webm", ".mp4", ".3gp", ".amr"}
+TEXT_EXTENSIONS = {".txt", ".md"}
+
+# Tamaño de los bloques que se copian en cada escritura.
+CHUNK_SIZE = 1024 * 1024
+
+# Carpeta donde se guardan las subidas por partes que todavía no se han terminado.
+UPLOADS_FOLDER = ".uploads"
+
+class FileTooLargeError(Exception):
+    """
+    Se lanza cuando un fichero supera el tamaño máximo permitido para su tipo.
+    """
+
+class InvalidFormError(Exception):
+    """
+    Se lanza cuando el cuerpo de una subida no es un formulario multipart válido o no tiene el fichero.
+    """
+
+class UploadNotFoundError(Exception):
+    """
+    Se lanza cuando no existe la subida por partes indicada.
+    """
+
+class UploadOffsetError(Exception):
+    """
+    Se lanza cuando una parte no empieza donde termina lo recibido o la subida no está completa.
+    El atributo `offset` indica los bytes recibidos hasta el momento.
+    """
+    def __init__(self, offset: int):
+        super().__init__(f"La subida va por el byte {offset}")
+        self.offset = offset
+
+def file_type(filename: str) -> str:
+    """
+    Obtiene el tipo de un fichero a partir de su extensión.
+
+    Parámetros:
+        filename (str): Nombre del fichero.
+
+    Retorna:
+        str: "image", "audio", "text" u "other".
+    """
+    extension = os.path.splitext(filename)[1].lower()
+
+    if extension in IMAGE_EXTENSIONS:
+        return "image"
+    if extension in AUDIO_EXTENSIONS:
+        return "audio"
+    if extension in TEXT_EXTENSIONS:
+        return "text"
+
+    # Las extensiones que no están en las listas se clasifican por su tipo MIME.
+    mime_type = mimetypes.guess_type(filename)[0] or ""
+    if mime_type.startswith("image/"):
+        return "image"
+    if mime_type.startswith("audio/"):
+        return "audio"
+
+    return "other"
+
+def storage_for(filename: str, upload_folder: str = settings.UPLOAD_FOLDER) -> Storage:
+    """
+    Almacenamiento donde se guarda un fichero según su tipo.
+    Las notas se escriben poco a poco durante las transcripciones, así que siempre se guardan en el disco local.
+
+    Parámetros:
+        filename (str): Nombre del fichero.
+        upload_folder (str): Ruta donde se almacenan los archivos en el disco local.
+
+    Retorna:
+        Storage: Almacenamiento del fichero.
+    """
+    if remote_storage is None or file_type(filename) == "text":
+        return LocalStorage(upload_folder)
+
+    return remote_storage
+
+def max_size(filename: str) -> int:
+    """
+    Tamaño máximo permitido para un fichero según su tipo.
+
+    Parámetros:
+        filename (str): Nombre del fichero.
+
+    Retorna:
+        int: Tamaño máximo en bytes.
+    """
+    limits = {
+        "image": settings.MAX_IMAGE_MB,
+        "audio": settings.MAX_AUDIO_MB,
+        "text": settings.MAX_TEXT_MB,
+        "other": settings.MAX_OTHER_MB
+    }
+
+    return limits[file_type(filename)] * 1024 * 1024
+
+def _too_large(limit: int) -> FileTooLargeError:
+    """
+    Error de fichero demasiado grande para el tamaño máximo indicado en bytes, con el mensaje en MB.
+    """
+    return FileTooLargeError(f"El fichero supera el tamaño máximo de {limit // (1024 * 1024)} MB")
+
+async def form_file(request, field: str = "file"):
+    """
+    Lee el fichero de un formulario multipart directamente del cuerpo de la petición, según llega.
+    A diferencia de `UploadFile`, el cuerpo no se guarda antes en un fichero temporal, así que el tamaño
+    máximo se comprueba antes de escribir nada y una subida demasiado grande no ocupa disco.
+
+    Parámetros:
+        request (Request): Petición con el formulario.
+        field (str): Nombre del campo del formulario con el fichero.
+
+    Retorna:
+        tuple[str, AsyncIterator[bytes]]: Nombre del fichero e iterador asíncrono con los bloques de su contenido.
+            Los bloques deben leerse antes de usar la petición para otra cosa.
+
+    Lanza:
+        InvalidFormError: Si la petición no es un formulario multipart o no tiene el campo.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise InvalidFormError("La petición no es un formulario multipart")
+
+    # El analizador avisa de las cabeceras y los datos de cada parte con callbacks síncronos,
+    # que se guardan en `events` para escribirlos después de forma asíncrona.
+    events = deque()
+    header = {"field": b"", "value": b"", "headers": {}}
+
+    def on_header_field(data: bytes, start: int, end: int):
+        header["field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        header["value"] += data[start:end]
+
+    def on_header_end():
+        header["headers"][header["field"].lower()] = header["value"]
+        header["field"] = header["value"] = b""
+
+    def on_headers_finished():
+        events.append(("headers", header["headers"]))
+        header["headers"] = {}
+
+    def on_part_data(data: bytes, start: int, end: int):
+        events.append(("data", bytes(data[start:end])))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    parser = MultipartParser(options[b"boundary"], {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end
+    })
+    body = request.stream()
+
+    async def next_event():
+        while not events:
+            try:
+                chunk = await anext(body)
+            except StopAsyncIteration:
+                raise InvalidFormError("El formulario está incompleto")
+
+            try:
+                parser.write(chunk)
+            except MultipartParseError:
+                raise InvalidFormError("El formulario no es válido")
+
+        return events.popleft()
+
+    # Se descartan las partes anteriores al fichero.
+    while True:
+        try:
+            kind, value = await next_event()
+        except InvalidFormError:
+            raise InvalidFormError(f"El formulario no tiene el campo {field}")
+
+        if kind == "headers":
+            _, disposition = parse_options_header(value.get(b"content-disposition", b""))
+            if disposition.get(b"name") == field.encode() and b"filename" in disposition:
+                filename = disposition[b"filename"].decode("utf-8", errors="replace")
+                break
+
+    async def chunks():
+        while True:
+            kind, value = await next_event()
+            if kind == "end":
+                return
+            if kind == "data":
+                yield value
+
+    return filename, chunks()
+
+async def write_stream(chunks, path: str, limit: int) -> tuple[int, str]:
+    """
+    Copia un archivo recibido al disco por bloques, sin cargarlo entero en memoria ni bloquear el bucle de eventos.
+    Si supera el tamaño máximo se elimina lo escrito.
+
+    Parámetros:
+        chunks: Iterador asíncrono con los bloques de bytes del archivo (ver `form_file`).
+        path (str): Ruta donde se escribe el archivo.
+        limit (int): Tamaño máximo en bytes.
+
+    Retorna:
+        tuple[int, str]: Tamaño en bytes y hash SHA-256 del contenido.
+
+    Lanza:
+        FileTooLargeError: Si el archivo supera el tamaño máximo.
+    """
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(path, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > limit:
+                    raise _too_large(limit)
+
+                digest.update(chunk)
+                await f.write(chunk)
+
+    except BaseException:
+        await asyncio.to_thread(os.remove, path)
+        raise
+
+    return size, digest.hexdigest()
+
+async def _copy_chunks(chunks, path: str, limit: int) -> int:
+    """
+    Añade al final de un fichero los bloques recibidos, sin superar el tamaño indicado.
+
+    Parámetros:
+        chunks: Iterador asíncrono de bloques de bytes.
+        path (str): Ruta del fichero.
+        limit (int): Tamaño máximo en bytes que puede alcanzar el fichero.
+
+    Retorna:
+        int: Tamaño del fichero tras añadir los bloques.
+
+    Lanza:
+        FileTooLargeError: Si el fichero supera el tamaño máximo. Lo añadido hasta ese momento se conserva.
+    """
+    async with aiofiles.open(path, "ab") as f:
+        size = await f.tell()
+
+        async for chunk in chunks:
+            if size + len(chunk) > limit:
+                raise _too_large(limit)
+
+            await f.write(chunk)
+            size += len(chunk)
+
+    return size
+
+async def save(filename: str, chunks, upload_folder = settings.UPLOAD_FOLDER) -> str:
     """
     Función que almacena un archivo seleccionado dentro del servidor.
 
     Parámetros:
-        file (UploadFile): Archivo recibido por parte de la aplicación.
+        filename (str): Nombre original del archivo, del que se toman su tipo y su extensión.
+        chunks: Iterador asíncrono con los bloques de bytes del archivo (ver `form_file`).
         upload_folder (str): Ruta donde se almacenará el archivo.
             Por defecto, se toma de `settings.UPLOAD_FOLDER`.
 
     Retorna:
         str: Nombre del archivo guardado, junto a su extención original.
+
+    Lanza:
+        FileTooLargeError: Si el archivo supera el tamaño máximo para su tipo.
     """
     # Crear el directorio de carga si no existe
     os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
     
-    # Generar un nombre de archivo único y mantener su extensión original
-    filename = f"{uuid4()}{os.path.splitext(file.filename)[1]}"  
-    image_path = os.path.join(upload_folder, filename)
+    # Guarda el archivo en un fichero temporal por bloques, calculando a la vez el hash del contenido.
+    tmp_path = os.path.join(upload_folder, f".{uuid4()}.tmp")
+    _, digest = await write_stream(chunks, tmp_path, max_size(filename))
+
+    return await asyncio.to_thread(store, tmp_path, filename, digest, upload_folder)
+
+def store(tmp_path: str, original_name: str, digest: str = None, upload_folder = settings.UPLOAD_FOLDER) -> str:
+    """
+    Mueve un fichero temporal al almacenamiento que le corresponde según su tipo.
+    Las imágenes y audios no se modifican, así que se guardan con el hash de su contenido como nombre y
+    se comparten entre todas las subidas iguales. El resto de ficheros reciben un nombre único.
+
+    Parámetros:
+        tmp_path (str): Ruta del fichero temporal, dentro de la carpeta de archivos.
+        original_name (str): Nombre original del fichero, del que se toma la extensión.
+        digest (str): Hash SHA-256 del contenido, si ya se conoce.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+
+    Retorna:
+        str: Nombre del archivo guardado, junto a su extensión original.
+    """
+    extension = os.path.splitext(original_name)[1]
+    storage = storage_for(original_name, upload_folder)
+
+    if file_type(original_name) in ("image", "audio"):
+        digest = digest or hash_file(tmp_path)
+        return storage.put(tmp_path, f"{digest}{extension.lower()}", shared=True)
+
+    return storage.put(tmp_path, f"{uuid4()}{extension}")
+
+# Subidas por partes.
+# Cada subida tiene una carpeta en `UPLOADS_FOLDER` con el contenido recibido ("data") y su información ("meta.json").
+# El cliente envía partes consecutivas indicando la posición en la que empiezan, y si la conexión se corta
+# consulta cuántos bytes se han recibido y continúa desde ahí.
+
+# Las partes de una misma subida pueden llegar a la vez a distintos procesos de la API, así que cada operación
+# bloquea el fichero "meta.json" de la subida con flock. Si al conseguir el bloqueo la subida ya no existe
+# (se ha terminado o cancelado mientras se esperaba), se trata como no encontrada.
+
+def _lock_upload(folder: str) -> int:
+    """
+    Bloquea una subida por partes, esperando si otro proceso la tiene bloqueada.
+
+    Parámetros:
+        folder (str): Carpeta de la subida.
+
+    Retorna:
+        int: Descriptor del fichero bloqueado. El bloqueo se libera al cerrarlo.
+
+    Lanza:
+        UploadNotFoundError: Si la subida no existe o deja de existir mientras se espera.
+    """
+    meta = os.path.join(folder, "meta.json")
+
+    try:
+        fd = os.open(meta, os.O_RDONLY)
+    except FileNotFoundError:
+        raise UploadNotFoundError(os.path.basename(folder))
+
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+    if not os.path.exists(meta):
+        os.close(fd)
+        raise UploadNotFoundError(os.path.basename(folder))
+
+    return fd
+
+@asynccontextmanager
+async def _locked_upload(upload_id: str, upload_folder: str):
+    """
+    Versión asíncrona de `_lock_upload`, que espera al bloqueo en un hilo aparte.
+    Si la petición se cancela mientras se espera, el bloqueo se libera en cuanto se consigue.
+
+    Retorna:
+        str: Carpeta de la subida, bloqueada mientras dura el bloque `async with`.
+    """
+    folder = await asyncio.to_thread(_upload_folder, upload_id, upload_folder)
+    task = asyncio.ensure_future(asyncio.to_thread(_lock_upload, folder))
+
+    try:
+        fd = await asyncio.shield(task)
+    except asyncio.CancelledError:
+        task.add_done_callback(lambda t: t.cancelled() or t.exception() is not None or os.close(t.result()))
+        raise
+
+    try:
+        yield folder
+    finally:
+        os.close(fd)
+
+def _upload_folder(upload_id: str, upload_folder: str) -> str:
+    """
+    Ruta de la carpeta de una subida por partes.
+
+    Lanza:
+        UploadNotFoundError: Si el identificador no es válido o la subida no existe.
+    """
+    try:
+        upload_id = UUID(upload_id).hex
+    except ValueError:
+        raise UploadNotFoundError(upload_id)
+
+    folder = os.path.join(upload_folder, UPLOADS_FOLDER, upload_id)
+    if not os.path.isdir(folder):
+        raise UploadNotFoundError(upload_id)
+
+    return folder
+
+def _remove_expired_uploads(upload_folder: str):
+    """
+    Elimina las subidas por partes que llevan más de `settings.UPLOAD_EXPIRE_HOURS` horas sin recibir datos.
+    """
+    folder = os.path.join(upload_folder, UPLOADS_FOLDER)
+    limit = time.time() - settings.UPLOAD_EXPIRE_HOURS * 3600
+
+    for entry in os.scandir(folder):
+        data = os.path.join(entry.path, "data")
+        if not entry.is_dir() or not os.path.exists(data) or os.path.getmtime(data) >= limit:
+            continue
+
+        # Si otro proceso la tiene bloqueada es que está recibiendo datos, así que no ha caducado.
+        try:
+            fd = os.open(os.path.join(entry.path, "meta.json"), os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            shutil.rmtree(entry.path, ignore_errors=True)
+        except BlockingIOError:
+            pass
+        finally:
+            os.close(fd)
+
+def create_upload(filename: str, size: int = None, upload_folder = settings.UPLOAD_FOLDER) -> dict:
+    """
+    Inicia una subida por partes.
+
+    Parámetros:
+        filename (str): Nombre original del fichero.
+        size (int): Tamaño total del fichero en bytes, si se conoce.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+
+    Retorna:
+        dict: Estado de la subida.
+
+    Lanza:
+        FileTooLargeError: Si el tamaño indicado supera el máximo para el tipo de fichero.
+    """
+    if size is not None and size > max_size(filename):
+        raise _too_large(max_size(filename))
+
+    os.makedirs(os.path.join(upload_folder, UPLOADS_FOLDER), exist_ok=True)
+    _remove_expired_uploads(upload_folder)
+
+    upload_id = uuid4().hex
+    folder = os.path.join(upload_folder, UPLOADS_FOLDER, upload_id)
+    os.makedirs(folder)
+
+    with open(os.path.join(folder, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"filename": filename, "size": size}, f)
+
+    open(os.path.join(folder, "data"), "wb").close()
 
-    # Guarda la imagen en el sistema de archivo.
-    with open(image_path, "wb") as image_file:
-        image_file.write(await file.read())
+    return {"upload_id": upload_id, "filename": filename, "offset": 0, "size": size}
+
+def get_upload(upload_id: str, upload_folder = settings.UPLOAD_FOLDER) -> dict:
+    """
+    Consulta el estado de una subida por partes.
+
+    Parámetros:
+        upload_id (str): Identificador de la subida.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+
+    Retorna:
+        dict: Estado de la subida, con los bytes recibidos hasta el momento en "offset".
+
+    Lanza:
+        UploadNotFoundError: Si la subida no existe.
+    """
+    folder = _upload_folder(upload_id, upload_folder)
+
+    with open(os.path.join(folder, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    return {
+        "upload_id": os.path.basename(folder),
+        "filename": meta["filename"],
+        "offset": os.path.getsize(os.path.join(folder, "data")),
+        "size": meta["size"]
+    }
+
+async def append_upload(upload_id: str, offset: int, chunks, upload_folder = settings.UPLOAD_FOLDER) -> dict:
+    """
+    Añade una parte a una subida. La parte se escribe por bloques según llega.
+
+    Parámetros:
+        upload_id (str): Identificador de la subida.
+        offset (int): Posición del fichero en la que empieza la parte.
+        chunks: Iterador asíncrono con los bloques de bytes de la parte.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+
+    Retorna:
+        dict: Estado de la subida tras añadir la parte.
+
+    Lanza:
+        UploadNotFoundError: Si la subida no existe.
+        UploadOffsetError: Si la parte no empieza donde termina lo recibido.
+        FileTooLargeError: Si se supera el tamaño indicado al iniciar la subida o el máximo para su tipo.
+    """
+    async with _locked_upload(upload_id, upload_folder) as folder:
+        upload = await asyncio.to_thread(get_upload, upload_id, upload_folder)
+
+        if offset != upload["offset"]:
+            raise UploadOffsetError(upload["offset"])
+
+        limit = max_size(upload["filename"])
+        if upload["size"] is not None:
+            limit = min(limit, upload["size"])
+
+        upload["offset"] = await _copy_chunks(chunks, os.path.join(folder, "data"), limit)
+
+    return upload
+
+async def complete_upload(upload_id: str, upload_folder = settings.UPLOAD_FOLDER) -> str:
+    """
+    Termina una subida por partes y mueve el contenido recibido al almacenamiento de archivos, sin cargarlo en memoria.
+
+    Parámetros:
+        upload_id (str): Identificador de la subida.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+
+    Retorna:
+        str: Nombre del archivo guardado, junto a su extensión original.
+
+    Lanza:
+        UploadNotFoundError: Si la subida no existe.
+        UploadOffsetError: Si no se han recibido todos los bytes indicados al iniciar la subida.
+    """
+    async with _locked_upload(upload_id, upload_folder) as folder:
+        upload = await asyncio.to_thread(get_upload, upload_id, upload_folder)
+
+        if upload["size"] is not None and upload["offset"] != upload["size"]:
+            raise UploadOffsetError(upload["offset"])
+
+        filename = await asyncio.to_thread(store, os.path.join(folder, "data"), upload["filename"], None, upload_folder)
+        await asyncio.to_thread(shutil.rmtree, folder, True)
 
     return filename
 
+def abort_upload(upload_id: str, upload_folder = settings.UPLOAD_FOLDER):
+    """
+    Cancela una subida por partes y elimina lo recibido.
+
+    Parámetros:
+        upload_id (str): Identificador de la subida.
+        upload_folder (str): Ruta donde se almacenan los archivos.
+
+    Lanza:
+        UploadNotFoundError: Si la subida no existe.
+    """
+    folder = _upload_folder(upload_id, upload_folder)
+    fd = _lock_upload(folder)
+
+    try:
+        shutil.rmtree(folder, ignore_errors=True)
+    finally:
+        os.close(fd)
+
 def createFile(upload_folder= settings.UPLOAD_FOLDER) -> str:
     """
     Creación de un nuevo fichero de texto vacío.
@@ -40,7 +577,8 @@ def createFile(upload_folder= settings.UPLOAD_FOLDER) -> str:
         Nombre del nuevo fichero de texto
     """
     filename = f"{uuid4()}.txt"
-    path = os.path.join(upload_folder, filename)
+    path = file_store.shard_path(filename, upload_folder)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
 
     with open(path, "w", encoding="utf-8") as f:
         f.write("")
@@ -50,6 +588,7 @@ def createFile(upload_folder= settings.UPLOAD_FOLDER) -> str:
 def delete(filename: str, upload_folder = settings.UPLOAD_FOLDER):
     """
     Elimina un archivo (por ejemplo, una imagen) del servidor si existe.
+    Si el archivo está compartido con otras subidas iguales, solo se elimina cuando nadie más lo usa.
 
     Parámetros:
         filename (str): Nombre del archivo que se desea eliminar.
@@ -60,22 +599,48 @@ def delete(filename: str, upload_folder = settings.UPLOAD_FOLDER):
         None
     """
     if(filename.strip() != ""):
-        path = os.path.join(upload_folder,filename)
-        
-        if os.path.exists(path):
-            os.remove(path)
+        try:
+            storage_for(filename, upload_folder).delete(filename)
+        except FileNotFoundError:
+            pass
+
+def release_duplicate(filename: str, in_use: int, upload_folder = settings.UPLOAD_FOLDER):
+    """
+    Elimina la referencia que añadió la subida de un fichero que ya tenía asignado el registro que se actualiza,
+    por ejemplo al volver a subir el mismo avatar. Los clientes también envían el nombre actual cuando no ha cambiado,
+    así que solo se elimina si el fichero tiene más referencias que registros que lo usan.
+
+    Parámetros:
+        filename (str): Nombre del archivo.
+        in_use (int): Número de registros que usan el archivo.
+        upload_folder (str): Ruta del directorio donde se almacenan los archivos.
+    """
+    if filename.strip() == "":
+        return
 
-async def update(file_path: str, file):
+    try:
+        storage = storage_for(filename, upload_folder)
+        if storage.references(filename) > in_use:
+            storage.delete(filename)
+    except FileNotFoundError:
+        pass
+
+async def update(file_path: str, chunks):
     """
-    Actualiza el fichero concreto.
+    Actualiza el fichero concreto. El contenido se escribe en un fichero temporal y se sustituye al terminar,
+    para que nadie lea el fichero a medio escribir y no se pierda si la subida falla.
 
     Parámetros:
-        file (UploadFile): Archivo recibido por parte de la aplicación.
         file_path (str): Ruta donde se almacena el archivo.
+        chunks: Iterador asíncrono con los bloques de bytes del archivo (ver `form_file`).
+
+    Lanza:
+        FileTooLargeError: Si el archivo supera el tamaño máximo para su tipo.
     """
-    with open(file_path,"wb") as f:
-        content = await file.read()
-        f.write(content)
+    tmp_path = f"{file_path}.{uuid4()}.tmp"
+
+    await write_stream(chunks, tmp_path, max_size(file_path))
+    await asyncio.to_thread(os.replace, tmp_path, file_path)
 
 async def cleanup_temp_files(files: list[str], upload_folder: str):
     """
@@ -0,0 +1,141 @@
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+class LazyModel:
+    """
+    Referencia a un modelo que se carga la primera vez que se usa en lugar de al importar el módulo,
+    de forma que los procesos que no transcriben ni resumen no cargan los pesos en memoria.
+    Si se indica un tiempo de inactividad, el modelo se descarga cuando pasa ese tiempo sin usarse
+    y se vuelve a cargar en el siguiente uso. Mientras algún método del modelo se está ejecutando
+    (o dentro de un bloque `use`) el modelo está en uso y no se descarga.
+    """
+    def __init__(self, factory, name: str, idle_seconds: int = 0):
+        self._factory = factory
+        self._name = name
+        self._idle_seconds = idle_seconds
+        self._instance = None
+        self._last_used = 0.0
+        self._users = 0
+        self._lock = threading.Lock()
+        # Avisa a `unload` cuando el modelo deja de estar en uso.
+        self._released = threading.Condition(self._lock)
+        self._watcher = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def _load(self):
+        """
+        Carga el modelo si todavía no está cargado. Se llama con el bloqueo adquirido.
+        """
+        if self._instance is None:
+            start = time.perf_counter()
+            self._instance = self._factory()
+            print(f"Modelo {self._name} cargado en {time.perf_counter() - start:.1f} s")
+
+            if self._idle_seconds > 0 and self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, daemon=True)
+                self._watcher.start()
+
+        self._last_used = time.monotonic()
+
+        return self._instance
+
+    def load(self):
+        """
+        Carga el modelo si todavía no está cargado.
+
+        Retorna:
+            Instancia del modelo.
+        """
+        with self._lock:
+            return self._load()
+
+    @contextmanager
+    def use(self):
+        """
+        Carga el modelo y lo marca como en uso mientras dura el bloque, para que no se descargue aunque
+        pase el tiempo de inactividad entre varias llamadas:
+
+            with summarizer_instance.use() as model:
+                model.generate(prompt)
+
+        Retorna:
+            Instancia del modelo.
+        """
+        with self._lock:
+            instance = self._load()
+            self._users += 1
+
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                self._users -= 1
+                self._last_used = time.monotonic()
+                self._released.notify_all()
+
+    def unload(self, only_idle: bool = False):
+        """
+        Descarga el modelo, cerrándolo antes si tiene un método `close`. Si está en uso, espera a que termine.
+
+        Parámetros:
+            only_idle: Si es True, solo se descarga si no está en uso y lleva `idle_seconds` segundos sin usarse. Se comprueba
+                con el mismo bloqueo con el que se descarga, para no cerrar un modelo que se acaba de pedir con `load` o `use`.
+        """
+        with self._lock:
+            if only_idle and (self._users > 0 or time.monotonic() - self._last_used <= self._idle_seconds):
+                return
+
+            while self._users > 0:
+                self._released.wait()
+
+            instance, self._instance = self._instance, None
+
+        if instance is None:
+            return
+
+        close = getattr(instance, "close", None)
+        if close is not None:
+            close()
+
+        print(f"Modelo {self._name} descargado")
+
+    def _watch(self):
+        """
+        Bucle del hilo que descarga el modelo tras `idle_seconds` segundos sin usarse.
+        """
+        while True:
+            time.sleep(min(self._idle_seconds, 30))
+
+            with self._lock:
+                if self._instance is None:
+                    self._watcher = None
+                    return
+
+            self.unload(only_idle=True)
+
+    def __getattr__(self, name: str):
+        # Solo se llama con los atributos que no son de esta clase, es decir, los del modelo.
+        # Los métodos se devuelven envueltos para que el modelo esté en uso durante toda la llamada,
+        # incluidas las llamadas que el propio modelo hace a otros de sus métodos.
+        attribute = getattr(self.load(), name)
+
+        if not callable(attribute):
+            return attribute
+
+        if inspect.iscoroutinefunction(attribute):
+            async def call_async(*args, **kwargs):
+                with self.use() as instance:
+                    return await getattr(instance, name)(*args, **kwargs)
+
+            return call_async
+
+        def call(*args, **kwargs):
+            with self.use() as instance:
+                return getattr(instance, name)(*args, **kwargs)
+
+        return call
@@ -0,0 +1,174 @@
+import numpy as np
+from config import Settings, settings
+from aux_func.whisper_singleton import whisper_instance
+from aux_func.transcription_model import SAMPLING_RATE, save_transcription, get_rolling_summary, finish_rolling_summary
+from aux_func.text_cleaner import TextCleaner
+from aux_func.file_store import file_path
+from aux_func.name_index import NameIndex
+
+class AudioRingBuffer:
+    """
+    Buffer circular de muestras de capacidad fija.
+    Las posiciones son absolutas (muestras recibidas desde el inicio de la sesión),
+    y cuando se llena se sobrescriben las muestras más antiguas.
+    """
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.start = 0
+        self.end = 0
+
+    def write(self, samples: np.ndarray):
+        """
+        Añade muestras al final del buffer.
+
+        Parámetros:
+            samples: Muestras a añadir.
+        """
+        count = len(samples)
+        samples = samples[-self.capacity:]
+        position = (self.end + count - len(samples)) % self.capacity
+        first = min(len(samples), self.capacity - position)
+
+        self._data[position:position + first] = samples[:first]
+        self._data[:len(samples) - first] = samples[first:]
+
+        self.end += count
+        self.start = max(self.start, self.end - self.capacity)
+
+    def read(self, start: int) -> np.ndarray:
+        """
+        Copia las muestras desde la posición absoluta indicada hasta el final.
+
+        Parámetros:
+            start: Posición absoluta desde la que se lee.
+
+        Retorna:
+            Muestras disponibles desde esa posición.
+        """
+        start = max(start, self.start)
+        indexes = np.arange(start, self.end) % self.capacity
+
+        return self._data[indexes]
+
+class LiveTranscriber:
+    """
+    Transcripción en directo de una sesión a partir de fragmentos de audio del micrófono.
+    Whisper se ejecuta sobre una ventana deslizante con el audio aún no confirmado; solo se escriben en la nota
+    los fragmentos que terminan antes del margen final de la ventana, ya que los últimos segundos pueden cambiar
+    cuando llegue más audio. Si se indica una nota de resumen, el resumen se va actualizando con el texto confirmado.
+    """
+    def __init__(self, name_index: NameIndex, file: str, summary: str = None, upload_folder: str = Settings.UPLOAD_FOLDER):
+        self.file_path = file_path(file, upload_folder)
+        self.summary = summary
+        self.upload_folder = upload_folder
+        self.rolling = get_rolling_summary(summary) if summary else None
+        self.cleaner = TextCleaner(name_index)
+
+        self.window = settings.LIVE_WINDOW_SECONDS * SAMPLING_RATE
+        self.step = settings.LIVE_STEP_SECONDS * SAMPLING_RATE
+        self.margin = settings.LIVE_STABLE_SECONDS
+
+        self.buffer = AudioRingBuffer(self.window)
+        # Byte suelto de un fragmento con un número impar de bytes, que se une al siguiente.
+        self.pending = b""
+        self.committed = 0
+        self.last_run = 0
+
+    async def feed(self, pcm: bytes) -> str:
+        """
+        Añade un fragmento de audio y, si ha llegado suficiente audio nuevo, transcribe la ventana.
+
+        Parámetros:
+            pcm: Audio PCM de 16 bits, mono y a 16 kHz.
+
+        Retorna:
+            Texto confirmado y escrito en la nota con este fragmento (puede estar vacío).
+        """
+        # Los fragmentos pueden cortar una muestra por la mitad.
+        pcm = self.pending + pcm
+        cut = len(pcm) - len(pcm) % 2
+        self.pending = pcm[cut:]
+
+        samples = np.frombuffer(pcm[:cut], dtype=np.int16).astype(np.float32) / 32768.0
+        self.buffer.write(samples)
+
+        if self.buffer.end - self.last_run < self.step:
+            return ""
+
+        return await self._run(final=False)
+
+    async def close(self) -> str:
+        """
+        Transcribe y confirma todo el audio pendiente al terminar la sesión y guarda el resumen.
+
+        Retorna:
+            Texto confirmado y escrito en la nota.
+        """
+        text = await self._run(final=True)
+
+        # Las últimas palabras se quedan en la limpieza hasta que se sabe que no hay más texto.
+        tail = await self._write(self.cleaner.finish())
+        text = " ".join(part for part in (text, tail) if part)
+
+        if self.rolling is not None:
+            await finish_rolling_summary(self.rolling, self.summary, self.upload_folder)
+
+        return text
+
+    async def _run(self, final: bool) -> str:
+        """
+        Transcribe el audio no confirmado y escribe en la nota la parte estable.
+
+        Parámetros:
+            final: Indica si es la última pasada, en cuyo caso se confirma todo.
+
+        Retorna:
+            Texto confirmado en esta pasada.
+        """
+        self.last_run = self.buffer.end
+        start = max(self.committed, self.buffer.start)
+        audio = self.buffer.read(start)
+
+        if len(audio) == 0:
+            return ""
+
+        result = await whisper_instance.transcribe_async({"raw": audio, "sampling_rate": SAMPLING_RATE})
+        chunks = result.get("chunks", [])
+
+        # Si el audio pendiente ya ocupa casi toda la ventana, se confirma para no perder audio del buffer.
+        full = len(audio) >= self.window - self.step
+        limit = float("inf") if final else len(audio) / SAMPLING_RATE - self.margin
+
+        stable = [chunk for chunk in chunks if chunk["timestamp"][1] is not None and chunk["timestamp"][1] <= limit]
+
+        if final or (full and not stable):
+            stable = chunks
+
+        if not stable:
+            return ""
+
+        end = stable[-1]["timestamp"][1]
+        self.committed = self.buffer.end if end is None or final else start + int(end * SAMPLING_RATE)
+
+        text = " " + "".join(chunk["text"] for chunk in stable)
+
+        return await self._write(self.cleaner.feed(text))
+
+    async def _write(self, clean_text: str) -> str:
+        """
+        Añade a la nota el texto limpio y lo incorpora al resumen.
+
+        Parámetros:
+            clean_text: Texto limpio.
+
+        Retorna:
+            El mismo texto.
+        """
+        if clean_text:
+            await save_transcription(clean_text, self.file_path)
+
+            if self.rolling is not None:
+                await self.rolling.add(clean_text)
+
+        return clean_text
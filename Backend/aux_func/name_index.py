@@ -0,0 +1,65 @@
+from Levenshtein import distance
+
+class NameIndex:
+    """
+    Índice de los nombres de los personajes para corregir palabras mal transcritas.
+    Los nombres en minúsculas se agrupan por longitud: la distancia de Levenshtein nunca es menor que la diferencia
+    de longitudes, así que cada palabra solo se compara con los nombres cuya longitud difiere en `max_distance`
+    o menos, y la distancia se calcula con un límite para que se corte en cuanto lo supera.
+    Las palabras ya consultadas se guardan para no volver a buscarlas.
+    Con las decenas de nombres de una campaña esto es más rápido que un BK-tree, cuyo recorrido en Python
+    cuesta más que las distancias que se ahorra (ver `benchmarks/name_index.py`).
+    """
+    # Número de palabras que se recuerdan antes de vaciar la memoria de consultas.
+    MEMO_SIZE = 100000
+
+    def __init__(self, names: list[str], max_distance: int = 2):
+        self.names = names
+        self.max_distance = max_distance
+        self._memo = {}
+
+        # Nombres en minúsculas agrupados por longitud, con su posición en la lista original.
+        self._by_length = {}
+        for position, name in enumerate(names):
+            key = name.lower()
+            self._by_length.setdefault(len(key), []).append((position, key))
+
+    def _search(self, word: str) -> str:
+        """
+        Busca el nombre más cercano a la palabra. Si hay empate gana el que aparece antes en la lista de nombres.
+
+        Parámetros:
+            word: Palabra en minúsculas.
+
+        Retorna:
+            Nombre más cercano, o None si ninguno está a `max_distance` o menos.
+        """
+        best = None
+
+        for length in range(len(word) - self.max_distance, len(word) + self.max_distance + 1):
+            for position, key in self._by_length.get(length, ()):
+                dist = distance(word, key, score_cutoff=self.max_distance)
+
+                if dist <= self.max_distance and (best is None or (dist, position) < best):
+                    best = (dist, position)
+
+        return None if best is None else self.names[best[1]]
+
+    def correct(self, word: str) -> str:
+        """
+        Sustituye la palabra por el nombre de personaje más parecido, si hay alguno suficientemente cerca.
+
+        Parámetros:
+            word: Palabra de la transcripción.
+
+        Retorna:
+            Nombre del personaje, o la palabra original si no se parece a ninguno.
+        """
+        lower = word.lower()
+
+        if lower not in self._memo:
+            if len(self._memo) >= self.MEMO_SIZE:
+                self._memo.clear()
+            self._memo[lower] = self._search(lower)
+
+        return self._memo[lower] or word
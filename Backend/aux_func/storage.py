@@ -0,0 +1,402 @@
+import os
+import time
+import mimetypes
+from typing import Iterator, NamedTuple
+from config import settings
+from aux_func import file_store
+
+# Almacenamiento de los ficheros subidos.
+# Todas las operaciones sobre los ficheros guardados pasan por un `Storage`, de forma que se pueden guardar
+# en el disco local (`LocalStorage`) o en un servicio compatible con S3 (`S3Storage`) compartido por
+# varios nodos de la API. Con S3 las descargas se redirigen a URLs firmadas y los bytes no pasan por Python.
+
+# Tamaño de los bloques que se leen en cada lectura.
+CHUNK_SIZE = 1024 * 1024
+
+class StoredFile(NamedTuple):
+    """
+    Información de un fichero guardado.
+
+    Attributes:
+        size (int): Tamaño en bytes.
+        mtime (float): Fecha de la última modificación, en segundos desde epoch.
+        etag (str): Identificador de la versión del contenido, entre comillas como en la cabecera ETag.
+    """
+    size: int
+    mtime: float
+    etag: str
+
+class Storage:
+    """
+    Interfaz de los almacenamientos de ficheros. Los métodos son bloqueantes, así que desde el bucle de eventos
+    se llaman con `asyncio.to_thread`.
+    """
+    def put(self, tmp_path: str, name: str, shared: bool = False) -> str:
+        """
+        Guarda el contenido de un fichero temporal, que deja de existir.
+
+        Parámetros:
+            tmp_path (str): Ruta del fichero temporal con el contenido.
+            name (str): Nombre con el que se guarda.
+            shared (bool): Indica si el nombre es el hash del contenido y se comparte entre todas las subidas iguales.
+
+        Retorna:
+            str: Nombre del fichero guardado.
+        """
+        raise NotImplementedError
+
+    def open(self, name: str, start: int = 0, end: int = None) -> Iterator[bytes]:
+        """
+        Lee por bloques un fichero guardado.
+
+        Parámetros:
+            name (str): Nombre del fichero.
+            start (int): Primer byte que se lee.
+            end (int): Último byte que se lee (incluido). Si no se indica, se lee hasta el final.
+
+        Retorna:
+            Iterator[bytes]: Bloques del contenido.
+
+        Lanza:
+            FileNotFoundError: Si el fichero no existe.
+        """
+        raise NotImplementedError
+
+    def delete(self, name: str):
+        """
+        Elimina un fichero. Los compartidos solo se eliminan cuando no los usa nadie más.
+
+        Parámetros:
+            name (str): Nombre del fichero.
+        """
+        raise NotImplementedError
+
+    def references(self, name: str) -> int:
+        """
+        Número de referencias de un fichero. Los ficheros que no son compartidos tienen una si existen.
+
+        Parámetros:
+            name (str): Nombre del fichero.
+
+        Retorna:
+            int: Número de referencias.
+        """
+        raise NotImplementedError
+
+    def stat(self, name: str) -> StoredFile:
+        """
+        Obtiene el tamaño, la fecha de modificación y el ETag de un fichero.
+
+        Parámetros:
+            name (str): Nombre del fichero.
+
+        Retorna:
+            StoredFile: Información del fichero.
+
+        Lanza:
+            FileNotFoundError: Si el fichero no existe.
+        """
+        raise NotImplementedError
+
+    def presign(self, name: str, expires: int = None) -> str:
+        """
+        URL firmada con la que los clientes pueden descargar el fichero directamente del almacenamiento.
+
+        Parámetros:
+            name (str): Nombre del fichero.
+            expires (int): Segundos de validez de la URL.
+
+        Retorna:
+            str: URL de descarga, o None si el almacenamiento no permite descargas directas.
+        """
+        return None
+
+    def path(self, name: str) -> str:
+        """
+        Ruta del fichero en el disco local, para servirlo o procesarlo sin copiarlo.
+
+        Parámetros:
+            name (str): Nombre del fichero.
+
+        Retorna:
+            str: Ruta del fichero, o None si no está en el disco local.
+        """
+        return None
+
+class LocalStorage(Storage):
+    """
+    Almacenamiento en el disco local, repartido en carpetas y con los ficheros compartidos por contenido (ver `file_store`).
+    """
+    def __init__(self, upload_folder: str = settings.UPLOAD_FOLDER):
+        self.upload_folder = upload_folder
+
+    def put(self, tmp_path: str, name: str, shared: bool = False) -> str:
+        if shared:
+            return file_store.put_shared(tmp_path, name, self.upload_folder)
+
+        return file_store.put(tmp_path, name, self.upload_folder)
+
+    def open(self, name: str, start: int = 0, end: int = None) -> Iterator[bytes]:
+        with open(self.path(name), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+
+            while remaining is None or remaining > 0:
+                chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, name: str):
+        file_store.release(name, self.upload_folder)
+
+    def references(self, name: str) -> int:
+        return file_store.references(name, self.upload_folder)
+
+    def stat(self, name: str) -> StoredFile:
+        stat = os.stat(self.path(name))
+
+        # El tamaño y la fecha de modificación cambian cada vez que se escribe el fichero.
+        return StoredFile(stat.st_size, stat.st_mtime, f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"')
+
+    def path(self, name: str) -> str:
+        return file_store.file_path(name, self.upload_folder)
+
+class S3Storage(Storage):
+    """
+    Almacenamiento en un bucket de un servicio compatible con S3 (AWS S3, MinIO...).
+    Los ficheros compartidos llevan la cuenta de sus referencias en un objeto "<prefijo>.refs/<nombre>", que se
+    actualiza con escrituras condicionales (If-Match / If-None-Match): si otro nodo lo ha cambiado entre la lectura
+    y la escritura, la escritura falla y se vuelve a intentar. Cuando se elimina la última referencia, el contador
+    se deja a 0 mientras se borra el fichero, y las subidas que lo encuentran así esperan a que termine el borrado.
+
+    El cliente se crea con boto3 la primera vez que se usa, salvo que se pase uno con la misma interfaz
+    (por ejemplo, `FakeS3Client` de tests/fake_s3.py para las pruebas).
+    """
+    # Segundos tras los que un contador a 0 se considera de un borrado que no terminó (por ejemplo, porque el nodo cayó).
+    DELETE_TIMEOUT = 300
+    # Segundos que se espera antes de volver a leer un contador que se está borrando.
+    RETRY_SECONDS = 0.1
+
+    def __init__(self, bucket: str, prefix: str = "", client=None, endpoint_url: str = None, region: str = None,
+                 presign_seconds: int = 3600):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url or None
+        self.region = region or None
+        self.presign_seconds = presign_seconds
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Se importa aquí para que boto3 solo sea necesario si se usa este almacenamiento.
+            import boto3
+
+            # Las credenciales se toman de las variables de entorno habituales de AWS.
+            self._client = boto3.client("s3", endpoint_url=self.endpoint_url, region_name=self.region)
+
+        return self._client
+
+    def _key(self, name: str) -> str:
+        file_store.check_name(name)
+
+        return f"{self.prefix}{name}"
+
+    def _refs_key(self, name: str) -> str:
+        # Los nombres no pueden empezar por "." ni contener "/", así que ningún fichero coincide con un contador.
+        file_store.check_name(name)
+
+        return f"{self.prefix}.refs/{name}"
+
+    @staticmethod
+    def _error_code(error) -> str:
+        return error.response.get("Error", {}).get("Code")
+
+    def _request(self, method: str, key: str, **kwargs) -> dict:
+        """
+        Llama a una operación del cliente sobre un objeto del bucket.
+
+        Lanza:
+            FileNotFoundError: Si el objeto no existe.
+        """
+        try:
+            return getattr(self.client, method)(Bucket=self.bucket, Key=key, **kwargs)
+        except self.client.exceptions.ClientError as e:
+            if self._error_code(e) in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(key)
+            raise
+
+    def _read_refs(self, name: str) -> tuple:
+        """
+        Lee el contador de referencias de un fichero compartido.
+
+        Retorna:
+            tuple: Referencias, ETag del contador y fecha de su última modificación, o (None, None, None) si no existe.
+        """
+        try:
+            response = self._request("get_object", self._refs_key(name))
+        except FileNotFoundError:
+            return None, None, None
+
+        with response["Body"] as body:
+            refs = int(body.read())
+
+        return refs, response["ETag"], response["LastModified"].timestamp()
+
+    def _write_refs(self, name: str, refs: int, etag: str) -> bool:
+        """
+        Escribe el contador de referencias solo si no ha cambiado desde que se leyó.
+
+        Parámetros:
+            name (str): Nombre del fichero.
+            refs (int): Nuevo número de referencias.
+            etag (str): ETag leído del contador, o None si no existía.
+
+        Retorna:
+            bool: True si se ha escrito, False si otro nodo lo ha cambiado antes.
+        """
+        condition = {"IfMatch": etag} if etag is not None else {"IfNoneMatch": "*"}
+
+        try:
+            self._request("put_object", self._refs_key(name), Body=str(refs).encode(), **condition)
+        except FileNotFoundError:
+            # Con If-Match, el contador se ha eliminado después de leerlo.
+            return False
+        except self.client.exceptions.ClientError as e:
+            if self._error_code(e) in ("PreconditionFailed", "412", "ConditionalRequestConflict", "409"):
+                return False
+            raise
+
+        return True
+
+    def _add_ref(self, name: str) -> int:
+        """
+        Añade una referencia a un fichero compartido.
+
+        Retorna:
+            int: Referencias que tenía antes. Con 0, el fichero no existe y hay que subirlo.
+        """
+        while True:
+            refs, etag, modified = self._read_refs(name)
+
+            if refs == 0 and time.time() - modified < self.DELETE_TIMEOUT:
+                time.sleep(self.RETRY_SECONDS)
+                continue
+
+            if self._write_refs(name, (refs or 0) + 1, etag):
+                return refs or 0
+
+    def _remove_ref(self, name: str) -> bool:
+        """
+        Elimina una referencia de un fichero compartido.
+
+        Retorna:
+            bool: True si era la última, en cuyo caso el contador queda a 0 y hay que borrar el fichero.
+        """
+        while True:
+            refs, etag, _ = self._read_refs(name)
+
+            if not refs:
+                return False
+
+            if self._write_refs(name, refs - 1, etag):
+                return refs == 1
+
+    def _exists(self, name: str) -> bool:
+        try:
+            self._request("head_object", self._key(name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def put(self, tmp_path: str, name: str, shared: bool = False) -> str:
+        try:
+            if shared and self._add_ref(name) > 0 and self._exists(name):
+                return name
+
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+            try:
+                self.client.upload_file(tmp_path, self.bucket, self._key(name), ExtraArgs={"ContentType": content_type})
+            except BaseException:
+                # La referencia solo se mantiene si el fichero se ha llegado a subir.
+                if shared and self._remove_ref(name):
+                    self.client.delete_object(Bucket=self.bucket, Key=self._refs_key(name))
+                raise
+        finally:
+            os.remove(tmp_path)
+
+        return name
+
+    def open(self, name: str, start: int = 0, end: int = None) -> Iterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+
+        response = self._request("get_object", self._key(name), Range=byte_range)
+        body = response["Body"]
+        try:
+            while chunk := body.read(CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    def delete(self, name: str):
+        refs, _, _ = self._read_refs(name)
+
+        # Los ficheros sin contador no son compartidos y se eliminan directamente.
+        if refs is None:
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+            return
+
+        if self._remove_ref(name):
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+            self.client.delete_object(Bucket=self.bucket, Key=self._refs_key(name))
+
+    def references(self, name: str) -> int:
+        refs, _, _ = self._read_refs(name)
+
+        if refs is None:
+            return 1 if self._exists(name) else 0
+
+        return refs
+
+    def stat(self, name: str) -> StoredFile:
+        head = self._request("head_object", self._key(name))
+
+        return StoredFile(head["ContentLength"], head["LastModified"].timestamp(), head["ETag"])
+
+    def presign(self, name: str, expires: int = None) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._key(name)},
+            ExpiresIn=expires or self.presign_seconds
+        )
+
+def _remote_storage() -> Storage:
+    """
+    Almacenamiento configurado en `settings.STORAGE_BACKEND` para los ficheros que no son notas.
+
+    Retorna:
+        Storage: Almacenamiento S3, o None si se usa el disco local.
+
+    Lanza:
+        ValueError: Si el almacenamiento configurado no existe.
+    """
+    if settings.STORAGE_BACKEND == "local":
+        return None
+
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            presign_seconds=settings.S3_PRESIGN_SECONDS
+        )
+
+    raise ValueError(f"Almacenamiento no soportado: {settings.STORAGE_BACKEND}")
+
+remote_storage = _remote_storage()
@@ -0,0 +1,235 @@
+import json
+import re
+from aux_func.name_index import NameIndex
+
+class _RepeatedCharacters:
+    """
+    Elimina caracteres repetidos (ej: YYYYYYYYYYYY o esteeeeeeeee) de un texto que llega por partes.
+    Se guarda la última racha de caracteres iguales, ya que puede continuar en la siguiente parte.
+    """
+    PATTERN = re.compile(r'(.)\1{5,}')
+    # Una racha de 6 caracteres o más queda igual que una más larga, así que no hace falta guardar más.
+    MAX_RUN = 6
+
+    def __init__(self, tail: str = ""):
+        self.tail = tail
+
+    def feed(self, text: str) -> str:
+        text = self.tail + text
+        start = len(text)
+
+        while start > 0 and text[start - 1] == text[-1]:
+            start -= 1
+
+        self.tail = text[start:]
+        if text[-1:] != "\n":
+            self.tail = self.tail[:self.MAX_RUN]
+
+        return self.PATTERN.sub(r'\1', text[:start])
+
+    def finish(self, text: str = "") -> str:
+        text = self.tail + text
+        self.tail = ""
+
+        return self.PATTERN.sub(r'\1', text)
+
+class _RepeatedWords:
+    """
+    Elimina palabras repetidas seguidas (ej: si, si, si, si) de un texto que llega por partes.
+    El texto solo se procesa hasta el inicio de la última palabra B que no puede formar parte de una repetición
+    de la palabra anterior A, es decir, cuando entre ambas hay algo más que espacios y comas o B no empieza por A.
+    """
+    PATTERN = re.compile(r'(\b\w+\b)(?:[\s,]+(?:\1))+')
+    WORD = re.compile(r'\w+')
+    SEPARATOR = re.compile(r'[\s,]+')
+
+    def __init__(self, buffer: str = ""):
+        self.buffer = buffer
+
+    def feed(self, text: str) -> str:
+        text = self.buffer + text
+        cut = 0
+        previous = None
+
+        for word in self.WORD.finditer(text):
+            # La palabra tiene que estar completa para saber si empieza por la anterior.
+            if word.end() == len(text):
+                break
+
+            if previous is not None:
+                separator = text[previous.end():word.start()]
+                if not self.SEPARATOR.fullmatch(separator) or not word.group().startswith(previous.group()):
+                    cut = word.start()
+
+            previous = word
+
+        self.buffer = text[cut:]
+
+        return self.PATTERN.sub(r'\1', text[:cut])
+
+    def finish(self, text: str = "") -> str:
+        text = self.buffer + text
+        self.buffer = ""
+
+        return self.PATTERN.sub(r'\1', text)
+
+class _RepeatedPhrases:
+    """
+    Elimina secuencias de palabras repetidas consecutivas de un texto que llega por partes.
+    Solo se decide sobre una palabra cuando se conocen las `2 * max_ngram` siguientes, y si se está saltando
+    una repetición se recuerda su tamaño. Un bloque de n palabras solo puede repetirse si la palabra n posiciones
+    más adelante es igual a la primera, así que se comprueba eso antes de comparar los bloques como sublistas.
+    """
+    def __init__(self, max_ngram: int, partial: str = "", words: list[str] = None, skip: int = 0):
+        self.max_ngram = max_ngram
+        self.partial = partial
+        self.words = words or []
+        self.skip = skip
+
+    def _process(self, final: bool) -> list[str]:
+        """
+        Procesa las palabras pendientes hasta donde es posible sin conocer las siguientes.
+
+        Parámetros:
+            final: Indica si ya no van a llegar más palabras.
+
+        Retorna:
+            Palabras que quedan tras eliminar las repeticiones.
+        """
+        words = self.words
+        total = len(words)
+        i = 0
+        result = []
+
+        while i < total:
+            if self.skip:
+                n = self.skip
+
+                if i + 2 * n > total and not final:
+                    break
+
+                if words[i:i+n] == words[i+n:i+2*n]:
+                    i += n
+                    continue
+
+                result.extend(words[i:i+n])
+                i += n
+                self.skip = 0
+                continue
+
+            if i + 2 * self.max_ngram > total and not final:
+                break
+
+            word = words[i]
+
+            for n in range(min(self.max_ngram, (total - i) // 2), 0, -1):
+                if words[i + n] == word and words[i:i+n] == words[i+n:i+2*n]:
+                    self.skip = n
+                    break
+            else:
+                result.append(word)
+                i += 1
+
+        self.words = words[i:]
+
+        return result
+
+    def _split(self, text: str):
+        text = self.partial + text
+        words = text.split()
+
+        # La última palabra puede continuar en la siguiente parte si el texto no termina en un espacio.
+        self.partial = words.pop() if words and not text[-1].isspace() else ""
+        self.words.extend(words)
+
+    def feed(self, text: str) -> list[str]:
+        self._split(text)
+
+        return self._process(final=False)
+
+    def finish(self, text: str = "") -> list[str]:
+        self._split(text)
+
+        if self.partial:
+            self.words.append(self.partial)
+            self.partial = ""
+
+        return self._process(final=True)
+
+def remove_repeated_phrases(text: str, max_ngram: int = 10) -> str:
+    """
+    Elimina secuencias de palabras repetidas consecutivas en el texto completo.
+
+    Parámetros:
+        text: Texto de entrada.
+        max_ngram: Número máximo de palabras en la secuencia que se analizará para repeticiones.
+
+    Retorna:
+        Texto sin repeticiones de frases o bloques cortos.
+    """
+    return ' '.join(_RepeatedPhrases(max_ngram).finish(text))
+
+class TextCleaner:
+    """
+    Limpieza de la transcripción por partes, con el mismo resultado que limpiar el texto completo de una vez:
+        1) Elimina caracteres repetidos.
+        2) Elimina palabras repetidas seguidas.
+        3) Elimina frases repetidas seguidas.
+        4) Corrige los nombres de los personajes.
+    Cada etapa guarda solo el final del texto que todavía puede cambiar con la siguiente parte,
+    por lo que la memoria no crece con la duración de la sesión. Las partes devueltas se unen con un espacio.
+    """
+    def __init__(self, name_index: NameIndex, max_ngram: int = 5, state: str = None):
+        self.name_index = name_index
+
+        saved = json.loads(state) if state else {}
+        self._characters = _RepeatedCharacters(saved.get("characters", ""))
+        self._words = _RepeatedWords(saved.get("words", ""))
+        self._phrases = _RepeatedPhrases(max_ngram, saved.get("partial", ""), saved.get("phrases"), saved.get("skip", 0))
+
+    def state(self) -> str:
+        """
+        Estado de la limpieza, para poder continuarla tras reanudar una transcripción.
+
+        Retorna:
+            Texto pendiente de cada etapa en JSON.
+        """
+        return json.dumps({
+            "characters": self._characters.tail,
+            "words": self._words.buffer,
+            "partial": self._phrases.partial,
+            "phrases": self._phrases.words,
+            "skip": self._phrases.skip
+        }, ensure_ascii=False)
+
+    def feed(self, text: str) -> str:
+        """
+        Limpia una nueva parte del texto.
+
+        Parámetros:
+            text: Parte del texto, tal y como continúa a la anterior.
+
+        Retorna:
+            Texto limpio que ya no puede cambiar (puede estar vacío).
+        """
+        text = self._characters.feed(text)
+        text = self._words.feed(text)
+        words = self._phrases.feed(text)
+
+        return ' '.join(self.name_index.correct(word) for word in words)
+
+    def finish(self, text: str = "") -> str:
+        """
+        Limpia la última parte del texto y todo lo que quedaba pendiente.
+
+        Parámetros:
+            text: Última parte del texto.
+
+        Retorna:
+            Texto limpio restante.
+        """
+        text = self._characters.finish(text)
+        text = self._words.finish(text)
+        words = self._phrases.finish(text)
+
+        return ' '.join(self.name_index.correct(word) for word in words)
@@ -1,134 +1,415 @@
 import os
-from pydub import AudioSegment
-from config import Settings
+import subprocess
+import numpy as np
+from config import Settings, settings
 from sqlalchemy.orm import Session
-from db.character_crud import get_characters_by_campaign
-import torch
-from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
+from db.character_crud import get_name_index
 from aux_func.whisper_singleton import whisper_instance
-from aux_func.files_aux import delete, cleanup_temp_files
-from aux_func.Summarizer import summarizer_instance
+from aux_func.files_aux import delete, cleanup_temp_files, storage_for
+from aux_func.storage import Storage
+from aux_func import file_store
+from aux_func.Summarizer import summarizer_instance, RollingSummary, CachedSummarizer
+from aux_func.disk_cache import DiskCache, hash_chunks, make_key
 import asyncio
 import aiofiles
 import re
-from Levenshtein import distance
+from bisect import bisect_right
+from contextlib import aclosing
+from collections import deque
+from aux_func.text_cleaner import TextCleaner
 
-def _convert_audio(audio: str, upload_folder = Settings.UPLOAD_FOLDER) -> str:
+# Frecuencia de muestreo con la que trabaja whisper.
+SAMPLING_RATE = 16000
+
+# Caché de la salida en bruto de whisper, para no volver a transcribir un audio que ya se ha subido.
+transcription_cache = DiskCache(settings.TRANSCRIPTION_CACHE_FOLDER, settings.TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024)
+summarizer = CachedSummarizer(summarizer_instance, DiskCache(settings.SUMMARY_CACHE_FOLDER, settings.SUMMARY_CACHE_MAX_MB * 1024 * 1024))
+
+def _decode_audio(audio_path: str, block_seconds: int = settings.DECODE_BLOCK_SECONDS):
     """
-    Transforma el audio del formato que tenía originalmente a .mp3 con un bitrate de 128k.
-    Este archvio auxiliar usará el siguiente nombre → mombre_audio_aux.mp3
+    Decodifica el audio original directamente a muestras mono de 16 kHz en coma flotante.
+    ffmpeg escribe el audio decodificado en una tubería y se va leyendo por bloques,
+    por lo que no se genera ningún fichero intermedio ni se carga el audio completo en memoria.
 
     Parámetros:
-        audio: Nombre del fichero de audio del que se quiere transformar a .mp3.
-        upload_folder: Donde se va a almacenar y obtener el fichero de audio.
+        audio_path: Ruta del fichero de audio.
+        block_seconds: Segundos de audio que se leen de la tubería en cada bloque.
 
     Retorna:
-        str: Nombre del audio transformado.
-    """
-    new_audio = os.path.splitext(audio)[0] + ".mp3"
-    old_path = os.path.join(upload_folder, audio)
-    new_path = os.path.join(upload_folder, new_audio)
+        Generador de bloques de muestras (np.float32).
 
-    sound = AudioSegment.from_file(old_path)
-    sound.export(new_path, format="mp3", bitrate="128k")
+    Lanza:
+        RuntimeError: Si ffmpeg no consigue decodificar el audio.
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", audio_path,
+        "-f", "f32le", "-ac", "1", "-ar", str(SAMPLING_RATE),
+        "pipe:1"
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    block_bytes = block_seconds * SAMPLING_RATE * np.dtype(np.float32).itemsize
+
+    try:
+        while data := process.stdout.read(block_bytes):
+            yield np.frombuffer(data, dtype=np.float32)
+
+        if process.wait() != 0:
+            raise RuntimeError(f"Error al decodificar el audio: {process.stderr.read().decode(errors='ignore')}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+def _probe_duration(audio_path: str) -> float:
+    """
+    Obtiene la duración del audio con ffprobe, sin decodificarlo.
 
-    return new_audio
+    Parámetros:
+        audio_path: Ruta del fichero de audio.
 
-def remove_repeated_phrases(text: str, max_ngram: int = 10) -> str:
+    Retorna:
+        Duración en segundos, o None si ffprobe no la puede determinar.
+    """
+    command = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        audio_path
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+def _audio_windows(blocks, window: int = settings.TRANSCRIPTION_WINDOW_SECONDS, overlap: int = settings.TRANSCRIPTION_OVERLAP_SECONDS):
     """
-    Elimina secuencias de palabras repetidas consecutivas en el texto.
+    Agrupa los bloques de muestras en ventanas solapadas.
+    Solo se mantiene en memoria la ventana actual y el bloque que se está leyendo.
 
     Parámetros:
-        text: Texto de entrada.
-        max_ngram: Número máximo de palabras en la secuencia que se analizará para repeticiones.
+        blocks: Iterable de bloques de muestras mono a 16 kHz.
+        window: Duración en segundos de cada ventana.
+        overlap: Segundos que se solapan dos ventanas consecutivas.
 
     Retorna:
-        Texto sin repeticiones de frases o bloques cortos.
+        Generador de tuplas (inicio de la ventana en segundos, muestras de la ventana, es la última ventana).
     """
-    words = text.split()
-    i = 0
-    result = []
-
-    while i < len(words):
-        found_repeat = False
+    window_samples = window * SAMPLING_RATE
+    step_samples = (window - overlap) * SAMPLING_RATE
 
-        for n in range(max_ngram, 0, -1):
-            if i + 2 * n <= len(words):
-                block = words[i:i+n]
-                next_block = words[i+n:i+2*n]
+    buffer = np.empty(0, dtype=np.float32)
+    offset = 0.0
 
-                if block == next_block:
-                    found_repeat = True
-                    while i + n < len(words) and words[i:i+n] == words[i+n:i+2*n]:
-                        i += n
-                    break
+    for block in blocks:
+        buffer = np.concatenate((buffer, block))
 
-        result.extend(words[i:i+n] if found_repeat else [words[i]])
-        i += n if found_repeat else 1
+        # Mientras haya muestras más allá de la ventana, esta no es la última.
+        while len(buffer) > window_samples:
+            yield offset, buffer[:window_samples], False
+            buffer = buffer[step_samples:]
+            offset += window - overlap
 
-    return ' '.join(result)
+    if len(buffer) > 0:
+        yield offset, buffer, True
 
-def text_cleanup(db: Session, id: int, text: str) -> str:
+class VoiceActivityDetector:
     """
-    Realiza la limpieza del texto pasado como parámetro, la limpieza consiste en lo siguiente:
-        1) Elimina palabras que estén repetidas (ej: si, si, si, si, si, ...)
-        2) Elimina caracteres repetidos (ej: YYYYYYYYYYYY o  esteeeeeeeee)
-        3) Corrige los nombres de los personajes (ej: Gol -> Gorl o Zephir -> Zephyr)
-    
-    Parámetros
-        db: Sesión de la base de datos
-        id: Identificador de la camapaña de la cual se obtendrán los personajes.
-        text: Texto de entrada que se quiere limpiar.
-
-    Retorna:
-        Texto corregido.
+    Detector de actividad de voz basado en la energía y la tasa de cruces por cero de tramas de 30 ms.
+    Elimina los silencios y el ruido de mesa antes de pasar el audio a whisper, y guarda la correspondencia
+    entre el audio compactado y el original para poder recuperar las marcas de tiempo reales.
+    """
+    FRAME_SECONDS = 0.03
+    # Energía mínima del ruido de fondo (-60 dBFS), evita umbrales nulos con silencio digital.
+    MIN_NOISE = 1e-6
+    # Factor por trama con el que sube la estimación del ruido de fondo (se duplica en unos 5 segundos).
+    NOISE_RISE = 1.0042
+
+    def __init__(self, energy_ratio: float = settings.VAD_ENERGY_RATIO, max_zcr: float = 0.4, hangover: float = 0.4, preroll: float = 0.2, sampling_rate: int = SAMPLING_RATE):
+        self.sampling_rate = sampling_rate
+        self.frame = int(sampling_rate * self.FRAME_SECONDS)
+        self.energy_ratio = energy_ratio
+        self.max_zcr = max_zcr
+        self.hangover_frames = int(round(hangover / self.FRAME_SECONDS))
+        self.preroll_frames = int(round(preroll / self.FRAME_SECONDS))
+
+        self.noise = None
+        self._compact_starts = []
+        self._original_starts = []
+
+    def _is_speech(self, energy: float, zcr: float) -> bool:
+        """
+        Decide si una trama contiene voz y actualiza la estimación del ruido de fondo.
+
+        Parámetros:
+            energy: Energía media de la trama.
+            zcr: Proporción de cruces por cero de la trama.
+
+        Retorna:
+            True si la trama supera el umbral de energía sobre el ruido y no parece ruido blanco.
+        """
+        if self.noise is None or energy < self.noise:
+            self.noise = energy
+        else:
+            self.noise *= self.NOISE_RISE
+
+        threshold = max(self.noise, self.MIN_NOISE) * self.energy_ratio
+
+        return energy > threshold and zcr < self.max_zcr
+
+    def filter(self, blocks):
+        """
+        Filtra los bloques de audio y deja pasar solo las zonas con voz.
+        Se añaden unas tramas antes y después de cada zona para no cortar el principio ni el final de las palabras.
+
+        Parámetros:
+            blocks: Iterable de bloques de muestras mono.
+
+        Retorna:
+            Generador de bloques que solo contienen las zonas con voz.
+        """
+        pending = np.empty(0, dtype=np.float32)
+        preroll = deque(maxlen=self.preroll_frames)
+        silence = self.hangover_frames + 1
+        active = False
+        frame_index = 0
+        emitted = 0
+
+        for block in blocks:
+            pending = np.concatenate((pending, block))
+            count = len(pending) // self.frame
+            if count == 0:
+                continue
+
+            frames = pending[:count * self.frame].reshape(count, self.frame)
+            pending = pending[count * self.frame:]
+
+            energies = np.mean(frames ** 2, axis=1)
+            zcrs = np.mean(np.diff(np.signbit(frames), axis=1), axis=1)
+
+            output = []
+            for i in range(count):
+                silence = 0 if self._is_speech(energies[i], zcrs[i]) else silence + 1
+
+                if silence <= self.hangover_frames:
+                    if not active:
+                        self._mark(emitted, frame_index - len(preroll))
+                        output.extend(preroll)
+                        emitted += len(preroll) * self.frame
+                        preroll.clear()
+                        active = True
+
+                    output.append(frames[i])
+                    emitted += self.frame
+                else:
+                    active = False
+                    preroll.append(frames[i])
+
+                frame_index += 1
+
+            if output:
+                yield np.concatenate(output)
+
+        if active and len(pending) > 0:
+            yield pending
+
+    def _mark(self, compact_sample: int, original_frame: int):
+        """
+        Registra el comienzo de una zona con voz.
+
+        Parámetros:
+            compact_sample: Posición, en muestras, de la zona dentro del audio compactado.
+            original_frame: Trama del audio original en la que empieza la zona.
+        """
+        self._compact_starts.append(compact_sample / self.sampling_rate)
+        self._original_starts.append(original_frame * self.frame / self.sampling_rate)
+
+    def to_original(self, seconds: float) -> float:
+        """
+        Traduce un instante del audio compactado al instante correspondiente del audio original.
+
+        Parámetros:
+            seconds: Instante en segundos dentro del audio compactado.
+
+        Retorna:
+            Instante en segundos dentro del audio original.
+        """
+        if seconds is None or not self._compact_starts:
+            return seconds
+
+        i = max(bisect_right(self._compact_starts, seconds) - 1, 0)
+
+        return self._original_starts[i] + seconds - self._compact_starts[i]
+
+def _stitch_window(result: dict, offset: float, is_last: bool, window: int = settings.TRANSCRIPTION_WINDOW_SECONDS, overlap: int = settings.TRANSCRIPTION_OVERLAP_SECONDS) -> list[dict]:
     """
-    characters = get_characters_by_campaign(db, id)
-    names = [character.name for character in characters if character.visibility]
+    Se queda con los fragmentos de la ventana que no pertenecen a la ventana anterior ni a la siguiente.
+    El solape se reparte por la mitad: cada fragmento se asigna a la ventana que contiene su punto medio.
 
-    #Quitar caracteres repetidos
-    text = re.sub(r'(.)\1{5,}', r'\1', text)
+    Parámetros:
+        result: Resultado de whisper para la ventana, con los fragmentos y sus marcas de tiempo.
+        offset: Inicio de la ventana en segundos.
+        is_last: Indica si es la última ventana del audio.
 
-    #Eliminar palabras repetidas que estén seguidas
-    text = re.sub(r'(\b\w+\b)(?:[\s,]+(?:\1))+', r'\1', text)
+    Retorna:
+        Fragmentos de la ventana sin el contenido duplicado del solape, con las marcas de tiempo
+        relativas al comienzo del audio.
+    """
+    low = 0 if offset == 0 else overlap / 2
+    high = float("inf") if is_last else window - overlap / 2
 
-    text = remove_repeated_phrases(text, max_ngram=5)
+    segments = []
+    for chunk in result.get("chunks", []):
+        start, end = chunk["timestamp"]
+        middle = start if end is None else (start + end) / 2
 
-    words = text.split()
-    corrected_words = []
+        if low <= middle < high:
+            segments.append({
+                "text": chunk["text"],
+                "timestamp": (offset + start, None if end is None else offset + end)
+            })
 
-    for word in words:
-        best_match = word
-        min_distance = float('inf')
+    return segments
 
-        for name in names:
-            dist = distance(word.lower(), name.lower())
-            if dist < min_distance and dist <= 2:
-                min_distance = dist
-                best_match = name
+def _to_original_timeline(segments: list[dict], vad: VoiceActivityDetector) -> list[dict]:
+    """
+    Traduce las marcas de tiempo de los fragmentos del audio sin silencios al audio original.
 
-        corrected_words.append(best_match)
+    Parámetros:
+        segments: Fragmentos con las marcas de tiempo del audio compactado.
+        vad: Detector de voz que ha compactado el audio.
 
-    text = ' '.join(corrected_words)
-    
-    return text
+    Retorna:
+        Fragmentos con las marcas de tiempo del audio original.
+    """
+    return [
+        {"text": segment["text"], "timestamp": tuple(vad.to_original(t) for t in segment["timestamp"])}
+        for segment in segments
+    ]
 
-def summarize(db: Session ,id: int, text: str, summary: str, upload_folder = Settings.UPLOAD_FOLDER):
+class SummaryWriter:
+    """
+    Escribe el resumen en su nota según se genera, agrupando los tokens en escrituras pequeñas.
+    Tras cada escritura se llama a `on_text` con el resumen escrito hasta el momento.
+    """
+    FLUSH_CHARS = 64
+
+    def __init__(self, file_path: str, on_text=None):
+        self.file_path = file_path
+        self.on_text = on_text
+        self.file = None
+        self.buffer = []
+        self.buffered = 0
+        self.written = []
+
+    def write(self, token: str):
+        """
+        Añade un token al buffer y lo escribe en el fichero si el buffer supera `FLUSH_CHARS` caracteres.
+
+        Parámetros:
+            token: Texto generado por el modelo.
+        """
+        self.buffer.append(token)
+        self.buffered += len(token)
+
+        if self.buffered >= self.FLUSH_CHARS:
+            self.flush()
+
+    def flush(self):
+        """
+        Escribe en el fichero el texto del buffer.
+        """
+        if not self.buffer:
+            return
+
+        if self.file is None:
+            self.file = open(self.file_path, "a", encoding="utf-8")
+            self.file.write(" ")
+
+        text = "".join(self.buffer)
+        self.file.write(text)
+        self.file.flush()
+
+        self.written.append(text)
+        self.buffer = []
+        self.buffered = 0
+
+        if self.on_text is not None:
+            self.on_text("".join(self.written))
+
+    def close(self):
+        """
+        Escribe lo que queda en el buffer y cierra el fichero.
+        """
+        try:
+            self.flush()
+        finally:
+            if self.file is not None:
+                self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def summarize(db: Session ,id: int, text: str, summary: str, upload_folder = Settings.UPLOAD_FOLDER, on_text=None):
     """
     Se relaiza el resumen a aprtir del texto tras haber hecho el cleanup.
+    El resumen se va escribiendo en la nota según lo genera el modelo.
 
     Parámetros:
         db: Sesión de la base de datos, para obtener la inforamción de los personajes.
         id: Identificador de la campaña de la cual se obtemdrán los personajes.
         text: Texto a resumir.
         summary: Nombre del fichero de texto donde se almacenará el resumen.
+        upload_folder: Carpeta donde se encuentran los archivos.
+        on_text: Función opcional que recibe el resumen escrito hasta el momento.
     """
     print("Summarizando")
-    result = summarizer_instance.summarize(text)
 
-    file_path = os.path.join(upload_folder, summary)
-    with open(file_path, "a", encoding="utf-8") as archivo:
-        archivo.write(" " + result)
+    with SummaryWriter(file_store.file_path(summary, upload_folder), on_text) as writer:
+        summarizer.summarize(text, on_token=writer.write)
+
+# Resúmenes incrementales de las sesiones en directo, uno por cada nota de resumen.
+rolling_summaries: dict[str, RollingSummary] = {}
+
+def get_rolling_summary(summary: str) -> RollingSummary:
+    """
+    Obtiene el resumen incremental de la sesión en directo de una nota de resumen, creándolo si no existe.
+
+    Parámetros:
+        summary: Nombre del fichero de la nota del resumen.
+
+    Retorna:
+        RollingSummary: Estado del resumen de la sesión.
+    """
+    if summary not in rolling_summaries:
+        rolling_summaries[summary] = RollingSummary(summarizer)
+
+    return rolling_summaries[summary]
+
+async def finish_rolling_summary(rolling: RollingSummary, summary: str, upload_folder = Settings.UPLOAD_FOLDER, on_text=None):
+    """
+    Termina un resumen incremental, escribiendo en el fichero del resumen la última actualización
+    según la genera el modelo. Si es el de una sesión en directo, se quita del registro.
+
+    Parámetros:
+        rolling: Resumen incremental que se termina.
+        summary: Nombre del fichero de la nota del resumen.
+        upload_folder: Carpeta donde se encuentran los archivos.
+        on_text: Función opcional que recibe el resumen escrito hasta el momento.
+    """
+    try:
+        with SummaryWriter(file_store.file_path(summary, upload_folder), on_text) as writer:
+            await rolling.finish(on_token=writer.write)
+    finally:
+        if rolling_summaries.get(summary) is rolling:
+            rolling_summaries.pop(summary)
 
 async def save_transcription(text: str, file_path: str):
     """
@@ -141,10 +422,117 @@ async def save_transcription(text: str, file_path: str):
     async with aiofiles.open(file_path, "a", encoding="utf-8") as archivo:
         await archivo.write(" " + text)
 
-async def transcribe_audio(db: Session, id: int, audio: str, file: str, summary: str, upload_folder=Settings.UPLOAD_FOLDER):
+def _segments_end(segments: list[dict], offset: float) -> float:
+    """
+    Instante del audio original hasta el que llegan los fragmentos de una ventana.
+
+    Parámetros:
+        segments: Fragmentos de la ventana.
+        offset: Inicio de la ventana en segundos.
+
+    Retorna:
+        Final del último fragmento, o el inicio de la ventana si no tiene fragmentos.
+    """
+    if not segments:
+        return offset
+
+    start, end = segments[-1]["timestamp"]
+
+    return end if end is not None else start
+
+def _cache_key(audio: str, audio_storage: Storage) -> str:
+    """
+    Clave de la caché de transcripciones: contenido del audio más el modelo y la configuración que afectan al resultado.
+    El modelo se toma de la configuración y no de `whisper_instance`, para no cargarlo si la transcripción ya está en la caché.
+    Los audios se guardan con el hash de su contenido como nombre, así que solo hay que calcularlo con los antiguos,
+    leyéndolos del almacenamiento donde estén.
+
+    Parámetros:
+        audio: Nombre del fichero de audio.
+        audio_storage: Almacenamiento del fichero de audio.
+
+    Retorna:
+        Clave de la transcripción en la caché.
+    """
+    digest = os.path.splitext(audio)[0]
+    if not re.fullmatch(r"[0-9a-f]{64}", digest):
+        digest = hash_chunks(audio_storage.open(audio))
+
+    return make_key(
+        digest,
+        settings.WHISPER_BACKEND,
+        settings.WHISPER_MODEL_ID,
+        settings.WHISPER_CPU_MODEL_ID,
+        settings.TRANSCRIPTION_WINDOW_SECONDS,
+        settings.TRANSCRIPTION_OVERLAP_SECONDS,
+        settings.VAD_ENABLED,
+        settings.VAD_ENERGY_RATIO
+    )
+
+async def _whisper_windows(audio_path: str, start_chunk: int = 0):
+    """
+    Transcribe con whisper el audio por ventanas solapadas.
+
+    Parámetros:
+        audio_path: Ruta del fichero de audio.
+        start_chunk: Índice de la primera ventana que se transcribe. Las anteriores se decodifican
+            para mantener las mismas ventanas, pero no pasan por whisper.
+
+    Retorna:
+        Generador asíncrono de tuplas (índice de la ventana, inicio en segundos, fragmentos de la ventana).
+    """
+    blocks = _decode_audio(audio_path)
+    vad = VoiceActivityDetector() if settings.VAD_ENABLED else None
+    windows = _audio_windows(vad.filter(blocks) if vad else blocks)
+
+    index = 0
+
+    try:
+        while (window := await asyncio.to_thread(next, windows, None)) is not None:
+            offset, samples, is_last = window
+            index += 1
+
+            if index - 1 < start_chunk:
+                continue
+
+            result = await whisper_instance.transcribe_async({"raw": samples, "sampling_rate": SAMPLING_RATE})
+            segments = _stitch_window(result, offset, is_last)
+
+            if vad is not None:
+                segments = _to_original_timeline(segments, vad)
+                offset = vad.to_original(offset)
+
+            yield index - 1, offset, segments
+    finally:
+        windows.close()
+        blocks.close()
+
+async def _cached_windows(cached: dict, start_chunk: int = 0):
+    """
+    Recorre las ventanas de una transcripción guardada en la caché.
+
+    Parámetros:
+        cached: Transcripción en bruto guardada en la caché.
+        start_chunk: Índice de la primera ventana que se devuelve.
+
+    Retorna:
+        Generador asíncrono de tuplas (índice de la ventana, inicio en segundos, fragmentos de la ventana).
+    """
+    for index, window in enumerate(cached["windows"]):
+        if index >= start_chunk:
+            yield index, window["offset"], window["segments"]
+
+async def transcribe_audio(db: Session, id: int, audio: str, file: str, summary: str, upload_folder=Settings.UPLOAD_FOLDER, on_chunk=None, start_chunk: int = 0, previous_texts: list[str] = None, on_progress=None, cleaner_state: str = None):
     """
-    Transcripción del audio pasado como parámetro y posterior escritura.
-    Para la transcripción se usa whisper large-v3-turbo.
+    Transcripción del audio pasado como parámetro y escritura incremental.
+    Para la transcripción se usa whisper sobre ventanas solapadas del audio,
+    y el texto limpio de cada ventana se añade al fichero en cuanto está disponible.
+    La limpieza se hace por partes con `TextCleaner`, con el mismo resultado que limpiar la transcripción completa;
+    las últimas palabras de cada ventana se escriben con la siguiente, cuando ya no pueden cambiar.
+    Si el mismo audio ya se transcribió con la misma configuración, se reutiliza la salida de whisper
+    de la caché y solo se repite la limpieza con los nombres actuales de los personajes.
+    Con `settings.SUMMARY_INCREMENTAL` el resumen se va actualizando con cada ventana escrita,
+    en lugar de resumir toda la transcripción al final.
 
     Parámetros:
         db: Sesión de la base de datos.
@@ -153,17 +541,85 @@ async def transcribe_audio(db: Session, id: int, audio: str, file: str, summary:
         file: Fichero de texto donde se va a almacenar el resultado de la transcripción.
         summary: Fichero de texto donde se almacenará el resumen.
         upload_folder: Carpeta donde se encuentran y guardan los archivos.
+        on_chunk: Corrutina opcional que se llama tras escribir cada ventana con (índice de la ventana, inicio en segundos,
+            texto limpio, estado de la limpieza). Si lanza una excepción, la transcripción se detiene.
+        start_chunk: Índice de la ventana desde la que se reanuda una transcripción interrumpida.
+        previous_texts: Textos limpios de las ventanas ya escritas antes de reanudar, necesarios para el resumen.
+        on_progress: Corrutina opcional que recibe el progreso con
+            (etapa, segundos de audio procesados, duración total, último texto).
+        cleaner_state: Estado de la limpieza guardado en el último punto de control, al reanudar.
     """
-    aux = await asyncio.to_thread(_convert_audio, audio, upload_folder)
-    audio_path = os.path.join(upload_folder, aux)
+    async def report(stage: str, seconds: float, text: str = None):
+        if on_progress is not None:
+            await on_progress(stage, seconds, duration, text)
 
-    result = await asyncio.to_thread(whisper_instance.transcribe, audio_path)
+    # Si el audio está en un almacenamiento externo, ffmpeg lo lee directamente de su URL firmada.
+    audio_storage = storage_for(audio, upload_folder)
+    audio_path = audio_storage.path(audio) or await asyncio.to_thread(audio_storage.presign, audio)
+    file_path = file_store.file_path(file, upload_folder)
 
-    clean_text = text_cleanup(db=db, id=id, text=result["text"])
+    duration = await asyncio.to_thread(_probe_duration, audio_path)
+    await report("decode", 0)
 
-    file_path = os.path.join(upload_folder, file)
-    await save_transcription(clean_text, file_path)
-    
-    await cleanup_temp_files([aux, audio], upload_folder)
+    key = await asyncio.to_thread(_cache_key, audio, audio_storage)
+    cached = await asyncio.to_thread(transcription_cache.get, key)
+
+    # Con la caché solo queda repetir la limpieza del texto.
+    stage = "cleanup" if cached else "transcribe"
+
+    raw_windows = []
+    clean_texts = list(previous_texts or [])
+    cleaner = TextCleaner(get_name_index(db=db, campaign_id=id), state=cleaner_state)
+
+    rolling = None
+    if settings.SUMMARY_INCREMENTAL:
+        # Cada trabajo lleva su propio resumen, aunque varios segmentos de la sesión escriban en la misma nota.
+        # Un resumen que quedó a medias en otro intento se reconstruye con las ventanas ya escritas.
+        rolling = RollingSummary(summarizer)
+        for previous_text in clean_texts:
+            await rolling.add(previous_text)
+
+    async with aclosing(_cached_windows(cached, start_chunk) if cached else _whisper_windows(audio_path, start_chunk)) as windows:
+        async for index, offset, segments in windows:
+            raw_windows.append({"offset": offset, "segments": segments})
+
+            text = "".join(segment["text"] for segment in segments)
+            clean_text = cleaner.feed(" " + text)
+            if clean_text:
+                await save_transcription(clean_text, file_path)
+                clean_texts.append(clean_text)
+
+                if rolling is not None:
+                    await rolling.add(clean_text)
+
+            if on_chunk is not None:
+                await on_chunk(index, offset, clean_text, cleaner.state())
+
+            await report(stage, _segments_end(segments, offset), clean_text)
+
+    clean_text = cleaner.finish()
+    if clean_text:
+        await save_transcription(clean_text, file_path)
+        clean_texts.append(clean_text)
+
+        if rolling is not None:
+            await rolling.add(clean_text)
+
+    # Una transcripción reanudada no tiene la salida de whisper de las primeras ventanas.
+    if cached is None and start_chunk == 0:
+        await asyncio.to_thread(transcription_cache.put, key, {"windows": raw_windows})
+
+    await report("summarize", duration or 0)
+
+    # El resumen se genera en otro hilo, así que su progreso se envía de vuelta al bucle de eventos.
+    loop = asyncio.get_running_loop()
+
+    def on_summary(text: str):
+        asyncio.run_coroutine_threadsafe(report("summarize", duration or 0, text), loop)
+
+    if rolling is not None:
+        await finish_rolling_summary(rolling, summary, upload_folder, on_summary)
+    else:
+        await asyncio.to_thread(summarize, db, id, " ".join(clean_texts), summary, upload_folder, on_summary)
 
-    await asyncio.to_thread(summarize, db, id, clean_text, summary, upload_folder)
+    await cleanup_temp_files([audio], upload_folder)
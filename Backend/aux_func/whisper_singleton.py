@@ -1,14 +1,41 @@
-import torch
-from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from config import settings
+from aux_func.lazy_model import LazyModel
 
 class WhisperTranscriber:
     """
     Clase que carga una vez whisper para así tardar menos en tema de cargar el modelo.
+    Las peticiones de todos los trabajos se encolan y un hilo planificador las agrupa en lotes,
+    de forma que varias transcripciones simultáneas comparten cada pasada del modelo.
     """
-    def __init__(self):
-        model_id = "openai/whisper-large-v3-turbo"
-        device = "cuda:0" if torch.cuda.is_available() else "cpu"
-        torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+    def __init__(self, backend: str = settings.WHISPER_BACKEND, batch_size: int = settings.WHISPER_BATCH_SIZE, batch_wait_ms: int = settings.WHISPER_BATCH_WAIT_MS):
+        # Se importan aquí para que importar el módulo no cargue torch.
+        import torch
+        from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
+
+        if backend == "auto":
+            backend = "cuda" if torch.cuda.is_available() else "cpu"
+
+        if backend == "cuda":
+            model_id = settings.WHISPER_MODEL_ID
+            device = "cuda:0"
+            torch_dtype = torch.float16
+        else:
+            # En CPU se puede usar un modelo más pequeño y limitar los hilos para no saturar el nodo.
+            model_id = settings.WHISPER_CPU_MODEL_ID or settings.WHISPER_MODEL_ID
+            device = "cpu"
+            torch_dtype = torch.float32
+
+            if settings.WHISPER_CPU_THREADS > 0:
+                torch.set_num_threads(settings.WHISPER_CPU_THREADS)
+
+        self.backend = backend
+        self.model_id = model_id
+        self.device = device
 
         self.model = AutoModelForSpeechSeq2Seq.from_pretrained(
             model_id,
@@ -17,6 +44,10 @@ class WhisperTranscriber:
             use_safetensors=True
         ).to(device)
 
+        if backend == "cpu-int8":
+            # Cuantización dinámica a int8 de las capas lineales, que son la mayor parte del cómputo en CPU.
+            self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
         self.processor = AutoProcessor.from_pretrained(model_id)
 
         self.pipe = pipeline(
@@ -28,10 +59,158 @@ class WhisperTranscriber:
             device=device
         )
 
-    def transcribe(self, audio_path: str):
-        with torch.inference_mode():
-            result = self.pipe(audio_path, return_timestamps=True)
-        
-        return result
+        self.audio_seconds = 0.0
+        self.inference_seconds = 0.0
+
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        self._closing = threading.Lock()
+        self._scheduler = threading.Thread(target=self._run_batches, daemon=True)
+        self._scheduler.start()
+
+    def submit(self, audio) -> Future:
+        """
+        Encola un audio para transcribirlo en el siguiente lote.
+
+        Parámetros:
+            audio: Ruta del fichero de audio o diccionario {"raw": muestras, "sampling_rate": frecuencia}
+                con las muestras ya decodificadas (como máximo 30 segundos).
+
+        Retorna:
+            Future que se resuelve con el resultado de whisper para ese audio.
+
+        Lanza:
+            RuntimeError: Si el modelo ya se ha cerrado, ya que nadie procesaría la petición.
+        """
+        future = Future()
+
+        with self._closing:
+            if self._closed:
+                raise RuntimeError("El modelo de whisper está cerrado")
+
+            self._queue.put((audio, future))
+
+        return future
+
+    def transcribe(self, audio):
+        """
+        Transcribe el audio pasado como parámetro, esperando a que se procese su lote.
+
+        Parámetros:
+            audio: Ruta del fichero de audio o diccionario {"raw": muestras, "sampling_rate": frecuencia}
+                con las muestras ya decodificadas.
+
+        Retorna:
+            Diccionario con el texto ("text") y los fragmentos con sus marcas de tiempo ("chunks").
+        """
+        return self.submit(audio).result()
+
+    async def transcribe_async(self, audio):
+        """
+        Versión asíncrona de `transcribe`, no ocupa ningún hilo mientras se espera al lote.
+        """
+        return await asyncio.wrap_future(self.submit(audio))
+
+    def close(self):
+        """
+        Detiene el hilo planificador cuando termina los lotes pendientes y libera la memoria de la GPU.
+        """
+        # Las peticiones encoladas antes del cierre se procesan; las posteriores se rechazan en `submit`.
+        with self._closing:
+            if self._closed:
+                return
+
+            self._closed = True
+            self._queue.put(None)
+
+        self._scheduler.join()
+
+        self.pipe = None
+        self.model = None
+
+        if self.device.startswith("cuda"):
+            import torch
+            torch.cuda.empty_cache()
+
+    def real_time_factor(self) -> float:
+        """
+        Factor de tiempo real del backend: segundos de cálculo por cada segundo de audio transcrito.
+        Un valor menor que 1 indica que se transcribe más rápido que la duración del audio.
+
+        Retorna:
+            Factor de tiempo real acumulado desde que se cargó el modelo, o None si aún no se ha transcrito nada.
+        """
+        if self.audio_seconds == 0:
+            return None
+
+        return self.inference_seconds / self.audio_seconds
+
+    def _next_batch(self) -> list:
+        """
+        Espera a la primera petición y recoge las que lleguen durante `batch_wait` segundos,
+        hasta llenar el lote.
+
+        Retorna:
+            Lista de tuplas (audio, future) que se procesarán juntas, o None si se ha pedido cerrar el modelo.
+        """
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            if item is None:
+                # La petición de cierre se atiende después de este lote.
+                self._queue.put(None)
+                break
+
+            batch.append(item)
+
+        return [(audio, future) for audio, future in batch if future.set_running_or_notify_cancel()]
+
+    def _run_batches(self):
+        """
+        Bucle del hilo planificador: ejecuta los lotes en el modelo y devuelve cada resultado a su petición.
+        """
+        import torch
+
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            if not batch:
+                continue
+
+            # La duración se calcula antes porque el pipeline consume las muestras de los diccionarios.
+            audio_seconds = sum(len(audio["raw"]) / audio["sampling_rate"] for audio, _ in batch if isinstance(audio, dict))
+
+            try:
+                start = time.perf_counter()
+                with torch.inference_mode():
+                    results = self.pipe([audio for audio, _ in batch], batch_size=len(batch), return_timestamps=True)
+
+                self.inference_seconds += time.perf_counter() - start
+                self.audio_seconds += audio_seconds
+
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
 
-whisper_instance = WhisperTranscriber()
+whisper_instance = LazyModel(WhisperTranscriber, "whisper", settings.MODEL_IDLE_SECONDS)
@@ -0,0 +1,117 @@
+"""
+Benchmark de la decodificación del audio: el camino original, que pasaba el audio subido a MP3 con pydub y
+después whisper lo volvía a decodificar entero, frente a la decodificación por bloques de `_decode_audio`.
+Cada camino se mide en un proceso aparte para que el pico de memoria (RSS) de uno no afecte al otro.
+El camino original necesita pydub, que la aplicación ya no usa (`pip install pydub`).
+Se ejecuta desde la carpeta Backend, con un audio propio o con uno sintético generado con ffmpeg:
+
+    python -m benchmarks.decode_audio [audio] [--minutes 30]
+"""
+import argparse
+import importlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+def _peak_rss_mb(who: int) -> float:
+    # En Linux `ru_maxrss` está en KB.
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def _original_path(audio_path: str) -> int:
+    """
+    Camino original: pydub decodifica el audio y lo vuelve a codificar a un MP3 de 128k en disco,
+    y el pipeline de whisper lee el MP3 entero con ffmpeg a un único array de 16 kHz.
+    """
+    from pydub import AudioSegment
+    from aux_func.transcription_model import SAMPLING_RATE
+
+    with tempfile.TemporaryDirectory() as folder:
+        mp3_path = os.path.join(folder, "audio.mp3")
+        AudioSegment.from_file(audio_path).export(mp3_path, format="mp3", bitrate="128k")
+
+        command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", mp3_path, "-f", "f32le", "-ac", "1", "-ar", str(SAMPLING_RATE), "pipe:1"]
+        samples = np.frombuffer(subprocess.run(command, capture_output=True, check=True).stdout, dtype=np.float32)
+
+    return len(samples)
+
+def _streamed_path(audio_path: str) -> int:
+    """
+    Camino actual: ffmpeg decodifica el audio original a una tubería y se agrupa en ventanas según se lee.
+    """
+    from aux_func.transcription_model import _decode_audio, _audio_windows
+
+    samples = 0
+    for _, window, _ in _audio_windows(_decode_audio(audio_path)):
+        samples = max(samples, len(window))
+
+    return samples
+
+PATHS = {"original": _original_path, "streamed": _streamed_path}
+
+def _run(path: str, audio_path: str):
+    """
+    Mide un camino en este proceso y escribe el resultado en JSON.
+    """
+    # Los módulos se importan antes de medir para que su memoria cuente en la base y no en el pico.
+    importlib.import_module("aux_func.transcription_model")
+    if path == "original":
+        importlib.import_module("pydub")
+
+    base = _peak_rss_mb(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    PATHS[path](audio_path)
+    seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "seconds": seconds,
+        "base_mb": base,
+        "peak_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "ffmpeg_peak_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    }))
+
+def _synthetic_audio(folder: str, minutes: int) -> str:
+    """
+    Genera un audio estéreo a 44.1 kHz en AAC, como las grabaciones de los móviles.
+    """
+    audio_path = os.path.join(folder, "sesion.m4a")
+    subprocess.run([
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"sine=frequency=220:duration={minutes * 60}",
+        "-f", "lavfi", "-i", f"anoisesrc=duration={minutes * 60}:amplitude=0.05",
+        "-filter_complex", "amix=inputs=2", "-ac", "2", "-ar", "44100", "-c:a", "aac", "-b:a", "96k",
+        audio_path
+    ], check=True)
+
+    return audio_path
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("audio", nargs="?", help="Audio con el que se mide. Si no se indica, se genera uno sintético.")
+    parser.add_argument("--minutes", type=int, default=30, help="Duración del audio sintético.")
+    parser.add_argument("--run", choices=PATHS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        _run(args.run, args.audio)
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        audio_path = args.audio or _synthetic_audio(folder, args.minutes)
+        print(f"Audio: {audio_path} ({os.path.getsize(audio_path) / 1024 / 1024:.1f} MB)")
+
+        for path in PATHS:
+            output = subprocess.run([sys.executable, "-m", "benchmarks.decode_audio", audio_path, "--run", path], capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{path:>9}: {result['seconds']:7.2f} s, "
+                f"pico RSS {result['peak_mb']:7.1f} MB (+{result['peak_mb'] - result['base_mb']:.1f} MB sobre la base), "
+                f"ffmpeg {result['ffmpeg_peak_mb']:.1f} MB"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark de la corrección de nombres con `NameIndex` frente al bucle original, que calculaba la distancia
+de Levenshtein de cada palabra con todos los nombres. Se ejecuta desde la carpeta Backend:
+
+    python -m benchmarks.name_index [--words 50000] [--names 50]
+"""
+import argparse
+import random
+import string
+import time
+from Levenshtein import distance
+
+# Vocabulario de una partida, con palabras cortas que quedan cerca de muchos nombres.
+VOCABULARY = ["el", "la", "de", "que", "y", "a", "en", "dragón", "espada", "tirada", "sí", "no", "ataca", "mago", "dado", "vale"]
+
+def reference_correct(names: list[str], word: str) -> str:
+    """
+    Implementación original: compara la palabra con todos los nombres y se queda con el primero a menor distancia.
+    Se usa como referencia en las pruebas y en el benchmark.
+    """
+    best_match = word
+    min_distance = float('inf')
+
+    for name in names:
+        dist = distance(word.lower(), name.lower())
+        if dist < min_distance and dist <= 2:
+            min_distance = dist
+            best_match = name
+
+    return best_match
+
+def random_names(rng: random.Random, count: int) -> list[str]:
+    """
+    Genera nombres de personajes de entre 3 y 10 letras.
+    """
+    return ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))).capitalize() for _ in range(count)]
+
+def misspell(rng: random.Random, name: str) -> str:
+    """
+    Cambia, quita o añade una letra de un nombre, como cuando whisper lo transcribe mal.
+    """
+    position = rng.randrange(len(name))
+    letter = rng.choice(string.ascii_lowercase)
+
+    return rng.choice([
+        name[:position] + letter + name[position + 1:],
+        name[:position] + name[position + 1:],
+        name[:position] + letter + name[position:]
+    ])
+
+def random_transcript(rng: random.Random, words: int, names: list[str]) -> list[str]:
+    """
+    Genera las palabras de una transcripción con un 10 % de nombres, la mitad mal escritos.
+    """
+    result = []
+
+    for _ in range(words):
+        if rng.random() < 0.1:
+            name = rng.choice(names)
+            result.append(misspell(rng, name) if rng.random() < 0.5 else name)
+        else:
+            result.append(rng.choice(VOCABULARY))
+
+    return result
+
+def main():
+    from aux_func.name_index import NameIndex
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=50000, help="Palabras de la transcripción.")
+    parser.add_argument("--names", type=int, default=50, help="Nombres de personajes de la campaña.")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    names = random_names(rng, args.names)
+    words = random_transcript(rng, args.words, names)
+
+    start = time.perf_counter()
+    expected = [reference_correct(names, word) for word in words]
+    reference_seconds = time.perf_counter() - start
+
+    # Se incluye la creación del índice, que en la aplicación se reutiliza entre limpiezas.
+    start = time.perf_counter()
+    name_index = NameIndex(names)
+    result = [name_index.correct(word) for word in words]
+    index_seconds = time.perf_counter() - start
+
+    assert result == expected, "NameIndex no corrige igual que el bucle original"
+
+    # Solo la búsqueda por longitud, sin la memoria de palabras ya consultadas.
+    start = time.perf_counter()
+    unmemoized = NameIndex(names)
+    [unmemoized._search(word.lower()) or word for word in words]
+    search_seconds = time.perf_counter() - start
+
+    print(f"{args.words} palabras, {args.names} nombres")
+    print(f"bucle original: {reference_seconds:.3f} s")
+    print(f"sin memoria:    {search_seconds:.3f} s ({reference_seconds / search_seconds:.1f}x)")
+    print(f"NameIndex:      {index_seconds:.3f} s ({reference_seconds / index_seconds:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark de `remove_repeated_phrases` frente a la implementación original, que comparaba los bloques
+copiando listas. Se ejecuta desde la carpeta Backend:
+
+    python -m benchmarks.repeated_phrases
+"""
+import random
+import time
+
+# Vocabulario pequeño para que aparezcan repeticiones también por casualidad, como en las alucinaciones de whisper.
+VOCABULARY = ["el", "la", "de", "que", "y", "a", "en", "Gorl", "Zephyr", "dragón", "espada", "tirada", "sí", "no"]
+
+def reference_remove_repeated_phrases(text: str, max_ngram: int = 10) -> str:
+    """
+    Implementación original, que compara los bloques de palabras creando sublistas.
+    Se usa como referencia en las pruebas de equivalencia y en el benchmark.
+    """
+    words = text.split()
+    i = 0
+    result = []
+
+    while i < len(words):
+        found_repeat = False
+
+        for n in range(max_ngram, 0, -1):
+            if i + 2 * n <= len(words):
+                block = words[i:i+n]
+                next_block = words[i+n:i+2*n]
+
+                if block == next_block:
+                    found_repeat = True
+                    while i + n < len(words) and words[i:i+n] == words[i+n:i+2*n]:
+                        i += n
+                    break
+
+        result.extend(words[i:i+n] if found_repeat else [words[i]])
+        i += n if found_repeat else 1
+
+    return ' '.join(result)
+
+def random_transcript(rng: random.Random, words: int, max_ngram: int = 10) -> str:
+    """
+    Genera un texto aleatorio con bloques de palabras repetidos varias veces seguidas.
+
+    Parámetros:
+        rng: Generador de números aleatorios.
+        words: Número aproximado de palabras del texto.
+        max_ngram: Tamaño máximo de los bloques repetidos.
+
+    Retorna:
+        Texto generado.
+    """
+    result = []
+
+    while len(result) < words:
+        block = [rng.choice(VOCABULARY) for _ in range(rng.randint(1, max_ngram + 2))]
+        result.extend(block * (rng.randint(2, 6) if rng.random() < 0.3 else 1))
+
+    return " ".join(result)
+
+def _measure(function, texts: list[str], max_ngram: int) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        function(text, max_ngram=max_ngram)
+
+    return time.perf_counter() - start
+
+def main():
+    # Se importa aquí para poder reutilizar las funciones de referencia sin cargar el resto de la aplicación.
+    from aux_func.text_cleaner import remove_repeated_phrases
+
+    rng = random.Random(0)
+    texts = [random_transcript(rng, 20000) for _ in range(5)]
+
+    for max_ngram in (5, 10):
+        reference = _measure(reference_remove_repeated_phrases, texts, max_ngram)
+        current = _measure(remove_repeated_phrases, texts, max_ngram)
+        print(f"max_ngram={max_ngram}: referencia {reference:.3f} s, actual {current:.3f} s ({reference / current:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark del arranque de la API: tiempo y memoria (pico de RSS) de importar `main` en un proceso nuevo,
+como hace cada worker de uvicorn. También comprueba que no se ha importado ninguna librería de los modelos,
+que solo se cargan en los workers de transcripción, en el servidor de resúmenes o en el primer uso.
+Se ejecuta desde la carpeta Backend, con la misma configuración (.env) que la API:
+
+    python -m benchmarks.startup [--runs 5]
+"""
+import argparse
+import importlib
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+# Librerías que no deberían cargarse al arrancar la API.
+MODEL_MODULES = ["torch", "transformers", "gpt4all"]
+
+def _peak_rss_mb() -> float:
+    # En Linux `ru_maxrss` está en KB.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _run():
+    """
+    Importa la aplicación en este proceso y escribe el resultado en JSON.
+    """
+    base = _peak_rss_mb()
+    start = time.perf_counter()
+    importlib.import_module("main")
+    seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "seconds": seconds,
+        "base_mb": base,
+        "peak_mb": _peak_rss_mb(),
+        "model_modules": [module for module in MODEL_MODULES if module in sys.modules]
+    }))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="Número de arranques que se miden.")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        _run()
+        return
+
+    results = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--run"], capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    seconds = [result["seconds"] for result in results]
+    print(f"import main: mediana {statistics.median(seconds):.3f} s (mín {min(seconds):.3f} s, máx {max(seconds):.3f} s)")
+    print(f"pico RSS: {max(result['peak_mb'] for result in results):.1f} MB (intérprete sin la aplicación: {results[0]['base_mb']:.1f} MB)")
+
+    loaded = sorted({module for result in results for module in result["model_modules"]})
+    print(f"librerías de modelos cargadas: {', '.join(loaded) if loaded else 'ninguna'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark del factor de tiempo real de los backends de whisper: segundos de cálculo por cada segundo de audio.
+Sirve para elegir el backend de cada nodo (`WHISPER_BACKEND`). El modelo y los hilos de cada backend son los
+de la configuración (`WHISPER_MODEL_ID`, `WHISPER_CPU_MODEL_ID` y `WHISPER_CPU_THREADS`).
+Se ejecuta desde la carpeta Backend con una grabación real, ya que el tiempo de whisper depende de lo que se dice:
+
+    python -m benchmarks.whisper_backends sesion.m4a [--backends cpu cpu-int8 cuda] [--seconds 300]
+"""
+import argparse
+import time
+
+def _windows(audio_path: str, seconds: int) -> list:
+    """
+    Ventanas de audio de los primeros `seconds` segundos, decodificadas igual que en las transcripciones.
+    """
+    from aux_func.transcription_model import _decode_audio, _audio_windows
+
+    windows = []
+    for offset, samples, _ in _audio_windows(_decode_audio(audio_path)):
+        if offset >= seconds:
+            break
+        windows.append(samples.copy())
+
+    return windows
+
+def measure(backend: str, windows: list) -> dict:
+    """
+    Carga whisper con el backend indicado y transcribe las ventanas en lotes, como en los workers.
+
+    Parámetros:
+        backend: Backend de whisper (cpu, cpu-int8 o cuda).
+        windows: Ventanas de muestras mono a 16 kHz.
+
+    Retorna:
+        dict: Modelo usado, segundos de carga y factor de tiempo real.
+    """
+    from aux_func.transcription_model import SAMPLING_RATE
+    from aux_func.whisper_singleton import WhisperTranscriber
+
+    start = time.perf_counter()
+    model = WhisperTranscriber(backend=backend)
+    load_seconds = time.perf_counter() - start
+
+    try:
+        # La primera pasada incluye inicializaciones de torch, así que no se cuenta.
+        model.transcribe({"raw": windows[0].copy(), "sampling_rate": SAMPLING_RATE})
+        model.audio_seconds = model.inference_seconds = 0.0
+
+        futures = [model.submit({"raw": window, "sampling_rate": SAMPLING_RATE}) for window in windows]
+        [future.result() for future in futures]
+
+        return {"model": model.model_id, "load_seconds": load_seconds, "rtf": model.real_time_factor()}
+    finally:
+        model.close()
+
+def main():
+    import torch
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("audio", help="Grabación con la que se mide.")
+    parser.add_argument("--backends", nargs="+", help="Backends a medir. Por defecto cpu, cpu-int8 y cuda si hay GPU.")
+    parser.add_argument("--seconds", type=int, default=300, help="Segundos de audio que se transcriben con cada backend.")
+    args = parser.parse_args()
+
+    backends = args.backends or ["cpu", "cpu-int8"] + (["cuda"] if torch.cuda.is_available() else [])
+    windows = _windows(args.audio, args.seconds)
+    print(f"{len(windows)} ventanas, hilos de torch: {torch.get_num_threads()}")
+
+    for backend in backends:
+        result = measure(backend, windows)
+        print(f"{backend:>8} ({result['model']}): carga {result['load_seconds']:.1f} s, factor de tiempo real {result['rtf']:.3f}")
+
+if __name__ == "__main__":
+    main()
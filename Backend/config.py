@@ -16,12 +16,106 @@ class Settings(BaseSettings):
         ACCESS_TOKEN_EXPIRE_HOURS (int): Tiempo de expiración en horas del token de aceso.
         REFRESH_TOKEN_EXPIRE_DAYS (int): Tiempo de expiración en días del token de refresco.
         UPLOAD_FOLDER (ClassVar[str]): Carpeta donde se almacenan las imágenes subidas.
+        TRANSCRIPTION_WINDOW_SECONDS (int): Duración en segundos de cada ventana de audio que se transcribe.
+        TRANSCRIPTION_OVERLAP_SECONDS (int): Segundos que se solapan dos ventanas consecutivas.
+        DECODE_BLOCK_SECONDS (int): Segundos de audio que se leen de ffmpeg en cada bloque al decodificar.
+        VAD_ENABLED (bool): Indica si se eliminan los silencios del audio antes de transcribirlo.
+        VAD_ENERGY_RATIO (float): Veces que la energía de una trama debe superar el ruido de fondo para considerarse voz.
+        WHISPER_BACKEND (str): Backend de whisper: auto, cuda, cpu o cpu-int8 (CPU con capas lineales cuantizadas a int8).
+        WHISPER_MODEL_ID (str): Modelo de whisper que se usa por defecto.
+        WHISPER_CPU_MODEL_ID (str): Modelo de whisper alternativo para los backends de CPU. Si está vacío se usa WHISPER_MODEL_ID.
+        WHISPER_CPU_THREADS (int): Hilos que usa torch en los backends de CPU. Con 0 se usa el valor por defecto de torch.
+        WHISPER_BATCH_SIZE (int): Número máximo de ventanas de audio que whisper procesa en cada lote.
+        WHISPER_BATCH_WAIT_MS (int): Milisegundos que se esperan a otras peticiones antes de lanzar un lote incompleto.
+        TRANSCRIPTION_CACHE_FOLDER (str): Carpeta donde se guarda la caché de transcripciones de whisper.
+        TRANSCRIPTION_CACHE_MAX_MB (int): Tamaño máximo en MB de la caché de transcripciones.
+        SUMMARY_CACHE_FOLDER (str): Carpeta donde se guarda la caché de resúmenes.
+        SUMMARY_CACHE_MAX_MB (int): Tamaño máximo en MB de la caché de resúmenes.
+        LIVE_WINDOW_SECONDS (int): Duración máxima en segundos del audio pendiente en la transcripción en directo.
+        LIVE_STEP_SECONDS (int): Segundos de audio nuevo que tienen que llegar para volver a ejecutar whisper en directo.
+        LIVE_STABLE_SECONDS (int): Segundos finales de la ventana que no se confirman porque aún pueden cambiar.
+        SUMMARY_CONTEXT_TOKENS (int): Tamaño de la ventana de contexto con la que se carga el modelo de resumen.
+        SUMMARY_TOKEN_BUDGET (int): Tokens máximos de texto que se pasan al modelo en cada llamada de resumen.
+        SUMMARY_MAX_TOKENS (int): Tokens máximos que genera el modelo en cada resumen.
+        SUMMARY_CHARS_PER_TOKEN (float): Caracteres por token usados para estimar el tamaño de los textos.
+        SUMMARY_INCREMENTAL (bool): Indica si el resumen se va actualizando mientras se transcribe, en lugar de hacerse al final.
+        SUMMARY_FOLD_TOKENS (int): Tokens de transcripción nueva que se acumulan antes de actualizar el resumen.
+        SUMMARIZER_MODEL (str): Fichero del modelo de GPT4All usado para los resúmenes.
+        SUMMARIZER_URL (str): Dirección del servidor local de resúmenes. Si está vacía, el modelo se carga en el propio proceso.
+        SUMMARIZER_TIMEOUT_SECONDS (int): Segundos sin recibir nada del servidor de resúmenes tras los que se abandona una petición, o que se espera a que arranque.
+        MAX_IMAGE_MB (int): Tamaño máximo en MB de las imágenes subidas.
+        MAX_AUDIO_MB (int): Tamaño máximo en MB de los audios subidos.
+        MAX_TEXT_MB (int): Tamaño máximo en MB de los ficheros de texto subidos.
+        MAX_OTHER_MB (int): Tamaño máximo en MB del resto de ficheros subidos.
+        FILE_CACHE_MAX_AGE (int): Segundos que los clientes pueden usar sin revalidar las imágenes y audios descargados.
+        UPLOAD_EXPIRE_HOURS (int): Horas sin recibir datos tras las que se elimina una subida por partes sin terminar.
+        STORAGE_BACKEND (str): Almacenamiento de las imágenes, audios y demás ficheros que no son notas: "local" o "s3".
+        STORAGE_REDIRECT (bool): Indica si las descargas de un almacenamiento externo se redirigen a una URL firmada en lugar de pasar por la API.
+        S3_BUCKET (str): Bucket donde se guardan los ficheros con el almacenamiento "s3".
+        S3_PREFIX (str): Prefijo de las claves de los ficheros dentro del bucket.
+        S3_ENDPOINT_URL (str): Dirección del servicio compatible con S3. Si está vacía, se usa la de AWS.
+        S3_REGION (str): Región del bucket.
+        S3_PRESIGN_SECONDS (int): Segundos de validez de las URLs firmadas de descarga.
+        NAME_INDEX_TTL_SECONDS (int): Segundos que se reutiliza el índice de nombres de los personajes de una campaña.
+        MODEL_IDLE_SECONDS (int): Segundos sin usarse tras los que se descargan los modelos de whisper y de resumen. Con 0 no se descargan nunca.
+        TRANSCRIPTION_CONCURRENCY (int): Número de trabajos de transcripción que procesa a la vez cada worker.
+        JOB_POLL_SECONDS (int): Segundos que espera un worker antes de volver a buscar trabajos pendientes.
+        JOB_STALE_SECONDS (int): Segundos sin latido tras los que un trabajo en curso se vuelve a poner en cola.
+        JOB_MAX_ATTEMPTS (int): Veces que se empieza un trabajo antes de darlo por fallido si su worker sigue cayéndose.
+        PROGRESS_POLL_SECONDS (float): Cada cuántos segundos se comprueba el progreso de un trabajo para enviarlo a los clientes.
     """
     DATABASE_URL: str = os.getenv("DATABASE_URL")
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ACCESS_TOKEN_EXPIRE_HOURS: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_HOURS",12))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
     UPLOAD_FOLDER: ClassVar[str] = "files"
+    TRANSCRIPTION_WINDOW_SECONDS: int = int(os.getenv("TRANSCRIPTION_WINDOW_SECONDS", 30))
+    TRANSCRIPTION_OVERLAP_SECONDS: int = int(os.getenv("TRANSCRIPTION_OVERLAP_SECONDS", 4))
+    DECODE_BLOCK_SECONDS: int = int(os.getenv("DECODE_BLOCK_SECONDS", 10))
+    VAD_ENABLED: bool = os.getenv("VAD_ENABLED", "false").lower() == "true"
+    VAD_ENERGY_RATIO: float = float(os.getenv("VAD_ENERGY_RATIO", 4.0))
+    WHISPER_BACKEND: str = os.getenv("WHISPER_BACKEND", "auto")
+    WHISPER_MODEL_ID: str = os.getenv("WHISPER_MODEL_ID", "openai/whisper-large-v3-turbo")
+    WHISPER_CPU_MODEL_ID: str = os.getenv("WHISPER_CPU_MODEL_ID", "")
+    WHISPER_CPU_THREADS: int = int(os.getenv("WHISPER_CPU_THREADS", 0))
+    WHISPER_BATCH_SIZE: int = int(os.getenv("WHISPER_BATCH_SIZE", 8))
+    WHISPER_BATCH_WAIT_MS: int = int(os.getenv("WHISPER_BATCH_WAIT_MS", 50))
+    TRANSCRIPTION_CACHE_FOLDER: str = os.getenv("TRANSCRIPTION_CACHE_FOLDER", "cache/transcriptions")
+    TRANSCRIPTION_CACHE_MAX_MB: int = int(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", 512))
+    SUMMARY_CACHE_FOLDER: str = os.getenv("SUMMARY_CACHE_FOLDER", "cache/summaries")
+    SUMMARY_CACHE_MAX_MB: int = int(os.getenv("SUMMARY_CACHE_MAX_MB", 64))
+    LIVE_WINDOW_SECONDS: int = int(os.getenv("LIVE_WINDOW_SECONDS", 20))
+    LIVE_STEP_SECONDS: int = int(os.getenv("LIVE_STEP_SECONDS", 3))
+    LIVE_STABLE_SECONDS: int = int(os.getenv("LIVE_STABLE_SECONDS", 2))
+    SUMMARY_CONTEXT_TOKENS: int = int(os.getenv("SUMMARY_CONTEXT_TOKENS", 4096))
+    SUMMARY_TOKEN_BUDGET: int = int(os.getenv("SUMMARY_TOKEN_BUDGET", 3000))
+    SUMMARY_MAX_TOKENS: int = int(os.getenv("SUMMARY_MAX_TOKENS", 512))
+    SUMMARY_CHARS_PER_TOKEN: float = float(os.getenv("SUMMARY_CHARS_PER_TOKEN", 3.5))
+    SUMMARY_INCREMENTAL: bool = os.getenv("SUMMARY_INCREMENTAL", "true").lower() == "true"
+    SUMMARY_FOLD_TOKENS: int = int(os.getenv("SUMMARY_FOLD_TOKENS", 1500))
+    SUMMARIZER_MODEL: str = str(os.getenv("SUMMARIZER_MODEL", "qwen2.5-coder-7b-instruct-q4_0.gguf"))
+    SUMMARIZER_URL: str = str(os.getenv("SUMMARIZER_URL", ""))
+    SUMMARIZER_TIMEOUT_SECONDS: int = int(os.getenv("SUMMARIZER_TIMEOUT_SECONDS", 600))
+    MAX_IMAGE_MB: int = int(os.getenv("MAX_IMAGE_MB", 10))
+    MAX_AUDIO_MB: int = int(os.getenv("MAX_AUDIO_MB", 2048))
+    MAX_TEXT_MB: int = int(os.getenv("MAX_TEXT_MB", 10))
+    MAX_OTHER_MB: int = int(os.getenv("MAX_OTHER_MB", 50))
+    FILE_CACHE_MAX_AGE: int = int(os.getenv("FILE_CACHE_MAX_AGE", 86400))
+    UPLOAD_EXPIRE_HOURS: int = int(os.getenv("UPLOAD_EXPIRE_HOURS", 24))
+    STORAGE_BACKEND: str = str(os.getenv("STORAGE_BACKEND", "local"))
+    STORAGE_REDIRECT: bool = os.getenv("STORAGE_REDIRECT", "true").lower() == "true"
+    S3_BUCKET: str = str(os.getenv("S3_BUCKET", ""))
+    S3_PREFIX: str = str(os.getenv("S3_PREFIX", ""))
+    S3_ENDPOINT_URL: str = str(os.getenv("S3_ENDPOINT_URL", ""))
+    S3_REGION: str = str(os.getenv("S3_REGION", ""))
+    S3_PRESIGN_SECONDS: int = int(os.getenv("S3_PRESIGN_SECONDS", 3600))
+    NAME_INDEX_TTL_SECONDS: int = int(os.getenv("NAME_INDEX_TTL_SECONDS", 60))
+    MODEL_IDLE_SECONDS: int = int(os.getenv("MODEL_IDLE_SECONDS", 0))
+    TRANSCRIPTION_CONCURRENCY: int = int(os.getenv("TRANSCRIPTION_CONCURRENCY", 4))
+    JOB_POLL_SECONDS: int = int(os.getenv("JOB_POLL_SECONDS", 2))
+    JOB_STALE_SECONDS: int = int(os.getenv("JOB_STALE_SECONDS", 120))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+    PROGRESS_POLL_SECONDS: float = float(os.getenv("PROGRESS_POLL_SECONDS", 1))
 
 
     @property
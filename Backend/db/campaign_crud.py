@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session, selectinload
-from aux_func.files_aux import delete
+from aux_func.files_aux import delete, release_duplicate
+from db.file_crud import count_image_references
 from db.models import Campaign, User, campaign_invites
 from db.user_crud import get_user_by_id, get_user_by_email
 
@@ -121,6 +122,9 @@ def update_campaign(db: Session, campaign_id: int,  title: str = "", description
     if img_name != "" and img_name != campaign.img_name:
         delete(filename=campaign.img_name)
         campaign.img_name = img_name
+    elif img_name != "":
+        # Se ha vuelto a subir la misma imagen, así que la subida ha añadido una referencia que no se usa.
+        release_duplicate(img_name, count_image_references(db, img_name))
 
     db.commit()
     db.refresh(campaign)
@@ -1,8 +1,17 @@
 from sqlalchemy.orm import Session
 from typing import List
-from aux_func.files_aux import delete
+from aux_func.files_aux import delete, release_duplicate
+from aux_func.name_index import NameIndex
 from db.models import Character
+from db.file_crud import count_image_references
+from config import settings
 import datetime
+import time
+
+# Índices de nombres de los personajes visibles de cada campaña, usados en la limpieza de las transcripciones.
+# Se guardan como (momento de creación, índice) y se invalidan al crear, modificar o eliminar un personaje.
+# Como los workers son otros procesos, además caducan tras `settings.NAME_INDEX_TTL_SECONDS`.
+_name_indexes: dict[int, tuple[float, NameIndex]] = {}
 
 #CRUD de los personajes
 
@@ -36,6 +45,8 @@ def create_character(db: Session, campaign_id: int, user_id: int, name: str, des
     db.commit()
     db.refresh(character)
 
+    invalidate_name_index(campaign_id=campaign_id)
+
     return character
 
 def get_character_by_id(db: Session, character_id: int) -> Character:
@@ -64,6 +75,38 @@ def get_characters_by_campaign(db: Session, campaign_id: int) -> List[Character]
     """
     return db.query(Character).filter(Character.campaign_id == campaign_id).all()
 
+def get_name_index(db: Session, campaign_id: int) -> NameIndex:
+    """
+    Obtención del índice de nombres de los personajes visibles de una campaña.
+    Solo se consulta la base de datos si el índice no está en la caché o ha caducado.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        campaign_id (int): Identificador de la campaña.
+
+    Retorna:
+        NameIndex: Índice para corregir los nombres de los personajes.
+    """
+    cached = _name_indexes.get(campaign_id)
+
+    if cached is not None and time.monotonic() - cached[0] < settings.NAME_INDEX_TTL_SECONDS:
+        return cached[1]
+
+    characters = get_characters_by_campaign(db=db, campaign_id=campaign_id)
+    name_index = NameIndex([character.name for character in characters if character.visibility])
+    _name_indexes[campaign_id] = (time.monotonic(), name_index)
+
+    return name_index
+
+def invalidate_name_index(campaign_id: int):
+    """
+    Elimina de la caché el índice de nombres de una campaña, para que se vuelva a crear con los personajes actuales.
+
+    Parámetros:
+        campaign_id (int): Identificador de la campaña.
+    """
+    _name_indexes.pop(campaign_id, None)
+
 def update_character(db: Session, character_id: int, name: str, description: str, filename_backstory: str, img_name: str, visibility: bool) -> Character:
     """
     Actualiza la información del personaje de un usuario.
@@ -95,6 +138,9 @@ def update_character(db: Session, character_id: int, name: str, description: str
     if(img_name != "" and character.img_name != img_name):
         delete(character.img_name)
         character.img_name = img_name
+    elif(img_name != ""):
+        # Se ha vuelto a subir la misma imagen, así que la subida ha añadido una referencia que no se usa.
+        release_duplicate(img_name, count_image_references(db, img_name))
 
     if(character.visibility != visibility):
         character.visibility = visibility
@@ -102,6 +148,8 @@ def update_character(db: Session, character_id: int, name: str, description: str
     db.commit()
     db.refresh(character)
 
+    invalidate_name_index(campaign_id=character.campaign_id)
+
     return character
 
 def remove_character(db: Session, character_id: int):
@@ -121,4 +169,6 @@ def remove_character(db: Session, character_id: int):
         delete(character.img_name)
         delete(character.filename_backstory)
         db.delete(character)
-        db.commit()
\ No newline at end of file
+        db.commit()
+
+        invalidate_name_index(campaign_id=character.campaign_id)
\ No newline at end of file
@@ -0,0 +1,22 @@
+from sqlalchemy.orm import Session
+from db.models import User, Campaign, Character
+
+# Consultas sobre los ficheros que usan los registros de la base de datos.
+
+def count_image_references(db: Session, img_name: str) -> int:
+    """
+    Cuenta los registros que usan una imagen: avatares de usuarios e imágenes de campañas y personajes.
+    Las imágenes se comparten por contenido, así que una misma imagen puede estar en varios registros.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        img_name (str): Nombre del fichero de la imagen.
+
+    Retorna:
+        int: Número de registros que usan la imagen.
+    """
+    return (
+        db.query(User).filter(User.avatar == img_name).count()
+        + db.query(Campaign).filter(Campaign.img_name == img_name).count()
+        + db.query(Character).filter(Character.img_name == img_name).count()
+    )
@@ -0,0 +1,338 @@
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session, aliased
+from typing import List
+from datetime import datetime, timedelta
+from db.models import TranscriptionJob, TranscriptionCheckpoint
+
+# Estados por los que pasa un trabajo de transcripción.
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+# CRUD de los trabajos de transcripción
+
+def create_job(db: Session, campaign_id: int, user_id: int, audio: str, filename: str, summary: str) -> TranscriptionJob:
+    """
+    Crea un nuevo trabajo de transcripción pendiente de procesar.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        campaign_id (int): Identificador de la campaña a la que pertenece la transcripción.
+        user_id (int): Identificador del usuario que solicita la transcripción.
+        audio (str): Nombre del fichero de audio a transcribir.
+        filename (str): Nombre del fichero de la nota de la transcripción.
+        summary (str): Nombre del fichero de la nota del resumen.
+
+    Retorna:
+        TranscriptionJob: Trabajo creado con toda la información.
+    """
+    job = TranscriptionJob(
+        campaign_id=campaign_id,
+        user_id=user_id,
+        audio=audio,
+        filename=filename,
+        summary=summary,
+        status=JOB_PENDING,
+        attempts=0
+    )
+
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    return job
+
+def get_job_by_id(db: Session, job_id: int) -> TranscriptionJob:
+    """
+    Búsqueda de un trabajo de transcripción por su identificador.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        job_id (int): Identificador del trabajo a buscar.
+
+    Retorna:
+        TranscriptionJob: Trabajo que tenga el identificador pasado como parámetro.
+    """
+    return db.query(TranscriptionJob).filter(TranscriptionJob.id == job_id).first()
+
+def get_job_by_filename(db: Session, filename: str) -> TranscriptionJob:
+    """
+    Búsqueda del último trabajo de transcripción que escribe en el fichero de nota indicado.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        filename (str): Nombre del fichero de la nota de la transcripción.
+
+    Retorna:
+        TranscriptionJob: Trabajo más reciente asociado a la nota.
+    """
+    return (
+        db.query(TranscriptionJob)
+        .filter(TranscriptionJob.filename == filename)
+        .order_by(TranscriptionJob.id.desc())
+        .first()
+    )
+
+def claim_next_job(db: Session, worker: str) -> TranscriptionJob:
+    """
+    Reserva el trabajo pendiente más antiguo para el worker indicado.
+    Las filas bloqueadas por otro worker se saltan, por lo que varios workers pueden pedir trabajos a la vez.
+    Los trabajos de una misma nota se procesan de uno en uno y por orden de creación, ya que todos escriben
+    en el mismo fichero: no se reserva un trabajo si otro de su nota está en curso o es anterior y sigue pendiente.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        worker (str): Identificador del worker que reserva el trabajo.
+
+    Retorna:
+        TranscriptionJob: Trabajo reservado, o None si no hay trabajos pendientes.
+    """
+    other = aliased(TranscriptionJob)
+    blocked = (
+        db.query(other.id)
+        .filter(
+            other.filename == TranscriptionJob.filename,
+            other.id != TranscriptionJob.id,
+            or_(other.status == JOB_RUNNING, and_(other.status == JOB_PENDING, other.id < TranscriptionJob.id))
+        )
+        .exists()
+    )
+
+    job = (
+        db.query(TranscriptionJob)
+        .filter(TranscriptionJob.status == JOB_PENDING, ~blocked)
+        .order_by(TranscriptionJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+
+    if job is None:
+        db.rollback()
+        return None
+
+    job.status = JOB_RUNNING
+    job.worker = worker
+    job.attempts = (job.attempts or 0) + 1
+    job.heartbeat_at = datetime.utcnow()
+
+    db.commit()
+    db.refresh(job)
+
+    return job
+
+def set_job_sizes(db: Session, job_id: int, note_size: int, summary_size: int) -> TranscriptionJob:
+    """
+    Guarda el tamaño de la nota y del resumen antes de que el trabajo escriba en ellos.
+    Las notas de una sesión grabada por segmentos reciben varios trabajos, así que al repetir un trabajo
+    solo se deshace lo que escribió ese trabajo.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        job_id (int): Identificador del trabajo.
+        note_size (int): Tamaño en bytes de la nota de la transcripción.
+        summary_size (int): Tamaño en bytes de la nota del resumen.
+
+    Retorna:
+        TranscriptionJob: Trabajo actualizado.
+    """
+    job = get_job_by_id(db=db, job_id=job_id)
+
+    job.note_size = note_size
+    job.summary_size = summary_size
+
+    db.commit()
+    db.refresh(job)
+
+    return job
+
+def heartbeat_job(db: Session, job_id: int) -> TranscriptionJob:
+    """
+    Indica que el worker sigue procesando el trabajo.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        job_id (int): Identificador del trabajo.
+
+    Retorna:
+        TranscriptionJob: Trabajo con el estado actual, para poder detectar si se ha cancelado.
+    """
+    job = get_job_by_id(db=db, job_id=job_id)
+
+    if job.status == JOB_RUNNING:
+        job.heartbeat_at = datetime.utcnow()
+        db.commit()
+
+    db.refresh(job)
+
+    return job
+
+def update_progress(db: Session, job_id: int, stage: str, audio_seconds: float, duration: float, text: str = None) -> TranscriptionJob:
+    """
+    Actualiza el progreso de un trabajo en curso.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        job_id (int): Identificador del trabajo.
+        stage (str): Etapa actual (decode, transcribe, cleanup o summarize).
+        audio_seconds (float): Segundos de audio procesados.
+        duration (float): Duración total del audio en segundos.
+        text (str): Último fragmento de texto generado. Si es None se mantiene el anterior.
+
+    Retorna:
+        TranscriptionJob: Trabajo actualizado.
+    """
+    job = get_job_by_id(db=db, job_id=job_id)
+
+    job.stage = stage
+    job.audio_seconds = audio_seconds
+    job.duration = duration
+    job.progress = min(100.0, 100.0 * audio_seconds / duration) if duration else 0.0
+    if text is not None:
+        job.partial_text = text
+
+    db.commit()
+
+    return job
+
+def finish_job(db: Session, job_id: int, status: str, error: str = None) -> TranscriptionJob:
+    """
+    Marca un trabajo como terminado. Si el trabajo ya se había cancelado, se mantiene como cancelado.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        job_id (int): Identificador del trabajo.
+        status (str): Estado final del trabajo.
+        error (str): Mensaje de error, en caso de que haya fallado.
+
+    Retorna:
+        TranscriptionJob: Trabajo actualizado.
+    """
+    job = get_job_by_id(db=db, job_id=job_id)
+
+    if job.status != JOB_CANCELLED:
+        job.status = status
+        job.error = error
+
+    if status == JOB_DONE:
+        job.progress = 100.0
+
+    db.commit()
+    db.refresh(job)
+
+    return job
+
+def cancel_job(db: Session, job_id: int) -> TranscriptionJob:
+    """
+    Cancela un trabajo que todavía no ha terminado.
+    Si está en curso, el worker lo detendrá al terminar la ventana de audio que esté procesando.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        job_id (int): Identificador del trabajo a cancelar.
+
+    Retorna:
+        TranscriptionJob: Trabajo actualizado.
+    """
+    job = get_job_by_id(db=db, job_id=job_id)
+
+    if job.status in (JOB_PENDING, JOB_RUNNING):
+        job.status = JOB_CANCELLED
+        db.commit()
+        db.refresh(job)
+
+    return job
+
+def requeue_stale_jobs(db: Session, timeout_seconds: int, max_attempts: int) -> int:
+    """
+    Devuelve a la cola los trabajos en curso cuyo worker ha dejado de dar señales de vida,
+    por ejemplo porque el proceso se ha caído o se ha reiniciado.
+    Los que ya se han empezado `max_attempts` veces se marcan como fallidos, ya que probablemente
+    sean ellos los que tiran el worker.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        timeout_seconds (int): Segundos sin latido a partir de los cuales se considera que el worker ha muerto.
+        max_attempts (int): Veces que se puede empezar un trabajo.
+
+    Retorna:
+        int: Número de trabajos devueltos a la cola.
+    """
+    limit = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+    stale = db.query(TranscriptionJob).filter(TranscriptionJob.status == JOB_RUNNING, TranscriptionJob.heartbeat_at < limit)
+
+    stale.filter(TranscriptionJob.attempts >= max_attempts).update(
+        {
+            TranscriptionJob.status: JOB_FAILED,
+            TranscriptionJob.worker: None,
+            TranscriptionJob.error: f"El worker se detuvo {max_attempts} veces procesando el trabajo"
+        },
+        synchronize_session=False
+    )
+    count = (
+        stale.filter(TranscriptionJob.attempts < max_attempts)
+        .update({TranscriptionJob.status: JOB_PENDING, TranscriptionJob.worker: None}, synchronize_session=False)
+    )
+    db.commit()
+
+    return count
+
+def add_checkpoint(db: Session, job_id: int, chunk_index: int, offset: float, text: str, file_size: int, cleaner_state: str = None) -> TranscriptionCheckpoint:
+    """
+    Guarda el progreso de un trabajo tras terminar una ventana de audio.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        job_id (int): Identificador del trabajo.
+        chunk_index (int): Índice de la ventana terminada.
+        offset (float): Inicio de la ventana en segundos.
+        text (str): Texto limpio escrito para la ventana.
+        file_size (int): Tamaño del fichero de la transcripción tras escribir la ventana.
+        cleaner_state (str): Texto pendiente de la limpieza por partes, en JSON.
+
+    Retorna:
+        TranscriptionCheckpoint: Punto de control creado.
+    """
+    checkpoint = TranscriptionCheckpoint(
+        job_id=job_id,
+        chunk_index=chunk_index,
+        offset=offset,
+        text=text,
+        file_size=file_size,
+        cleaner_state=cleaner_state
+    )
+
+    db.add(checkpoint)
+    db.commit()
+
+    return checkpoint
+
+def get_checkpoints(db: Session, job_id: int) -> List[TranscriptionCheckpoint]:
+    """
+    Obtiene los puntos de control de un trabajo ordenados por ventana.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        job_id (int): Identificador del trabajo.
+
+    Retorna:
+        List[TranscriptionCheckpoint]: Puntos de control del trabajo.
+    """
+    return (
+        db.query(TranscriptionCheckpoint)
+        .filter(TranscriptionCheckpoint.job_id == job_id)
+        .order_by(TranscriptionCheckpoint.chunk_index)
+        .all()
+    )
+
+def remove_checkpoints(db: Session, job_id: int):
+    """
+    Elimina los puntos de control de un trabajo que ya no se va a reanudar.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        job_id (int): Identificador del trabajo.
+    """
+    db.query(TranscriptionCheckpoint).filter(TranscriptionCheckpoint.job_id == job_id).delete(synchronize_session=False)
+    db.commit()
@@ -1,6 +1,7 @@
-from sqlalchemy import Boolean, Integer, String, ForeignKey, Column, Table, UniqueConstraint, Date
+from sqlalchemy import Boolean, Integer, String, ForeignKey, Column, Table, UniqueConstraint, Date, DateTime, Float
 from sqlalchemy.orm import relationship
 from db.database import Base
+from datetime import datetime
 
 # Tabla intermedia para la relación n:m entre las campañas y los usuarios invitados.
 campaign_invites = Table(
@@ -129,4 +130,79 @@ class Note(Base):
     creation_date = Column(Date)
     title = Column(String)
     file_name = Column(String)
-    visibility = Column(Boolean)
\ No newline at end of file
+    visibility = Column(Boolean)
+
+class TranscriptionJob(Base):
+    """
+    Representa un trabajo de transcripción pendiente o en curso, procesado por los workers de transcripción.
+
+    Atributos:
+        id (int): Identificador del trabajo.
+        audio (str): Nombre del fichero de audio a transcribir.
+        filename (str): Nombre del fichero de la nota donde se escribe la transcripción.
+        summary (str): Nombre del fichero de la nota donde se escribe el resumen.
+        note_size (int): Tamaño en bytes de la nota antes de que el trabajo escribiera en ella.
+        summary_size (int): Tamaño en bytes del resumen antes de que el trabajo escribiera en él.
+        status (str): Estado del trabajo (pending, running, done, failed o cancelled).
+        error (str): Mensaje de error en caso de que el trabajo haya fallado.
+        attempts (int): Número de veces que un worker ha empezado el trabajo.
+        worker (str): Identificador del worker que está procesando el trabajo.
+        created_at (datetime): Fecha de creación del trabajo.
+        heartbeat_at (datetime): Última vez que el worker indicó que seguía procesando el trabajo.
+        stage (str): Etapa en la que se encuentra (decode, transcribe, cleanup o summarize).
+        progress (float): Porcentaje del audio procesado.
+        audio_seconds (float): Segundos de audio procesados.
+        duration (float): Duración total del audio en segundos.
+        partial_text (str): Último fragmento de texto generado.
+
+    Relaciones:
+        campaign_id (int): Identificador de la partida a la que pertenece.
+        user_id (int): Identificador del usuario que ha solicitado la transcripción.
+    """
+    __tablename__ = "transcription_job"
+
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("campaign.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="SET NULL"), nullable=True)
+    audio = Column(String)
+    filename = Column(String, index=True)
+    summary = Column(String)
+    note_size = Column(Integer, nullable=True)
+    summary_size = Column(Integer, nullable=True)
+    status = Column(String, index=True)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, default=0)
+    worker = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    heartbeat_at = Column(DateTime, nullable=True)
+    stage = Column(String, nullable=True)
+    progress = Column(Float, default=0)
+    audio_seconds = Column(Float, default=0)
+    duration = Column(Float, nullable=True)
+    partial_text = Column(String, nullable=True)
+
+class TranscriptionCheckpoint(Base):
+    """
+    Representa el progreso guardado de un trabajo de transcripción tras terminar una ventana de audio.
+    Permite reanudar un trabajo interrumpido desde la última ventana terminada.
+
+    Atributos:
+        id (int): Identificador del punto de control.
+        chunk_index (int): Índice de la ventana de audio terminada.
+        offset (float): Inicio de la ventana en segundos dentro del audio original.
+        text (str): Texto limpio que se escribió para la ventana.
+        file_size (int): Tamaño en bytes del fichero de la transcripción tras escribir la ventana.
+        cleaner_state (str): Texto que la limpieza por partes aún no había escrito, en JSON.
+
+    Relaciones:
+        job_id (int): Identificador del trabajo al que pertenece.
+    """
+    __tablename__ = "transcription_checkpoint"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("transcription_job.id", ondelete="CASCADE"), index=True)
+    chunk_index = Column(Integer)
+    offset = Column(Float)
+    text = Column(String)
+    file_size = Column(Integer)
+    cleaner_state = Column(String)
@@ -62,6 +62,20 @@ def get_campaigns_notes(db: Session, campaign_id: int) -> List[Note]:
     """
     return db.query(Note).filter(Note.campaign_id == campaign_id).all()
 
+def get_campaign_note_by_file(db: Session, campaign_id: int, file_name: str) -> Note:
+    """
+    Obtención de la nota de una campaña a partir del nombre de su fichero.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        campaign_id (int): Identificador de la campaña a la que tiene que pertenecer la nota.
+        file_name (str): Nombre del fichero de la nota.
+
+    Retorna:
+        Note: Nota con ese fichero en la campaña, o None si no existe.
+    """
+    return db.query(Note).filter(Note.campaign_id == campaign_id, Note.file_name == file_name).first()
+
 def update_note(db: Session, note_id: int, title: str, file_name: str, visibility: bool) -> Note:
     note = get_note_by_id(db=db, note_id=note_id)
 
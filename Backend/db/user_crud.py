@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
-from aux_func.files_aux import delete
+from aux_func.files_aux import delete, release_duplicate
+from db.file_crud import count_image_references
 from aux_func.auth import hash_password
 from typing import List
 from db.models import User
@@ -110,6 +111,9 @@ def update_user(db: Session, user_id: int, user_nickname: str = "", user_new_ava
     if user_new_avatar != "" and user.avatar != user_new_avatar:
         delete(user.avatar)
         user.avatar = user_new_avatar
+    elif user_new_avatar != "":
+        # Se ha vuelto a subir el mismo avatar, así que la subida ha añadido una referencia que no se usa.
+        release_duplicate(user_new_avatar, count_image_references(db, user_new_avatar))
 
     db.commit()
     db.refresh(user)
@@ -1,16 +1,44 @@
 import os
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
 from config import settings
+from aux_func.file_store import relative_path
+from aux_func.files_aux import storage_for
 from db.database import engine
 from db.models import Base
 from routes.auth import router as auth_router
-from routes.files import router as files_routes
+from routes.files import router as files_routes, get_file
 from routes.campaigns import router as campaign_router
 from routes.notes import router as note_router
 from routes.characters import router as character_router
 from routes.transcription import router as transcription_router
 
+class ShardedStaticFiles(StaticFiles):
+    """
+    Ficheros estáticos que busca cada fichero en su carpeta del almacenamiento (ab/cd/<nombre>),
+    de forma que las URLs siguen siendo /static/files/<nombre>.
+    Los ficheros que están en un almacenamiento externo se sirven con el endpoint de descarga de ficheros.
+    """
+    def get_path(self, scope) -> str:
+        path = super().get_path(scope)
+
+        # Solo se sirven ficheros por su nombre, nunca rutas ni los ficheros internos que empiezan por ".".
+        try:
+            return relative_path(path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404)
+
+    async def get_response(self, path: str, scope):
+        # La ruta ya viene repartida en carpetas, así que el nombre del fichero es la última parte.
+        name = os.path.basename(path)
+
+        # Los ficheros de un almacenamiento externo se sirven igual que en '/files/{name}', con redirección
+        # a la URL firmada o pasando por la API según `settings.STORAGE_REDIRECT`.
+        if storage_for(name).path(name) is None:
+            return await get_file(name, Request(scope))
+
+        return await super().get_response(path, scope)
+
 # Inicializa la app
 app = FastAPI()
 
@@ -18,7 +46,7 @@ app = FastAPI()
 os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
 
 # Monta los archvios estáticos (ficheros)
-app.mount("/static/files", StaticFiles(directory=settings.UPLOAD_FOLDER), name="files")
+app.mount("/static/files", ShardedStaticFiles(directory=settings.UPLOAD_FOLDER), name="files")
 
 # Creación de las tablas de la base de datos
 Base.metadata.create_all(bind=engine)
@@ -1,73 +1,325 @@
 import os
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse
+import asyncio
+import mimetypes
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse, RedirectResponse
 from config import settings
-from aux_func.files_aux import save, update
+from aux_func.files_aux import (
+    FileTooLargeError, InvalidFormError, UploadNotFoundError, UploadOffsetError,
+    form_file, save, update, file_type, storage_for,
+    create_upload, get_upload, append_upload, complete_upload, abort_upload
+)
+from aux_func.file_store import is_shared
+from aux_func.storage import StoredFile
+from schema import upload_init, upload_status
 
 # Inicializa un enrutador para agrupar las rutas relacionadas con los ficheros.
 router = APIRouter()
 
 @router.post("/upload")
-async def upload(file: UploadFile = File(...)):
+async def upload(request: Request):
     """
-    Enpoint para la subida de los archivos.
+    Enpoint para la subida de los archivos. El fichero se envía en el campo `file` de un formulario multipart
+    y se lee del cuerpo de la petición según llega, para rechazarlo en cuanto supera el tamaño máximo.
 
     Parámetros:
-        file (UploadFile): Imagen que quiere almacenarse.
+        request (Request): Petición con el formulario.
     
     Retorna:
         dict: En caso de haberse subido correctamente, devuelve el nombre del archivo
             {"filename": <nombre del fichero.extensión original>}
     
     Lanza:
-        HTTPException: En caso de haber un error durannte la subida se manda el mensaje "Error al subir el archivo"
+        HTTPException: En caso de que el archivo supere el tamaño máximo para su tipo (413), de que la petición no
+            tenga el fichero (400) o de haber un error durannte la subida se manda el mensaje "Error al subir el archivo"
     """
     try:
-        file_name = await save(file)
+        filename, chunks = await form_file(request)
+        file_name = await save(filename, chunks)
         return {"filename": file_name}
+
+    except FileTooLargeError as e:
+        raise HTTPException(status_code= 413, detail= str(e))
+
+    except InvalidFormError as e:
+        raise HTTPException(status_code= 400, detail= str(e))
     
     except Exception as e:
         raise HTTPException(status_code= 500, detail= "Error al subir el archivo")
     
+@router.post("/uploads", response_model=upload_status)
+def create_resumable_upload(information: upload_init):
+    """
+    Endpoint para iniciar una subida por partes, pensada para ficheros grandes y conexiones inestables.
+    Las partes se envían con 'PUT /files/uploads/{upload_id}' y la subida se termina con
+    'POST /files/uploads/{upload_id}/complete'.
+
+    Parámetros:
+        information (upload_init): Nombre original del fichero y, si se conoce, su tamaño total.
+
+    Retorna:
+        upload_status: Estado de la subida, con su identificador.
+
+    Lanza:
+        HTTPException: Si el tamaño indicado supera el máximo para el tipo de fichero (413).
+    """
+    try:
+        return create_upload(information.filename, information.size)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code= 413, detail= str(e))
+
+@router.get("/uploads/{upload_id}", response_model=upload_status)
+def resumable_upload_status(upload_id: str):
+    """
+    Endpoint para consultar cuántos bytes se han recibido de una subida por partes,
+    para continuarla tras un corte de la conexión.
+
+    Parámetros:
+        upload_id (str): Identificador de la subida.
+
+    Retorna:
+        upload_status: Estado de la subida.
+
+    Lanza:
+        HTTPException: Si la subida no existe (404).
+    """
+    try:
+        return get_upload(upload_id)
+    except UploadNotFoundError:
+        raise HTTPException(status_code= 404, detail= "Subida no encontrada")
+
+@router.put("/uploads/{upload_id}", response_model=upload_status)
+async def resumable_upload_part(upload_id: str, offset: int, request: Request):
+    """
+    Endpoint para enviar una parte de una subida. El cuerpo de la petición son los bytes de la parte,
+    que se escriben según llegan.
+
+    Parámetros:
+        upload_id (str): Identificador de la subida.
+        offset (int): Posición del fichero en la que empieza la parte.
+        request (Request): Petición, de la que se lee el cuerpo por bloques.
+
+    Retorna:
+        upload_status: Estado de la subida tras añadir la parte.
+
+    Lanza:
+        HTTPException: Si la subida no existe (404), la parte no empieza donde termina lo recibido (409)
+            o se supera el tamaño máximo (413).
+    """
+    try:
+        return await append_upload(upload_id, offset, request.stream())
+    except UploadNotFoundError:
+        raise HTTPException(status_code= 404, detail= "Subida no encontrada")
+    except UploadOffsetError as e:
+        raise HTTPException(status_code= 409, detail= {"message": str(e), "offset": e.offset})
+    except FileTooLargeError as e:
+        raise HTTPException(status_code= 413, detail= str(e))
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_resumable_upload(upload_id: str):
+    """
+    Endpoint para terminar una subida por partes.
+
+    Parámetros:
+        upload_id (str): Identificador de la subida.
+
+    Retorna:
+        dict: Nombre del archivo guardado, igual que '/files/upload'
+            {"filename": <nombre del fichero.extensión original>}
+
+    Lanza:
+        HTTPException: Si la subida no existe (404) o todavía no se han recibido todos los bytes (409).
+    """
+    try:
+        return {"filename": await complete_upload(upload_id)}
+    except UploadNotFoundError:
+        raise HTTPException(status_code= 404, detail= "Subida no encontrada")
+    except UploadOffsetError as e:
+        raise HTTPException(status_code= 409, detail= {"message": str(e), "offset": e.offset})
+
+@router.delete("/uploads/{upload_id}")
+def abort_resumable_upload(upload_id: str):
+    """
+    Endpoint para cancelar una subida por partes y eliminar lo recibido.
+
+    Parámetros:
+        upload_id (str): Identificador de la subida.
+
+    Retorna:
+        Mensaje de que se ha cancelado la subida.
+
+    Lanza:
+        HTTPException: Si la subida no existe (404).
+    """
+    try:
+        abort_upload(upload_id)
+    except UploadNotFoundError:
+        raise HTTPException(status_code= 404, detail= "Subida no encontrada")
+
+    return {"message": "Subida cancelada"}
+
+def _cache_control(file_name: str) -> str:
+    """
+    Cabecera Cache-Control según el tipo de fichero. Las imágenes y audios casi nunca cambian,
+    mientras que las notas se modifican a menudo y se revalidan siempre con el ETag.
+    """
+    if file_type(file_name) in ("image", "audio"):
+        return f"private, max-age={settings.FILE_CACHE_MAX_AGE}"
+
+    return "private, no-cache"
+
+def _not_modified(request: Request, stat: StoredFile) -> bool:
+    """
+    Indica si la copia que tiene el cliente sigue siendo válida, según If-None-Match o, si no se envía, If-Modified-Since.
+    """
+    if_none_match = request.headers.get("if-none-match")
+
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or stat.etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_modified_since:
+        try:
+            return int(stat.mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+def _byte_range(request: Request, etag: str, size: int):
+    """
+    Obtiene el rango de bytes pedido en la cabecera Range. Solo se atienden rangos únicos;
+    si se piden varios o la cabecera no es válida se devuelve el fichero completo.
+
+    Retorna:
+        tuple[int, int]: Primer y último byte del rango, o None si se debe devolver el fichero completo.
+
+    Lanza:
+        HTTPException: Si el rango está fuera del fichero (416).
+    """
+    header = request.headers.get("range")
+
+    # Con If-Range solo se devuelve el rango si el fichero no ha cambiado.
+    if_range = request.headers.get("if-range")
+    if header is None or (if_range is not None and if_range != etag):
+        return None
+
+    unit, _, ranges = header.partition("=")
+    if unit.strip() != "bytes" or "," in ranges:
+        return None
+
+    start, _, end = ranges.strip().partition("-")
+
+    try:
+        if start == "":
+            start, end = max(0, size - int(end)), size - 1
+        else:
+            start, end = int(start), min(int(end) if end else size - 1, size - 1)
+    except ValueError:
+        return None
+
+    if start > end or start >= size:
+        raise HTTPException(status_code= 416, detail= "Rango no válido", headers= {"Content-Range": f"bytes */{size}"})
+
+    return start, end
+
 @router.get("/{file_name}")
-async def get_file(file_name: str):
+async def get_file(file_name: str, request: Request):
     """
     Endpoint para para obtener un archivo concreto.
+    Si el fichero está en un almacenamiento externo, se redirige a una URL firmada para descargarlo directamente de él.
+    Las respuestas llevan ETag y Last-Modified, y si el cliente ya tiene la versión actual se responde 304 sin el contenido.
+    Con la cabecera Range se devuelve solo una parte del fichero (206), por ejemplo para avanzar en un audio.
 
     Parámetros:
         file_name (str): Nombre del archivo de imagen que se quiere obtener.
+        request (Request): Petición, de la que se leen las cabeceras condicionales y de rango.
 
     Retorna:
-        FileResponse: El archivo de imagen solicitado si existe.
+        FileResponse: El archivo de imagen solicitado si existe, o la redirección a su URL de descarga.
 
     Lanza:
-        HTTPException: Se lanza en caso de no encontrarse el fichero en el servidor.
+        HTTPException: Se lanza en caso de no encontrarse el fichero en el servidor o si el rango pedido no es válido.
     """
-    route = os.path.join(settings.UPLOAD_FOLDER, file_name)
-    if os.path.exists(route):
-        return FileResponse(route)
-    else:
+    storage = storage_for(file_name)
+
+    if settings.STORAGE_REDIRECT:
+        url = await asyncio.to_thread(storage.presign, file_name)
+        if url is not None:
+            return RedirectResponse(url, status_code= 307)
+
+    try:
+        stat = await asyncio.to_thread(storage.stat, file_name)
+    except FileNotFoundError:
         raise HTTPException(status_code = 404, detail= "Fichero no encontrado")
+
+    headers = {
+        "ETag": stat.etag,
+        "Last-Modified": formatdate(stat.mtime, usegmt=True),
+        "Cache-Control": _cache_control(file_name),
+        "Accept-Ranges": "bytes"
+    }
+
+    if _not_modified(request, stat):
+        return Response(status_code= 304, headers= headers)
+
+    byte_range = _byte_range(request, stat.etag, stat.size)
+    media_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+    route = storage.path(file_name)
+
+    if byte_range is None:
+        if route is not None:
+            return FileResponse(route, headers= headers)
+
+        headers["Content-Length"] = str(stat.size)
+        return StreamingResponse(storage.open(file_name), headers= headers, media_type= media_type)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat.size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(storage.open(file_name, start, end), status_code= 206, headers= headers, media_type= media_type)
     
 @router.put("/{name}/update")
-def update_file(name: str, file: UploadFile = File(...)):
+async def update_file(name: str, request: Request):
     """
-    Endpoint para actualizar los ficheros.
+    Endpoint para actualizar los ficheros. El fichero se envía en el campo `file` de un formulario multipart.
     
     Parámetros:
         name (str): Nombre del fichero.
-        file (UploadFile): Fichero con datos actualizados.
+        request (Request): Petición con el formulario con los datos actualizados.
 
     Retorna:
         None
 
     Lanza:
-        HTTPException: Se lanza en caso de que el fichero que se quiere actualizar no exista.    
+        HTTPException: Se lanza en caso de que el fichero que se quiere actualizar no exista, no se pueda modificar
+            o supere el tamaño máximo, o si la petición no tiene el fichero.
     """
-    route = os.path.join(settings.UPLOAD_FOLDER, name)
+    try:
+        route = storage_for(name).path(name)
+    except FileNotFoundError:
+        raise HTTPException(status_code = 404, detail= "Fichero no encontrado")
+
+    if route is None:
+        raise HTTPException(status_code = 409, detail= "Este fichero no se puede modificar, hay que subir uno nuevo")
+
     if not os.path.exists(route):
         raise HTTPException(status_code = 404, detail= "Fichero no encontrado")
+
+    # Los ficheros compartidos por contenido pueden estar en uso por otros, así que hay que subir uno nuevo.
+    if is_shared(name):
+        raise HTTPException(status_code = 409, detail= "Este fichero no se puede modificar, hay que subir uno nuevo")
     
-    update(route, file)
+    try:
+        _, chunks = await form_file(request)
+        await update(route, chunks)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code= 413, detail= str(e))
+    except InvalidFormError as e:
+        raise HTTPException(status_code= 400, detail= str(e))
 
     return {"message": "Información actualizada correctamente"}
\ No newline at end of file
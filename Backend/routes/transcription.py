@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from db.database import get_db
+from config import settings
+from db.database import get_db, SessionLocal
 from db.note_crud import *
+from db.job_crud import *
 from db.campaign_crud import get_campaign_by_id
-from aux_func.auth import get_current_user
-from aux_func.files_aux import createFile, delete
-from schema import note_response, transcribe_info, clean_info, transcribe_init
-from aux_func.transcription_model import transcribe_audio
+from db.character_crud import get_name_index
+from aux_func.auth import get_current_user, get_user_id
+from aux_func.files_aux import createFile, delete, file_type, storage_for
+from schema import note_response, transcribe_info, clean_info, transcribe_init, job_response
 import datetime
 import asyncio
+import json
 
 #Inicializa el enrutador para agrupar las rutas relacionadas con las transcripciontes
 router = APIRouter()
@@ -62,9 +66,10 @@ def create(campaign_id: int, user_id = Depends(get_current_user), db: Session =
     return result
 
 @router.put("/transcribe")
-async def transcribe(information: transcribe_info, background_tasks: BackgroundTasks, user_id = Depends(get_current_user), db: Session = Depends(get_db)):
+async def transcribe(information: transcribe_info, user_id = Depends(get_current_user), db: Session = Depends(get_db)):
     """
     Endpoint que permmite transcribir el fichero que se ha pasado como parámetro.
+    La transcripción se encola y la procesa un worker de transcripción independiente.
 
     Parámetros:
         information (transcribe_info): Objeto con toda la información necesaria para poder realizar la transcripción.
@@ -72,18 +77,253 @@ async def transcribe(information: transcribe_info, background_tasks: BackgroundT
         db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
     
     Retorna:
-        Mensaje de que se ha trancrito todo de forma correcta.
-    """
-    background_tasks.add_task(
-        transcribe_audio,
-        db,
-        information.campaign_id,
-        information.audio,
-        information.filename,
-        information.summary
+        Mensaje de que se ha encolado la transcripción y el identificador del trabajo.
+
+    Lanza:
+        HTTPException: En caso de que el usuario no forme parte de la campaña de rol, de que la nota o el resumen
+        no sean de la campaña o de que el audio no sea un fichero de audio subido.
+    """
+    campaign = get_campaign_by_id(db=db, campaign_id=information.campaign_id)
+
+    if campaign is None or int(user_id) not in [int(member.id) for member in campaign.members]:
+        raise HTTPException(status_code=403, detail="You are not autorized to create a new transcription in this campaign.")
+
+    # La nota y el resumen tienen que ser de la misma campaña, para no poder escribir en las de otras.
+    for file_name in (information.filename, information.summary):
+        if get_campaign_note_by_file(db=db, campaign_id=information.campaign_id, file_name=file_name) is None:
+            raise HTTPException(status_code=404, detail="Nota no encontrada")
+
+    # El audio se elimina al cancelar el trabajo, así que solo se aceptan audios que existan.
+    if file_type(information.audio) != "audio":
+        raise HTTPException(status_code=400, detail="El fichero no es un audio")
+
+    try:
+        await asyncio.to_thread(storage_for(information.audio).stat, information.audio)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Audio no encontrado")
+
+    job = create_job(
+        db=db,
+        campaign_id=information.campaign_id,
+        user_id=user_id,
+        audio=information.audio,
+        filename=information.filename,
+        summary=information.summary
     )
     
-    return {"message": "Transcripción realizada correctamente"}
+    return {"message": "Transcripción realizada correctamente", "job_id": job.id}
+
+def _get_member_job(db: Session, job_id: int, user_id: int):
+    """
+    Obtiene un trabajo de transcripción comprobando que el usuario forma parte de su campaña.
+
+    Parámetros:
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+        job_id (int): Identificador del trabajo.
+        user_id (int): Identificador del usuario.
+
+    Retorna:
+        TranscriptionJob: Trabajo solicitado.
+
+    Lanza:
+        HTTPException: Si el trabajo no existe o el usuario no forma parte de la campaña.
+    """
+    job = get_job_by_id(db=db, job_id=job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+
+    campaign = get_campaign_by_id(db=db, campaign_id=job.campaign_id)
+
+    if int(user_id) not in [int(member.id) for member in campaign.members]:
+        raise HTTPException(status_code=403, detail="You are not allowed to see this transcription")
+
+    return job
+
+@router.get("/jobs/{id}", response_model=job_response)
+def job_status(id: int, user_id = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Endpoint para consultar el estado de un trabajo de transcripción.
+
+    Parámetros:
+        id (int): Identificador del trabajo.
+        user_id (int): Es inyectado de forma automática por 'Depends(get_current_user)' y de ahí se obtiene el identificador del usuario.
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+
+    Retorna:
+        job_response: Estado actual del trabajo.
+    """
+    return _get_member_job(db=db, job_id=id, user_id=user_id)
+
+@router.put("/jobs/{id}/cancel", response_model=job_response)
+def job_cancel(id: int, user_id = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Endpoint para cancelar un trabajo de transcripción pendiente o en curso.
+
+    Parámetros:
+        id (int): Identificador del trabajo.
+        user_id (int): Es inyectado de forma automática por 'Depends(get_current_user)' y de ahí se obtiene el identificador del usuario.
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+
+    Retorna:
+        job_response: Trabajo con el estado actualizado.
+    """
+    job = _get_member_job(db=db, job_id=id, user_id=user_id)
+
+    # Si ningún worker lo ha empezado, el audio ya no se va a usar.
+    if job.status == JOB_PENDING:
+        delete(job.audio)
+
+    return cancel_job(db=db, job_id=id)
+
+def _progress_event(job) -> dict:
+    """
+    Información de progreso de un trabajo que se envía a los clientes.
+
+    Parámetros:
+        job (TranscriptionJob): Trabajo de transcripción.
+
+    Retorna:
+        dict: Estado, etapa, porcentaje, segundos procesados y último texto del trabajo.
+    """
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "audio_seconds": job.audio_seconds,
+        "duration": job.duration,
+        "text": job.partial_text
+    }
+
+def _read_progress(job_id: int) -> dict:
+    """
+    Lee el progreso actual de un trabajo con una sesión propia, ya que el stream dura más que la petición.
+    """
+    db = SessionLocal()
+    try:
+        return _progress_event(get_job_by_id(db=db, job_id=job_id))
+    finally:
+        db.close()
+
+@router.get("/{filename}/progress")
+async def progress(filename: str, request: Request, user_id = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Endpoint que envía el progreso de la transcripción de una nota como eventos (Server-Sent Events).
+    Se envía un evento cada vez que cambia el progreso y el stream se cierra cuando el trabajo termina.
+
+    Parámetros:
+        filename (str): Nombre del fichero de la nota devuelto por '/transcription/start'.
+        request (Request): Petición, para detectar si el cliente se ha desconectado.
+        user_id (int): Es inyectado de forma automática por 'Depends(get_current_user)' y de ahí se obtiene el identificador del usuario.
+        db (Session): Sesión de SQLAlchemy para acceder a la base de datos.
+
+    Retorna:
+        StreamingResponse: Stream de eventos con el progreso (etapa, porcentaje, segundos procesados y texto parcial).
+
+    Lanza:
+        HTTPException: Si la nota no tiene ningún trabajo de transcripción o el usuario no forma parte de la campaña.
+    """
+    job = get_job_by_filename(db=db, filename=filename)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+
+    _get_member_job(db=db, job_id=job.id, user_id=user_id)
+    job_id = job.id
+
+    async def events():
+        last = None
+
+        while not await request.is_disconnected():
+            event = await asyncio.to_thread(_read_progress, job_id)
+
+            if event != last:
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                last = event
+
+            if event["status"] in (JOB_DONE, JOB_FAILED, JOB_CANCELLED):
+                break
+
+            await asyncio.sleep(settings.PROGRESS_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.websocket("/live/{filename}")
+async def live(websocket: WebSocket, filename: str, campaign_id: int, token: str, summary: str = None):
+    """
+    Endpoint para transcribir una sesión en directo.
+    El cliente envía fragmentos de audio PCM de 16 bits, mono y a 16 kHz como mensajes binarios, y el mensaje
+    de texto "end" para terminar. El texto confirmado se añade a la nota y se devuelve al cliente como {"text": ...}.
+
+    Parámetros:
+        websocket (WebSocket): Conexión con el cliente.
+        filename (str): Nombre del fichero de la nota devuelto por '/transcription/start'.
+        campaign_id (int): Campaña a la que pertenece la sesión.
+        token (str): Token de acceso del usuario, ya que los websockets no permiten la cabecera de autorización.
+        summary (str): Nombre del fichero de la nota del resumen. Si se indica, el resumen se actualiza durante la sesión.
+    """
+    try:
+        user_id = get_user_id(token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    # La sesión puede durar horas, así que la base de datos solo se usa para las comprobaciones iniciales
+    # y la conexión se devuelve al pool antes de aceptar el websocket.
+    db = SessionLocal()
+    try:
+        campaign = get_campaign_by_id(db=db, campaign_id=campaign_id)
+
+        # La nota y el resumen tienen que ser de la misma campaña, para no poder escribir en las de otras.
+        allowed = (
+            campaign is not None
+            and int(user_id) in [int(member.id) for member in campaign.members]
+            and get_campaign_note_by_file(db=db, campaign_id=campaign_id, file_name=filename) is not None
+            and (summary is None or get_campaign_note_by_file(db=db, campaign_id=campaign_id, file_name=summary) is not None)
+        )
+        name_index = get_name_index(db=db, campaign_id=campaign_id) if allowed else None
+    finally:
+        db.close()
+
+    if not allowed:
+        await websocket.close(code=1008)
+        return
+
+    # Se importa aquí para que whisper solo se cargue en los procesos que atienden sesiones en directo.
+    from aux_func.live_transcription import LiveTranscriber
+
+    await websocket.accept()
+    transcriber = LiveTranscriber(name_index=name_index, file=filename, summary=summary)
+    closed = False
+
+    try:
+        while True:
+            message = await websocket.receive()
+
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("bytes"):
+                text = await transcriber.feed(message["bytes"])
+            elif message.get("text") == "end":
+                closed = True
+                await websocket.send_json({"text": await transcriber.close()})
+                await websocket.close()
+                return
+            else:
+                continue
+
+            if text:
+                await websocket.send_json({"text": text})
+
+    except WebSocketDisconnect:
+        pass
+
+    finally:
+        # Si el cliente se desconecta sin avisar o hay un error, se guarda igualmente el audio pendiente.
+        if not closed:
+            await transcriber.close()
 
 @router.put("/clean") #, response_model=note_response
 async def clean(information: clean_info, user_id = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, datetime
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 
@@ -288,4 +288,81 @@ class clean_info(BaseModel):
         filename (str): Nombre del fichero donde se va a guardar el resultado de la transcripción
     """
     campaign_id: int
-    filename: str
\ No newline at end of file
+    filename: str
+
+class job_response(BaseModel):
+    """
+    Modelo de respuesta con el estado de un trabajo de transcripción.
+
+    Atributos:
+        id (int): Identificador del trabajo.
+        campaign_id (int): Identificador de la campaña a la que pertenece.
+        filename (str): Nombre del fichero de la transcripción.
+        summary (str): Nombre del fichero del resumen.
+        status (str): Estado del trabajo (pending, running, done, failed o cancelled).
+        error (str): Mensaje de error en caso de que el trabajo haya fallado.
+        created_at (datetime): Fecha de creación del trabajo.
+        stage (str): Etapa en la que se encuentra (decode, transcribe, cleanup o summarize).
+        progress (float): Porcentaje del audio procesado.
+        audio_seconds (float): Segundos de audio procesados.
+        duration (float): Duración total del audio en segundos.
+    """
+    id: int
+    campaign_id: int
+    filename: str
+    summary: str
+    status: str
+    error: Optional[str]
+    created_at: datetime
+    stage: Optional[str]
+    progress: Optional[float]
+    audio_seconds: Optional[float]
+    duration: Optional[float]
+
+class summary_request(BaseModel):
+    """
+    Modelo de entrada del servidor de resúmenes.
+
+    Atributos:
+        text (str): Texto a resumir o a añadir al resumen.
+        summary (str): Resumen actual, solo cuando se quiere actualizar un resumen existente.
+        stream (bool): Indica si también se devuelven los tokens del resumen según se generan.
+    """
+    text: str
+    summary: Optional[str] = None
+    stream: bool = False
+
+class summary_response(BaseModel):
+    """
+    Modelo de respuesta del servidor de resúmenes.
+
+    Atributos:
+        summary (str): Resumen generado.
+    """
+    summary: str
+
+class upload_init(BaseModel):
+    """
+    Modelo de entrada para iniciar una subida por partes.
+
+    Atributos:
+        filename (str): Nombre original del fichero, del que se toma la extensión.
+        size (int): Tamaño total del fichero en bytes, si se conoce.
+    """
+    filename: str
+    size: Optional[int] = None
+
+class upload_status(BaseModel):
+    """
+    Modelo de respuesta con el estado de una subida por partes.
+
+    Atributos:
+        upload_id (str): Identificador de la subida.
+        filename (str): Nombre original del fichero.
+        offset (int): Bytes recibidos hasta el momento; la siguiente parte debe empezar en esta posición.
+        size (int): Tamaño total del fichero en bytes, si se conoce.
+    """
+    upload_id: str
+    filename: str
+    offset: int
+    size: Optional[int]
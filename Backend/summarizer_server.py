@@ -0,0 +1,152 @@
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from config import settings
+from aux_func.Summarizer import Summarizer
+from schema import summary_request, summary_response
+
+# Servidor local del modelo de resumen.
+# El modelo se carga una sola vez por nodo y todos los procesos de la API y workers le envían las peticiones,
+# que se atienden de una en una en orden de llegada. GPT4All no permite agrupar varias generaciones en un
+# mismo lote (continuous batching), así que la cola evita que las peticiones simultáneas compitan por el modelo.
+
+# Segundos entre los avisos que se envían al cliente mientras su petición espera en la cola o se genera.
+KEEPALIVE_SECONDS = 5
+
+summarizer = None
+requests_queue = asyncio.Queue()
+
+class ClientDisconnected(Exception):
+    """
+    Se lanza en la generación cuando el cliente que la pidió se ha desconectado, para no seguir generando.
+    """
+
+async def _serve_queue():
+    """
+    Bucle que ejecuta en el modelo las peticiones encoladas, una detrás de otra.
+    Las peticiones cuyo cliente se ha desconectado mientras esperaban se descartan sin ejecutarlas.
+    """
+    while True:
+        function, args, future = await requests_queue.get()
+
+        if future.cancelled():
+            continue
+
+        try:
+            result = await asyncio.to_thread(function, *args)
+        except Exception as e:
+            if not future.cancelled():
+                future.set_exception(e)
+        else:
+            if not future.cancelled():
+                future.set_result(result)
+
+async def _respond(function, *args, stream: bool = False):
+    """
+    Encola una llamada al modelo y devuelve la respuesta como líneas JSON según avanza:
+    {"status": "queued"} o {"status": "running"} cada `KEEPALIVE_SECONDS` segundos mientras espera o se genera,
+    {"token": texto} con cada token si se ha pedido `stream`, y al final {"summary": texto} o {"error": mensaje}.
+    Los avisos permiten al cliente distinguir una petición que espera su turno de un servidor que no responde.
+    Si el cliente se desconecta, la petición se quita de la cola o se detiene en el siguiente token.
+
+    Parámetros:
+        function: Método del modelo que se ejecuta. Debe aceptar el parámetro `on_token`.
+        args: Argumentos del método.
+        stream: Indica si se envían los tokens según se generan.
+
+    Retorna:
+        Generador asíncrono con las líneas de la respuesta.
+    """
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue()
+    future = loop.create_future()
+    started = threading.Event()
+    disconnected = threading.Event()
+
+    def on_token(token: str):
+        if disconnected.is_set():
+            raise ClientDisconnected()
+        if stream:
+            loop.call_soon_threadsafe(messages.put_nowait, {"token": token})
+
+    def run(*args):
+        started.set()
+        return function(*args, on_token=on_token)
+
+    future.add_done_callback(lambda _: messages.put_nowait(None))
+    await requests_queue.put((run, args, future))
+
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(messages.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                message = {"status": "running" if started.is_set() else "queued"}
+
+            if message is None:
+                break
+
+            yield json.dumps(message, ensure_ascii=False) + "\n"
+
+        try:
+            yield summary_response(summary=future.result()).model_dump_json() + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+    finally:
+        # Si el cliente se ha desconectado antes del resultado, se descarta la petición.
+        disconnected.set()
+        future.cancel()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global summarizer
+
+    summarizer = await asyncio.to_thread(Summarizer, settings.SUMMARIZER_MODEL)
+    consumer = asyncio.create_task(_serve_queue())
+
+    yield
+
+    consumer.cancel()
+    summarizer.close()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.get("/health")
+async def health():
+    """
+    Endpoint para comprobar que el servidor está disponible.
+
+    Retorna:
+        Estado del servidor y número de peticiones en cola.
+    """
+    return {"status": "ok", "queued": requests_queue.qsize()}
+
+@app.post("/summarize")
+async def summarize(request: summary_request):
+    """
+    Endpoint para resumir un texto.
+
+    Parámetros:
+        request (summary_request): Texto a resumir.
+
+    Retorna:
+        StreamingResponse con el progreso y el resumen en líneas JSON (ver `_respond`).
+    """
+    return StreamingResponse(_respond(summarizer.summarize, request.text, stream=request.stream), media_type="application/x-ndjson")
+
+@app.post("/refine")
+async def refine(request: summary_request):
+    """
+    Endpoint para añadir un texto nuevo a un resumen existente.
+
+    Parámetros:
+        request (summary_request): Resumen actual y texto nuevo.
+
+    Retorna:
+        StreamingResponse con el progreso y el resumen actualizado en líneas JSON (ver `_respond`).
+    """
+    return StreamingResponse(_respond(summarizer.refine, request.summary or "", request.text, stream=request.stream), media_type="application/x-ndjson")
@@ -0,0 +1,8 @@
+"""
+Configuración común de las pruebas. `config.Settings` exige la URL de la base de datos y la clave secreta,
+así que se les da un valor por defecto para poder importar la aplicación sin un fichero .env.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test")
@@ -0,0 +1,104 @@
+import hashlib
+import io
+import threading
+from datetime import datetime, timezone
+
+# Cliente S3 falso en memoria, con la parte de la interfaz de boto3 que usa `S3Storage`.
+# Sirve para probar el almacenamiento S3 sin red ni credenciales:
+#
+#     storage = S3Storage("bucket", client=FakeS3Client())
+
+class FakeClientError(Exception):
+    """
+    Error con la misma forma que `botocore.exceptions.ClientError`: el código está en `response["Error"]["Code"]`.
+    """
+    def __init__(self, code: str, operation: str):
+        super().__init__(f"{operation}: {code}")
+        self.response = {"Error": {"Code": code}}
+
+class FakeS3Client:
+    """
+    Bucket en memoria que guarda cada objeto con su contenido, ETag (MD5 del contenido, como S3 en las subidas
+    simples), fecha de modificación y tipo de contenido. Admite lecturas por rangos y escrituras condicionales
+    con If-Match / If-None-Match. Las operaciones son atómicas, como en S3.
+    """
+    class exceptions:
+        ClientError = FakeClientError
+
+    def __init__(self):
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def _get(self, bucket: str, key: str, operation: str) -> dict:
+        obj = self.objects.get((bucket, key))
+        if obj is None:
+            raise FakeClientError("404" if operation == "HeadObject" else "NoSuchKey", operation)
+
+        return obj
+
+    def _store(self, bucket: str, key: str, body: bytes, content_type: str = "binary/octet-stream") -> dict:
+        obj = {
+            "Body": body,
+            "ETag": f'"{hashlib.md5(body).hexdigest()}"',
+            "LastModified": datetime.now(timezone.utc),
+            "ContentType": content_type
+        }
+        self.objects[(bucket, key)] = obj
+
+        return obj
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, IfMatch: str = None, IfNoneMatch: str = None, ContentType: str = None) -> dict:
+        with self._lock:
+            current = self.objects.get((Bucket, Key))
+
+            if IfNoneMatch == "*" and current is not None:
+                raise FakeClientError("PreconditionFailed", "PutObject")
+            if IfMatch is not None and (current is None or current["ETag"] != IfMatch):
+                raise FakeClientError("PreconditionFailed" if current is not None else "NoSuchKey", "PutObject")
+
+            obj = self._store(Bucket, Key, bytes(Body), ContentType or "binary/octet-stream")
+
+        return {"ETag": obj["ETag"]}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, ExtraArgs: dict = None):
+        with open(Filename, "rb") as f:
+            body = f.read()
+
+        with self._lock:
+            self._store(Bucket, Key, body, (ExtraArgs or {}).get("ContentType", "binary/octet-stream"))
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        with self._lock:
+            obj = self._get(Bucket, Key, "HeadObject")
+
+            return {
+                "ContentLength": len(obj["Body"]),
+                "ContentType": obj["ContentType"],
+                "ETag": obj["ETag"],
+                "LastModified": obj["LastModified"]
+            }
+
+    def get_object(self, Bucket: str, Key: str, Range: str = None) -> dict:
+        with self._lock:
+            obj = self._get(Bucket, Key, "GetObject")
+            body = obj["Body"]
+
+            if Range is not None:
+                start, _, end = Range.removeprefix("bytes=").partition("-")
+                body = body[int(start):int(end) + 1 if end else None]
+
+            return {
+                "Body": io.BytesIO(body),
+                "ContentLength": len(body),
+                "ETag": obj["ETag"],
+                "LastModified": obj["LastModified"]
+            }
+
+    def delete_object(self, Bucket: str, Key: str) -> dict:
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+
+        return {}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: dict, ExpiresIn: int = 3600) -> str:
+        return f"https://{Params['Bucket']}.s3.fake/{Params['Key']}?X-Amz-Expires={ExpiresIn}"
@@ -0,0 +1,127 @@
+"""
+Pruebas del almacenamiento local repartido en carpetas, de sus contadores de referencias y de la referencia
+que se elimina al volver a subir la imagen que ya tenía un registro.
+Se ejecutan desde la carpeta Backend con `python -m pytest tests`.
+"""
+import os
+from uuid import uuid4
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from aux_func import file_store, files_aux
+from aux_func.storage import LocalStorage
+from db.database import Base
+from db.models import User, Campaign
+from db.user_crud import update_user
+from db.campaign_crud import update_campaign
+
+NAME = "abcdef0123.png"
+CONTENT = b"imagen"
+
+@pytest.fixture
+def folder(tmp_path):
+    return str(tmp_path)
+
+@pytest.fixture
+def write_tmp(folder):
+    def write(content: bytes = CONTENT) -> str:
+        path = os.path.join(folder, f".{uuid4()}.tmp")
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    return write
+
+@pytest.fixture
+def db(folder, monkeypatch):
+    # Los CRUD usan la carpeta de archivos por defecto, así que se sustituye por la de la prueba.
+    monkeypatch.setattr(files_aux, "storage_for", lambda filename, upload_folder=None: LocalStorage(folder))
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def test_files_are_sharded_by_name(folder, write_tmp):
+    file_store.put(write_tmp(), NAME, folder)
+
+    path = os.path.join(folder, "ab", "cd", NAME)
+    assert file_store.shard_path(NAME, folder) == path
+    assert file_store.file_path(NAME, folder) == path
+    assert file_store.relative_path(NAME, folder) == os.path.join("ab", "cd", NAME)
+    assert os.listdir(folder) == ["ab"]
+
+@pytest.mark.parametrize("name", ["", ".refs", ".uploads", "../fuera.png", "a/b.png"])
+def test_rejects_paths(folder, name):
+    with pytest.raises(FileNotFoundError):
+        file_store.shard_path(name, folder)
+
+def test_legacy_files_are_found_in_the_root(folder):
+    legacy = os.path.join(folder, NAME)
+    with open(legacy, "wb") as f:
+        f.write(CONTENT)
+
+    assert file_store.file_path(NAME, folder) == legacy
+    assert file_store.references(NAME, folder) == 1
+    assert b"".join(LocalStorage(folder).open(NAME)) == CONTENT
+
+    file_store.release(NAME, folder)
+    assert not os.path.exists(legacy)
+
+def test_shared_file_counts_references(folder, write_tmp):
+    for refs in range(1, 4):
+        assert file_store.put_shared(write_tmp(), NAME, folder) == NAME
+        assert file_store.references(NAME, folder) == refs
+
+    path = file_store.file_path(NAME, folder)
+    assert file_store.is_shared(NAME, folder)
+    # Las copias repetidas se descartan y solo queda el fichero compartido con su contador.
+    assert sorted(os.listdir(os.path.dirname(path))) == [NAME, f"{NAME}.refs"]
+    assert [name for name in os.listdir(folder) if name.endswith(".tmp")] == []
+
+    for refs in range(2, -1, -1):
+        file_store.release(NAME, folder)
+        assert file_store.references(NAME, folder) == refs
+
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + ".refs")
+
+def test_own_file_is_removed_directly(folder, write_tmp):
+    file_store.put(write_tmp(), NAME, folder)
+    assert not file_store.is_shared(NAME, folder)
+
+    file_store.release(NAME, folder)
+    assert file_store.references(NAME, folder) == 0
+
+def add_user(db, avatar: str) -> User:
+    user = User(email="a@a.com", nickname="a", avatar=avatar, hashedPass="")
+    db.add(user)
+    db.commit()
+    return user
+
+def test_reuploading_the_same_avatar_releases_the_upload_reference(db, folder, write_tmp):
+    file_store.put_shared(write_tmp(), NAME, folder)
+    user = add_user(db, NAME)
+
+    # La subida de la misma imagen añade una referencia que el usuario no necesita.
+    file_store.put_shared(write_tmp(), NAME, folder)
+    update_user(db, user.id, user_new_avatar=NAME)
+
+    assert file_store.references(NAME, folder) == 1
+
+def test_unchanged_image_keeps_its_reference(db, folder, write_tmp):
+    file_store.put_shared(write_tmp(), NAME, folder)
+    user = add_user(db, NAME)
+    file_store.put_shared(write_tmp(), NAME, folder)
+    campaign = Campaign(title="Campaña", description="", img_name=NAME, invite_code="abc")
+    db.add(campaign)
+    db.commit()
+
+    # Los clientes envían el nombre actual aunque no cambien la imagen.
+    update_campaign(db, campaign.id, img_name=NAME)
+    update_user(db, user.id, user_new_avatar=NAME)
+
+    assert file_store.references(NAME, folder) == 2
@@ -0,0 +1,56 @@
+"""
+Pruebas de la lectura de ficheros de formularios multipart directamente del cuerpo de la petición.
+Se ejecutan desde la carpeta Backend con `python -m pytest tests`.
+"""
+import os
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from aux_func.files_aux import form_file, write_stream, FileTooLargeError, InvalidFormError
+
+LIMIT = 1024 * 1024
+
+@pytest.fixture
+def client(tmp_path):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        try:
+            filename, chunks = await form_file(request)
+            size, digest = await write_stream(chunks, os.path.join(tmp_path, "data"), LIMIT)
+        except FileTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except InvalidFormError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        with open(os.path.join(tmp_path, "data"), "rb") as f:
+            content = f.read()
+
+        return {"filename": filename, "size": size, "content": content.decode("latin-1")}
+
+    return TestClient(app)
+
+def test_reads_file_field(client):
+    content = bytes(range(256)) * 1000
+    response = client.post("/upload", data={"otro": "campo"}, files={"file": ("sesión.m4a", content)})
+
+    assert response.status_code == 200
+    assert response.json()["filename"] == "sesión.m4a"
+    assert response.json()["size"] == len(content)
+    assert response.json()["content"].encode("latin-1") == content
+
+def test_rejects_too_large_file(client, tmp_path):
+    response = client.post("/upload", files={"file": ("audio.m4a", b"0" * (LIMIT + 1))})
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == "El fichero supera el tamaño máximo de 1 MB"
+    assert os.listdir(tmp_path) == []
+
+@pytest.mark.parametrize("kwargs", [
+    {"data": {"file": "no es un fichero"}},
+    {"files": {"otro": ("audio.m4a", b"0")}},
+    {"content": b"0", "headers": {"Content-Type": "application/octet-stream"}}
+])
+def test_rejects_requests_without_file(client, kwargs):
+    assert client.post("/upload", **kwargs).status_code == 400
@@ -0,0 +1,80 @@
+"""
+Pruebas del orden en el que los workers reservan los trabajos de transcripción, con una base de datos SQLite en memoria.
+Se ejecutan desde la carpeta Backend con `python -m pytest tests`.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from db.database import Base
+from db.job_crud import *
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def add_job(db, filename: str) -> int:
+    return create_job(db=db, campaign_id=1, user_id=1, audio=f"{filename}.wav", filename=filename, summary=f"{filename}-resumen").id
+
+def test_claims_oldest_pending_job(db):
+    first = add_job(db, "a")
+    second = add_job(db, "b")
+
+    assert claim_next_job(db, "w1").id == first
+    assert claim_next_job(db, "w2").id == second
+    assert claim_next_job(db, "w3") is None
+
+def test_jobs_of_a_note_run_one_at_a_time_in_order(db):
+    first = add_job(db, "a")
+    second = add_job(db, "a")
+    other = add_job(db, "b")
+
+    assert claim_next_job(db, "w1").id == first
+    # El segundo trabajo de la nota espera a que termine el primero, pero los de otras notas no.
+    assert claim_next_job(db, "w2").id == other
+    assert claim_next_job(db, "w3") is None
+
+    finish_job(db=db, job_id=first, status=JOB_DONE)
+    assert claim_next_job(db, "w3").id == second
+
+def test_requeued_job_keeps_its_turn(db):
+    first = add_job(db, "a")
+    second = add_job(db, "a")
+
+    claim_next_job(db, "w1")
+    assert requeue_stale_jobs(db, timeout_seconds=-1, max_attempts=3) == 1
+
+    # El trabajo devuelto a la cola se reanuda antes que los posteriores de la misma nota.
+    assert claim_next_job(db, "w2").id == first
+    finish_job(db=db, job_id=first, status=JOB_FAILED, error="error")
+    assert claim_next_job(db, "w2").id == second
+
+def test_job_that_keeps_crashing_fails(db):
+    job_id = add_job(db, "a")
+
+    for _ in range(2):
+        assert claim_next_job(db, "w1").id == job_id
+        assert requeue_stale_jobs(db, timeout_seconds=-1, max_attempts=3) == 1
+
+    claim_next_job(db, "w1")
+    assert requeue_stale_jobs(db, timeout_seconds=-1, max_attempts=3) == 0
+
+    job = get_job_by_id(db=db, job_id=job_id)
+    assert job.status == JOB_FAILED
+    assert job.attempts == 3
+    assert claim_next_job(db, "w1") is None
+
+def test_sizes_are_kept_between_attempts(db):
+    job_id = add_job(db, "a")
+    claim_next_job(db, "w1")
+    set_job_sizes(db=db, job_id=job_id, note_size=120, summary_size=40)
+
+    requeue_stale_jobs(db, timeout_seconds=-1, max_attempts=3)
+    job = claim_next_job(db, "w2")
+
+    assert (job.attempts, job.note_size, job.summary_size) == (2, 120, 40)
@@ -0,0 +1,100 @@
+"""
+Pruebas de la carga y descarga de los modelos con `LazyModel`, con un modelo falso.
+Se ejecutan desde la carpeta Backend con `python -m pytest tests`.
+"""
+import asyncio
+import threading
+import time
+import pytest
+from aux_func.lazy_model import LazyModel
+
+class FakeModel:
+    """
+    Modelo falso que falla si se usa después de cerrarlo, como los modelos reales.
+    """
+    instances = 0
+
+    def __init__(self):
+        FakeModel.instances += 1
+        self.closed = False
+        self.size = 3
+
+    def generate(self, prompt: str) -> str:
+        if self.closed:
+            raise RuntimeError("generate on closed model")
+        return prompt.upper()
+
+    def summarize(self, parts: list[str], between=None) -> str:
+        # Como `Summarizer.summarize`: varias llamadas a `generate` sobre la misma instancia.
+        results = []
+        for part in parts:
+            if between is not None:
+                between()
+            results.append(self.generate(part))
+        return " ".join(results)
+
+    async def generate_async(self, prompt: str, between=None) -> str:
+        await asyncio.sleep(0)
+        if between is not None:
+            between()
+        return self.generate(prompt)
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def model():
+    return LazyModel(FakeModel, "falso", idle_seconds=0)
+
+def test_loads_on_first_use(model):
+    assert not model.loaded
+    assert model.size == 3
+    assert model.loaded
+
+def test_idle_unload_waits_for_method_in_progress(model):
+    # El vigilante se ejecuta entre dos llamadas internas del modelo, cuando ya ha pasado el tiempo de inactividad.
+    assert model.summarize(["a", "b"], between=lambda: model.unload(only_idle=True)) == "A B"
+    assert model.loaded
+
+    model.unload(only_idle=True)
+    assert not model.loaded
+
+def test_idle_unload_waits_for_coroutine_in_progress(model):
+    assert asyncio.run(model.generate_async("a", between=lambda: model.unload(only_idle=True))) == "A"
+    assert model.loaded
+
+def test_use_keeps_model_loaded(model):
+    with model.use() as instance:
+        model.unload(only_idle=True)
+        assert instance.generate("a") == "A"
+
+    model.unload(only_idle=True)
+    assert instance.closed
+
+def test_unload_waits_for_users(model):
+    used = threading.Event()
+    results = []
+
+    def work():
+        with model.use() as instance:
+            used.set()
+            time.sleep(0.2)
+            results.append(instance.generate("a"))
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    assert used.wait(5)
+
+    model.unload()
+    thread.join()
+
+    assert results == ["A"]
+    assert not model.loaded
+
+def test_reloads_after_unload(model):
+    FakeModel.instances = 0
+    model.generate("a")
+    model.unload()
+
+    assert model.generate("b") == "B"
+    assert FakeModel.instances == 2
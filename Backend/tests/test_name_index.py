@@ -0,0 +1,33 @@
+"""
+Pruebas de equivalencia de la corrección de nombres de `NameIndex` con el bucle original,
+que comparaba cada palabra con todos los nombres. Se ejecutan desde la carpeta Backend con `python -m pytest tests`.
+"""
+import random
+import pytest
+from aux_func.name_index import NameIndex
+from benchmarks.name_index import misspell, random_names, random_transcript, reference_correct
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_reference_loop(seed):
+    rng = random.Random(seed)
+    names = random_names(rng, rng.randint(1, 60))
+    # Nombres repetidos o que solo cambian en mayúsculas, para comprobar los empates.
+    names += [names[0], names[-1].upper(), misspell(rng, names[0])]
+    words = random_transcript(rng, 2000, names)
+    words += [misspell(rng, misspell(rng, rng.choice(names))) for _ in range(500)]
+
+    name_index = NameIndex(names)
+
+    assert [name_index.correct(word) for word in words] == [reference_correct(names, word) for word in words]
+
+def test_examples():
+    name_index = NameIndex(["Gorl", "Zephyr", "Aelar"])
+
+    assert name_index.correct("Gol") == "Gorl"
+    assert name_index.correct("zephir") == "Zephyr"
+    assert name_index.correct("dragón") == "dragón"
+    # Las palabras cortas pueden quedar cerca de un nombre, igual que con el bucle original.
+    assert name_index.correct("el") == reference_correct(["Gorl", "Zephyr", "Aelar"], "el")
+
+def test_no_names():
+    assert NameIndex([]).correct("Gorl") == "Gorl"
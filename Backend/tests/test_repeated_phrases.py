@@ -0,0 +1,29 @@
+"""
+Pruebas de equivalencia de `remove_repeated_phrases` con la implementación original.
+Se ejecutan desde la carpeta Backend con `python -m pytest tests`.
+"""
+import random
+import pytest
+from aux_func.text_cleaner import remove_repeated_phrases
+from benchmarks.repeated_phrases import reference_remove_repeated_phrases, random_transcript
+
+@pytest.mark.parametrize("seed", range(200))
+def test_same_output_as_reference(seed):
+    rng = random.Random(seed)
+    max_ngram = rng.randint(1, 10)
+
+    for _ in range(25):
+        text = random_transcript(rng, rng.randint(0, 200), max_ngram)
+        assert remove_repeated_phrases(text, max_ngram) == reference_remove_repeated_phrases(text, max_ngram)
+
+@pytest.mark.parametrize("text", [
+    "",
+    "hola",
+    "a a a a a",
+    "a b a b a b c",
+    "a b c a b c a b",
+    "uno dos tres uno dos tres uno dos tres cuatro cuatro"
+])
+def test_edge_cases(text):
+    for max_ngram in range(1, 6):
+        assert remove_repeated_phrases(text, max_ngram) == reference_remove_repeated_phrases(text, max_ngram)
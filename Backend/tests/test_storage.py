@@ -0,0 +1,143 @@
+"""
+Pruebas de los almacenamientos de ficheros. Las mismas pruebas se ejecutan con el disco local y con S3,
+usando el cliente falso en memoria en lugar de boto3.
+Se ejecutan desde la carpeta Backend con `python -m pytest tests`.
+"""
+import os
+import threading
+from uuid import uuid4
+import pytest
+from fake_s3 import FakeS3Client
+from aux_func.storage import LocalStorage, S3Storage
+
+CONTENT = b"0123456789" * 100
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request, tmp_path):
+    if request.param == "local":
+        return LocalStorage(str(tmp_path))
+
+    return S3Storage("bucket", prefix="files/", client=FakeS3Client())
+
+@pytest.fixture
+def write_tmp(tmp_path):
+    def write(content: bytes = CONTENT) -> str:
+        path = os.path.join(tmp_path, f".{uuid4()}.tmp")
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    return write
+
+def test_put_stat_and_open(storage, write_tmp):
+    tmp = write_tmp()
+    assert storage.put(tmp, "nota.bin") == "nota.bin"
+    assert not os.path.exists(tmp)
+
+    stat = storage.stat("nota.bin")
+    assert stat.size == len(CONTENT)
+    assert stat.etag.startswith('"') and stat.etag.endswith('"')
+
+    assert b"".join(storage.open("nota.bin")) == CONTENT
+    assert b"".join(storage.open("nota.bin", 5, 14)) == CONTENT[5:15]
+    assert b"".join(storage.open("nota.bin", 990)) == CONTENT[990:]
+
+def test_missing_file(storage):
+    with pytest.raises(FileNotFoundError):
+        storage.stat("no-existe.png")
+
+    with pytest.raises(FileNotFoundError):
+        list(storage.open("no-existe.png"))
+
+    # Eliminar un fichero que no existe no es un error.
+    storage.delete("no-existe.png")
+
+def test_delete_own_file(storage, write_tmp):
+    storage.put(write_tmp(), "nota.bin")
+    assert storage.references("nota.bin") == 1
+
+    storage.delete("nota.bin")
+    assert storage.references("nota.bin") == 0
+
+    with pytest.raises(FileNotFoundError):
+        storage.stat("nota.bin")
+
+def test_shared_file_is_removed_with_last_reference(storage, write_tmp):
+    for _ in range(3):
+        storage.put(write_tmp(), "abcdef.png", shared=True)
+
+    assert storage.references("abcdef.png") == 3
+
+    for _ in range(2):
+        storage.delete("abcdef.png")
+        assert storage.stat("abcdef.png").size == len(CONTENT)
+
+    assert storage.references("abcdef.png") == 1
+
+    storage.delete("abcdef.png")
+
+    with pytest.raises(FileNotFoundError):
+        storage.stat("abcdef.png")
+
+@pytest.mark.parametrize("name", ["", ".refs", "../fuera.png", "a/b.png", "/tmp/fuera.png"])
+def test_rejects_paths(storage, write_tmp, name):
+    with pytest.raises(FileNotFoundError):
+        storage.stat(name)
+
+def test_presign():
+    storage = S3Storage("bucket", prefix="files/", client=FakeS3Client(), presign_seconds=60)
+    assert storage.presign("abcdef.png") == "https://bucket.s3.fake/files/abcdef.png?X-Amz-Expires=60"
+    assert LocalStorage().presign("abcdef.png") is None
+
+def test_s3_concurrent_references(write_tmp):
+    client = FakeS3Client()
+    storage = S3Storage("bucket", client=client)
+    paths = [write_tmp() for _ in range(16)]
+
+    def put(path):
+        storage.put(path, "abcdef.png", shared=True)
+
+    threads = [threading.Thread(target=put, args=(path,)) for path in paths]
+    [thread.start() for thread in threads]
+    [thread.join() for thread in threads]
+
+    assert storage._read_refs("abcdef.png")[0] == 16
+
+    threads = [threading.Thread(target=storage.delete, args=("abcdef.png",)) for _ in range(16)]
+    [thread.start() for thread in threads]
+    [thread.join() for thread in threads]
+
+    # Sin referencias no queda ni el fichero ni su contador.
+    assert client.objects == {}
+
+def test_s3_waits_for_deletion_in_progress(write_tmp):
+    client = FakeS3Client()
+    storage = S3Storage("bucket", client=client)
+    storage.put(write_tmp(), "abcdef.png", shared=True)
+
+    # Otro nodo ha dejado el contador a 0 y está borrando el fichero.
+    assert storage._remove_ref("abcdef.png")
+
+    def finish_delete():
+        client.delete_object(Bucket="bucket", Key="abcdef.png")
+        client.delete_object(Bucket="bucket", Key=".refs/abcdef.png")
+
+    timer = threading.Timer(0.3, finish_delete)
+    timer.start()
+    storage.put(write_tmp(), "abcdef.png", shared=True)
+    timer.join()
+
+    # La subida ha esperado al borrado, así que el fichero existe y tiene una referencia.
+    assert storage.stat("abcdef.png").size == len(CONTENT)
+    assert storage._read_refs("abcdef.png")[0] == 1
+
+def test_s3_recovers_interrupted_deletion(write_tmp):
+    storage = S3Storage("bucket", client=FakeS3Client())
+    storage.DELETE_TIMEOUT = 0
+    storage.put(write_tmp(), "abcdef.png", shared=True)
+    storage._remove_ref("abcdef.png")
+
+    storage.put(write_tmp(), "abcdef.png", shared=True)
+
+    assert storage._read_refs("abcdef.png")[0] == 1
+    assert storage.stat("abcdef.png").size == len(CONTENT)
@@ -0,0 +1,55 @@
+"""
+Pruebas del resumen por partes (map-reduce) de `Summarizer`, con un modelo falso que no necesita GPT4All.
+Se ejecutan desde la carpeta Backend con `python -m pytest tests`.
+"""
+import re
+import threading
+from aux_func.Summarizer import Summarizer
+
+class FakeSummarizer(Summarizer):
+    """
+    Resumidor con un modelo falso que devuelve el texto del prompt sin resumirlo, el peor caso para la reducción.
+    """
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+        self.max_tokens = token_budget
+        self._lock = threading.Lock()
+        self.prompts = []
+
+    def generate(self, prompt: str, on_token=None) -> str:
+        self.prompts.append(prompt)
+        text = prompt.split("\n\n", 1)[1].rsplit("\n\n", 1)[0]
+
+        if on_token is not None:
+            on_token(text)
+
+        return text
+
+def test_short_text_is_summarised_in_one_call():
+    summarizer = FakeSummarizer(token_budget=100)
+
+    assert summarizer.summarize("Gorl ataca al dragón.") == "Gorl ataca al dragón."
+    assert len(summarizer.prompts) == 1
+
+def test_chunks_fit_the_budget():
+    summarizer = FakeSummarizer(token_budget=50)
+    text = " ".join(f"Frase número {i} de la sesión." for i in range(200))
+
+    chunks = summarizer.split(text)
+
+    assert " ".join(chunks) == text
+    assert all(summarizer.count_tokens(chunk) <= summarizer.token_budget for chunk in chunks)
+
+def test_text_that_does_not_reduce_keeps_every_part():
+    summarizer = FakeSummarizer(token_budget=200)
+    text = " ".join(f"Parte{i} " + "palabra " * 40 + "fin." for i in range(60))
+
+    streamed = []
+    summary = summarizer.summarize(text, on_token=streamed.append)
+
+    # Tras el último nivel cada fragmento se recorta para que quepa, pero no se descarta ninguno:
+    # el resumen incluye el principio de todos, también los del final del texto.
+    assert summarizer.count_tokens(summary) <= summarizer.token_budget
+    parts = {int(number) for number in re.findall(r"Parte(\d+)", summary)}
+    assert min(parts) == 0 and max(parts) >= 58
+    assert streamed == [summary]
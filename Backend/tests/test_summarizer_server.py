@@ -0,0 +1,149 @@
+"""
+Pruebas del servidor de resúmenes y de su cliente, con un modelo falso en lugar de GPT4All.
+Se ejecutan desde la carpeta Backend con `python -m pytest tests`.
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from fastapi.testclient import TestClient
+import summarizer_server
+from aux_func.Summarizer import SummarizerClient
+
+class FakeSummarizer:
+    """
+    Modelo falso que tarda `delay` segundos en cada resumen y devuelve el texto en mayúsculas.
+    """
+    delay = 0.0
+
+    def __init__(self, model_path: str = None):
+        self.texts = []
+
+    def summarize(self, text: str, on_token=None) -> str:
+        self.texts.append(text)
+        time.sleep(self.delay)
+
+        if text == "falla":
+            raise ValueError("sin memoria")
+
+        for word in text.upper().split():
+            on_token(word + " ")
+
+        return text.upper()
+
+    def refine(self, summary: str, text: str, on_token=None) -> str:
+        return self.summarize(f"{summary} {text}", on_token)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(summarizer_server, "Summarizer", FakeSummarizer)
+    monkeypatch.setattr(summarizer_server, "requests_queue", asyncio.Queue())
+    monkeypatch.setattr(summarizer_server, "KEEPALIVE_SECONDS", 0.05)
+
+    with TestClient(summarizer_server.app) as client:
+        yield client
+
+def read_lines(client: TestClient, path: str, payload: dict) -> list[dict]:
+    with client.stream("POST", path, json=payload) as response:
+        return [json.loads(line) for line in response.iter_lines() if line]
+
+def test_returns_summary(server):
+    assert read_lines(server, "/summarize", {"text": "gorl ataca"})[-1] == {"summary": "GORL ATACA"}
+
+def test_streams_tokens(server):
+    lines = read_lines(server, "/refine", {"summary": "gorl", "text": "ataca", "stream": True})
+
+    assert [line["token"] for line in lines if "token" in line] == ["GORL ", "ATACA "]
+    assert lines[-1] == {"summary": "GORL ATACA"}
+
+def test_reports_errors(server):
+    assert read_lines(server, "/summarize", {"text": "falla"})[-1] == {"error": "sin memoria"}
+
+def test_sends_status_while_queued(server, monkeypatch):
+    monkeypatch.setattr(FakeSummarizer, "delay", 0.3)
+    results = {}
+
+    def request(name: str):
+        results[name] = read_lines(server, "/summarize", {"text": name})
+
+    threads = [threading.Thread(target=request, args=(name,)) for name in ("uno", "dos")]
+    [thread.start() for thread in threads]
+    [thread.join() for thread in threads]
+
+    # Las dos peticiones reciben avisos mientras esperan o se generan, y después su resumen.
+    for name, lines in results.items():
+        assert lines[-1] == {"summary": name.upper()}
+        assert {"status": "running"} in lines
+
+    assert any({"status": "queued"} in lines for lines in results.values())
+
+def test_disconnected_client_is_dropped(monkeypatch):
+    monkeypatch.setattr(summarizer_server, "KEEPALIVE_SECONDS", 0.05)
+    model = FakeSummarizer()
+    model.delay = 0.2
+
+    async def run():
+        monkeypatch.setattr(summarizer_server, "requests_queue", asyncio.Queue())
+        consumer = asyncio.create_task(summarizer_server._serve_queue())
+
+        first = summarizer_server._respond(model.summarize, "primero")
+        second = summarizer_server._respond(model.summarize, "segundo")
+
+        first_line = asyncio.create_task(first.__anext__())
+        await asyncio.sleep(0.01)
+        assert json.loads(await second.__anext__()) == {"status": "queued"}
+        await second.aclose()
+
+        await first_line
+        lines = [line async for line in first]
+        consumer.cancel()
+
+        return lines
+
+    lines = asyncio.run(run())
+
+    assert json.loads(lines[-1]) == {"summary": "PRIMERO"}
+    assert model.texts == ["primero"]
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """
+    Servidor que contesta como el de resúmenes: varios avisos espaciados y el resumen al final.
+    """
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        for _ in range(4):
+            time.sleep(0.15)
+            self.wfile.write(b'{"status": "queued"}\n')
+            self.wfile.flush()
+
+        if payload["stream"]:
+            self.wfile.write('{"token": "resumen "}\n{"token": "más"}\n'.encode())
+        self.wfile.write('{"summary": "resumen más"}\n'.encode())
+
+    def log_message(self, *args):
+        pass
+
+def test_client_waits_while_server_keeps_answering():
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+
+    try:
+        # La respuesta completa tarda más que el tiempo máximo de espera, pero llegan avisos antes.
+        client = SummarizerClient(f"http://127.0.0.1:{http_server.server_port}", timeout=0.4)
+        tokens = []
+
+        assert client.summarize("texto") == "resumen más"
+        assert client.refine("resumen", "texto", on_token=tokens.append) == "resumen más"
+        assert tokens == ["resumen ", "más"]
+    finally:
+        http_server.shutdown()
@@ -0,0 +1,63 @@
+"""
+Pruebas de equivalencia de la limpieza por partes (`TextCleaner`) con la limpieza del texto completo.
+Se ejecutan desde la carpeta Backend con `python -m pytest tests`.
+"""
+import random
+import re
+import pytest
+from aux_func.name_index import NameIndex
+from aux_func.text_cleaner import TextCleaner
+from benchmarks.name_index import reference_correct
+from benchmarks.repeated_phrases import reference_remove_repeated_phrases
+
+NAMES = ["Gorl", "Zephyr", "Aelar"]
+VOCABULARY = ["sí", "no", "el", "dragón", "ataca", "Gol", "Zephir", "eh", "tirada", "esteeeeeeee", "YYYYYYYYYY", "vale,"]
+
+def reference_cleanup(names: list[str], text: str) -> str:
+    """
+    Limpieza del texto completo de una vez, tal y como se hacía antes de limpiar por partes.
+    """
+    text = re.sub(r'(.)\1{5,}', r'\1', text)
+    text = re.sub(r'(\b\w+\b)(?:[\s,]+(?:\1))+', r'\1', text)
+    text = reference_remove_repeated_phrases(text, max_ngram=5)
+
+    return ' '.join(reference_correct(names, word) for word in text.split())
+
+def random_windows(rng: random.Random) -> list[str]:
+    """
+    Genera los textos de varias ventanas de whisper, con repeticiones de caracteres, palabras y frases.
+    """
+    windows = []
+
+    for _ in range(rng.randint(1, 15)):
+        words = []
+        size = rng.randint(0, 30)
+
+        while len(words) < size:
+            block = [rng.choice(VOCABULARY) for _ in range(rng.randint(1, 4))]
+            words.extend(block * (rng.randint(2, 4) if rng.random() < 0.3 else 1))
+
+        windows.append(" ".join(words))
+
+    return windows
+
+@pytest.mark.parametrize("seed", range(300))
+def test_same_output_as_full_cleanup(seed):
+    rng = random.Random(seed)
+    name_index = NameIndex(NAMES)
+    windows = random_windows(rng)
+
+    cleaner = TextCleaner(name_index)
+    parts = []
+
+    for window in windows:
+        parts.append(cleaner.feed(" " + window))
+
+        # Al reanudar una transcripción la limpieza continúa desde el estado guardado.
+        if rng.random() < 0.3:
+            cleaner = TextCleaner(name_index, state=cleaner.state())
+
+    parts.append(cleaner.finish())
+
+    expected = reference_cleanup(NAMES, "".join(" " + window for window in windows))
+    assert " ".join(part for part in parts if part) == expected
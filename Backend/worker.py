@@ -0,0 +1,182 @@
+import asyncio
+import os
+import socket
+from config import settings
+from db.database import SessionLocal, engine
+from db.models import Base
+from db.job_crud import *
+from aux_func.files_aux import delete
+from aux_func.file_store import file_path
+from aux_func.transcription_model import transcribe_audio
+from aux_func.whisper_singleton import whisper_instance
+from aux_func.Summarizer import summarizer_instance
+
+# Identificador de este proceso worker, se guarda en los trabajos que reserva.
+WORKER_NAME = f"{socket.gethostname()}-{os.getpid()}"
+
+class JobCancelled(Exception):
+    """
+    Se lanza cuando el usuario cancela un trabajo mientras se está procesando.
+    """
+
+def _reset_file(filename: str, size: int, upload_folder: str = settings.UPLOAD_FOLDER):
+    """
+    Recorta el fichero de una nota al tamaño indicado, para que un trabajo reanudado no duplique
+    el texto que se escribió después del último punto de control.
+
+    Parámetros:
+        filename: Nombre del fichero a recortar.
+        size: Tamaño en bytes que debe quedar.
+        upload_folder: Carpeta donde se encuentran los archivos.
+    """
+    os.truncate(file_path(filename, upload_folder), size)
+
+async def _heartbeat(job_id: int, cancelled: asyncio.Event):
+    """
+    Mantiene actualizado el latido del trabajo mientras se procesa y detecta si se ha cancelado.
+
+    Parámetros:
+        job_id: Identificador del trabajo.
+        cancelled: Evento que se activa cuando el trabajo se ha cancelado.
+    """
+    while True:
+        await asyncio.sleep(settings.JOB_STALE_SECONDS / 4)
+
+        db = SessionLocal()
+        try:
+            job = await asyncio.to_thread(heartbeat_job, db, job_id)
+            if job.status == JOB_CANCELLED:
+                cancelled.set()
+        finally:
+            db.close()
+
+async def run_job(job_id: int):
+    """
+    Procesa un trabajo de transcripción ya reservado por este worker.
+
+    Parámetros:
+        job_id: Identificador del trabajo.
+    """
+    db = SessionLocal()
+    cancelled = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(job_id, cancelled))
+
+    try:
+        job = get_job_by_id(db=db, job_id=job_id)
+        note_path = file_path(job.filename)
+        summary_path = file_path(job.summary)
+
+        async def on_chunk(index: int, offset: float, text: str, cleaner_state: str):
+            if cancelled.is_set():
+                raise JobCancelled()
+
+            size = await asyncio.to_thread(os.path.getsize, note_path)
+            add_checkpoint(db=db, job_id=job_id, chunk_index=index, offset=offset, text=text, file_size=size, cleaner_state=cleaner_state)
+
+        async def on_progress(stage: str, seconds: float, duration: float, text: str):
+            update_progress(db=db, job_id=job_id, stage=stage, audio_seconds=seconds, duration=duration, text=text)
+
+        # Si el trabajo se interrumpió, se continúa tras la última ventana terminada.
+        checkpoints = get_checkpoints(db=db, job_id=job_id)
+        start_chunk = 0
+        previous_texts = []
+        cleaner_state = None
+
+        if checkpoints:
+            start_chunk = checkpoints[-1].chunk_index + 1
+            previous_texts = [checkpoint.text for checkpoint in checkpoints if checkpoint.text]
+            cleaner_state = checkpoints[-1].cleaner_state
+            print(f"Reanudando el trabajo {job_id} desde el segundo {checkpoints[-1].offset:.0f}")
+
+        # Las notas pueden tener texto de trabajos anteriores de la misma sesión, así que se guarda su tamaño antes de
+        # escribir. En los siguientes intentos se recortan a ese tamaño, o al del último punto de control en la nota.
+        if job.note_size is None:
+            job = set_job_sizes(
+                db=db,
+                job_id=job_id,
+                note_size=await asyncio.to_thread(os.path.getsize, note_path),
+                summary_size=await asyncio.to_thread(os.path.getsize, summary_path)
+            )
+        else:
+            await asyncio.to_thread(_reset_file, job.filename, checkpoints[-1].file_size if checkpoints else job.note_size)
+            await asyncio.to_thread(_reset_file, job.summary, job.summary_size)
+
+        await transcribe_audio(
+            db, job.campaign_id, job.audio, job.filename, job.summary,
+            on_chunk=on_chunk,
+            start_chunk=start_chunk,
+            previous_texts=previous_texts,
+            on_progress=on_progress,
+            cleaner_state=cleaner_state
+        )
+        finish_job(db=db, job_id=job_id, status=JOB_DONE)
+        remove_checkpoints(db=db, job_id=job_id)
+
+        # Si el audio estaba en la caché o el modelo se ha descargado, no se carga solo para mostrar el factor.
+        rtf = whisper_instance.real_time_factor() if whisper_instance.loaded else None
+        if rtf is not None:
+            print(f"Whisper ({whisper_instance.backend}, {whisper_instance.model_id}): factor de tiempo real {rtf:.3f}")
+
+    except JobCancelled:
+        await asyncio.to_thread(delete, job.audio)
+        remove_checkpoints(db=db, job_id=job_id)
+        print(f"Trabajo {job_id} cancelado")
+
+    except Exception as e:
+        db.rollback()
+        finish_job(db=db, job_id=job_id, status=JOB_FAILED, error=str(e))
+        print(f"Error en el trabajo {job_id}: {e}")
+
+    finally:
+        heartbeat.cancel()
+        db.close()
+
+async def _slot():
+    """
+    Bucle de uno de los huecos de concurrencia del worker: reserva trabajos pendientes y los procesa uno a uno.
+    """
+    while True:
+        db = SessionLocal()
+        try:
+            job = await asyncio.to_thread(claim_next_job, db, WORKER_NAME)
+        finally:
+            db.close()
+
+        if job is None:
+            await asyncio.sleep(settings.JOB_POLL_SECONDS)
+            continue
+
+        await run_job(job.id)
+
+async def _requeue_stale():
+    """
+    Devuelve periódicamente a la cola los trabajos de workers caídos para que se reanuden.
+    """
+    while True:
+        db = SessionLocal()
+        try:
+            count = await asyncio.to_thread(requeue_stale_jobs, db, settings.JOB_STALE_SECONDS, settings.JOB_MAX_ATTEMPTS)
+            if count:
+                print(f"{count} trabajos de transcripción devueltos a la cola")
+        finally:
+            db.close()
+
+        await asyncio.sleep(settings.JOB_STALE_SECONDS)
+
+async def main():
+    """
+    Arranca el worker con tantos huecos de concurrencia como indique `settings.TRANSCRIPTION_CONCURRENCY`.
+    Los modelos de whisper y de resumen se cargan una única vez en este proceso.
+    """
+    Base.metadata.create_all(bind=engine)
+    os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
+
+    # Los modelos se cargan al arrancar para que el primer trabajo no espere a la carga.
+    await asyncio.to_thread(whisper_instance.load)
+    await asyncio.to_thread(summarizer_instance.load)
+
+    slots = [_slot() for _ in range(settings.TRANSCRIPTION_CONCURRENCY)]
+    await asyncio.gather(_requeue_stale(), *slots)
+
+if __name__ == "__main__":
+    asyncio.run(main())